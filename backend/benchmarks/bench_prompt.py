@@ -0,0 +1,104 @@
+"""
+Prompt assembly benchmark: build time per turn and stability of the cacheable prefix.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt [--iterations 2000] [--output results.json]
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+
+from prompts.orchestrator import STATIC_PREFIX, STATIC_PREFIX_SHA1, build_prompt_parts, get_system_prompt
+
+WORDS = (
+    "cat mba iim mock percentile quant verbal career switch manager promotion salary interview "
+    "product startup consulting family city relocate burnout anxious confident prep schedule"
+).split()
+
+
+def random_phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def random_user(rng: random.Random, n_entries: int) -> tuple:
+    user_context = {
+        "name": random_phrase(rng, 1).title(),
+        "current_track": rng.choice([None, "cat_mba", "jobs_career", "roast_play"]),
+        "message_count": rng.randint(0, 200)
+    }
+    learnings = {
+        "big_rocks": [random_phrase(rng, 5) for _ in range(n_entries)],
+        "recurring_themes": [random_phrase(rng, 5) for _ in range(n_entries)],
+        "constraints": [random_phrase(rng, 4) for _ in range(n_entries)],
+        "north_star": random_phrase(rng, 6),
+        "decision_tendencies": random_phrase(rng, 3)
+    }
+    return user_context, learnings
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(iterations: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    users = [random_user(rng, rng.choice([2, 10, 40])) for _ in range(200)]
+    queries = [random_phrase(rng, rng.randint(1, 30)) for _ in range(200)]
+
+    timings = []
+    prefix_hashes = set()
+    prefix_chars = suffix_chars = 0
+    for i in range(iterations):
+        user_context, learnings = users[i % len(users)]
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        prefix, suffix = build_prompt_parts(user_context, learnings, query=query)
+        timings.append(time.perf_counter() - start)
+
+        prefix_hashes.add(hashlib.sha1(prefix.encode("utf-8")).hexdigest())
+        prefix_chars += len(prefix)
+        suffix_chars += len(suffix)
+
+    # The combined prompt must still start with the exact static prefix
+    combined = get_system_prompt(*users[0], query=queries[0])
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "build_us": {
+            "p50": round(percentile(timings, 50) * 1e6, 2),
+            "p95": round(percentile(timings, 95) * 1e6, 2),
+            "p99": round(percentile(timings, 99) * 1e6, 2),
+            "mean": round(sum(timings) / len(timings) * 1e6, 2)
+        },
+        "prefix": {
+            "chars": len(STATIC_PREFIX),
+            "distinct_hashes": len(prefix_hashes),
+            "stable": prefix_hashes == {STATIC_PREFIX_SHA1} and combined.startswith(STATIC_PREFIX)
+        },
+        "avg_suffix_chars": round(suffix_chars / iterations, 1),
+        "cacheable_share": round(prefix_chars / (prefix_chars + suffix_chars), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if not results["prefix"]["stable"]:
+        raise SystemExit("Static prompt prefix is not stable")
+
+
+if __name__ == "__main__":
+    main()
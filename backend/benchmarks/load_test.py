@@ -0,0 +1,387 @@
+"""
+Offline load test: boots the FastAPI app in-process against an in-memory Mongo stand-in (or a local
+mongod) with fake LLM, Whisper and TTS backends, drives a traffic mix and reports per-endpoint latency.
+
+Usage (from backend/):
+    python -m benchmarks.load_test [--duration 30] [--concurrency 32] [--users 200] [--mix default]
+        [--llm-latency lognormal:6.5:0.4] [--audio-latency normal:400:100]
+        [--mongo-url mongodb://localhost:27017] [--output results.json]
+        [--compare baseline.json] [--threshold 0.25]
+
+Latency specs are in milliseconds (see services.llm_client.parse_latency_spec). With --mongo-url the
+run writes to the `chekinn_loadtest` database; never point it at production.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# name -> scenario weights
+MIXES = {
+    "default": {"chat": 40, "voice": 8, "history": 10, "intro_poll": 20, "peer_chat": 15, "admin": 5, "track_select": 2},
+    "chat_heavy": {"chat": 75, "voice": 15, "intro_poll": 10},
+    "read_heavy": {"history": 30, "intro_poll": 40, "peer_chat": 20, "admin": 10},
+}
+
+WORDS = (
+    "cat mock percentile iim interview manager switch offer salary startup product consulting "
+    "tired anxious excited parents city move prep quant verbal weekend team promotion"
+).split()
+
+GREETINGS = ["hi", "hey", "thanks", "ok", "bye"]
+
+
+class FakeWhisperService:
+    def __init__(self, latency: str, seed: int = 0):
+        from services.llm_client import parse_latency_spec
+        self._rng = random.Random(seed)
+        self._sample_latency = parse_latency_spec(latency, self._rng)
+        self.calls = 0
+
+    async def transcribe(self, audio_content: bytes, filename: str = "audio.mp3") -> dict:
+        self.calls += 1
+        await asyncio.sleep(self._sample_latency())
+        return {"text": " ".join(self._rng.choice(WORDS) for _ in range(12)), "duration": len(audio_content) / 16000}
+
+
+class FakeTTSService:
+    def __init__(self, latency: str, seed: int = 0):
+        from services.llm_client import parse_latency_spec
+        self._sample_latency = parse_latency_spec(latency, random.Random(seed))
+        self.calls = 0
+
+    async def synthesize(self, text: str, voice: str = "alloy") -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self._sample_latency())
+        return b"\x00" * (len(text) * 40)
+
+
+def boot_app(args):
+    """Import server with stand-ins wired in; returns the server module"""
+    os.environ.update({
+        "MONGO_URL": args.mongo_url or "memory://",
+        "DB_NAME": "chekinn_loadtest",
+        "LLM_PROVIDER": "fake",
+        "LLM_FAKE_LATENCY": args.llm_latency,
+        "LLM_FAKE_ERROR_RATE": str(args.llm_error_rate),
+        "LLM_FAKE_SEED": str(args.seed),
+        "LEARNINGS_COMPACTION_INTERVAL": "0",
+    })
+    if not args.mongo_url:
+        import motor.motor_asyncio
+        from benchmarks.memory_mongo import MemoryMongoClient
+        motor.motor_asyncio.AsyncIOMotorClient = MemoryMongoClient
+
+    import server
+    whisper = FakeWhisperService(args.audio_latency, args.seed)
+    tts = FakeTTSService(args.audio_latency, args.seed + 1)
+    server.app.dependency_overrides[server.get_whisper_service] = lambda: whisper
+    server.app.dependency_overrides[server.get_tts_service] = lambda: tts
+    logging.getLogger().setLevel(args.log_level)
+    return server
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)]
+
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for part in (header or "").split(","):
+        fields = part.strip().split(";")
+        for field in fields[1:]:
+            if field.startswith("dur="):
+                stages[fields[0]] = float(field[4:])
+    return stages
+
+
+class Recorder:
+    def __init__(self):
+        self.recording = False
+        self.samples = {}  # label -> [(seconds, status)]
+        self.stages = {}   # label -> {stage: total ms}
+
+    async def request(self, client, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            self.samples.setdefault(label, []).append((elapsed, status))
+            if response is not None:
+                totals = self.stages.setdefault(label, {})
+                for stage, ms in parse_server_timing(response.headers.get("server-timing")).items():
+                    totals[stage] = totals.get(stage, 0.0) + ms
+        return response
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for label, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds for seconds, _ in samples)
+            errors = sum(1 for _, status in samples if status == 0 or (status >= 400 and status != 429))
+            rejected = sum(1 for _, status in samples if status == 429)
+            endpoints[label] = {
+                "count": len(samples),
+                "errors": errors,
+                "rejected": rejected,
+                "throughput_rps": round(len(samples) / duration, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+                # Server-side breakdown from the Server-Timing header, averaged per request
+                "stages_ms": {
+                    stage: round(total / len(samples), 2)
+                    for stage, total in sorted(self.stages.get(label, {}).items())
+                },
+            }
+        total = sum(endpoint["count"] for endpoint in endpoints.values())
+        return {
+            "total_requests": total,
+            "throughput_rps": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+def phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+class World:
+    """Seeded users plus the intros and peer conversations between them"""
+
+    def __init__(self):
+        self.user_ids = []
+        self.peers = {}  # user_id -> [(other_user_id, conversation_id)]
+
+
+async def seed(client, recorder: Recorder, users: int, rng: random.Random) -> World:
+    world = World()
+    for i in range(users):
+        response = await recorder.request(client, "POST /users", "POST", "/api/users", json={
+            "name": f"Load {i}",
+            "city": rng.choice(["Mumbai", "Delhi", "Bangalore", "Pune"]),
+            "current_role": rng.choice(["Analyst", "Engineer", "Student", "Consultant"]),
+            "intent": phrase(rng, 6),
+        })
+        world.user_ids.append(response.json()["id"])
+
+    for user_id in world.user_ids:
+        for other in rng.sample(world.user_ids, 3):
+            if other == user_id:
+                continue
+            await recorder.request(client, "POST /admin/create-intro", "POST", "/api/admin/create-intro", json={
+                "from_user_id": user_id, "to_user_id": other, "reason": phrase(rng, 8)
+            })
+        other = rng.choice(world.user_ids)
+        if other != user_id:
+            response = await recorder.request(
+                client, "POST /peer/conversations/create", "POST", "/api/peer/conversations/create",
+                params={"from_user_id": user_id, "to_user_id": other}
+            )
+            conversation_id = response.json()["conversation_id"]
+            world.peers.setdefault(user_id, []).append((other, conversation_id))
+            world.peers.setdefault(other, []).append((user_id, conversation_id))
+    return world
+
+
+async def scenario_chat(client, recorder, world, user_id, rng):
+    text = rng.choice(GREETINGS) if rng.random() < 0.2 else phrase(rng, rng.randint(5, 40))
+    await recorder.request(client, "POST /chat/message", "POST", "/api/chat/message", json={
+        "user_id": user_id, "text": text
+    }, headers={"Idempotency-Key": f"{user_id}-{rng.random()}"})
+
+
+async def scenario_voice(client, recorder, world, user_id, rng):
+    response = await recorder.request(
+        client, "POST /audio/transcribe", "POST", "/api/audio/transcribe",
+        files={"file": ("voice.m4a", b"\x00" * rng.randint(16000, 160000), "audio/m4a")}
+    )
+    text = response.json().get("text") or phrase(rng, 10)
+    response = await recorder.request(client, "POST /chat/message", "POST", "/api/chat/message", json={
+        "user_id": user_id, "text": text, "is_voice": True, "audio_duration": 4.0
+    })
+    if response.status_code == 200:
+        await recorder.request(
+            client, "POST /audio/synthesize", "POST", "/api/audio/synthesize",
+            data={"text": response.json()["text"], "voice": "alloy"}
+        )
+
+
+async def scenario_history(client, recorder, world, user_id, rng):
+    await recorder.request(client, "GET /chat/history/{user_id}", "GET", f"/api/chat/history/{user_id}")
+
+
+async def scenario_intro_poll(client, recorder, world, user_id, rng):
+    await recorder.request(client, "GET /intros/{user_id}", "GET", f"/api/intros/{user_id}")
+
+
+async def scenario_peer_chat(client, recorder, world, user_id, rng):
+    await recorder.request(client, "GET /peer/conversations/{user_id}", "GET", f"/api/peer/conversations/{user_id}")
+    if not world.peers.get(user_id):
+        return
+    other, conversation_id = rng.choice(world.peers[user_id])
+    await recorder.request(client, "POST /peer/messages", "POST", "/api/peer/messages", json={
+        "from_user_id": user_id, "to_user_id": other, "text": phrase(rng, rng.randint(3, 20))
+    })
+    await recorder.request(client, "GET /peer/messages/{conversation_id}", "GET", f"/api/peer/messages/{conversation_id}")
+
+
+async def scenario_admin(client, recorder, world, user_id, rng):
+    roll = rng.random()
+    if roll < 0.35:
+        await recorder.request(client, "GET /admin/users", "GET", "/api/admin/users")
+    elif roll < 0.7:
+        await recorder.request(client, "GET /analytics", "GET", "/api/analytics")
+    elif roll < 0.9:
+        await recorder.request(client, "GET /admin/learnings/{user_id}", "GET", f"/api/admin/learnings/{user_id}")
+    else:
+        # One LLM evaluation per candidate; kept rare like in production
+        await recorder.request(client, "GET /admin/matches/{user_id}", "GET", f"/api/admin/matches/{user_id}")
+
+
+async def scenario_track_select(client, recorder, world, user_id, rng):
+    await recorder.request(client, "POST /track/select", "POST", "/api/track/select", json={
+        "user_id": user_id, "track": rng.choice(["cat_mba", "jobs_career"])
+    })
+
+
+SCENARIOS = {
+    "chat": scenario_chat,
+    "voice": scenario_voice,
+    "history": scenario_history,
+    "intro_poll": scenario_intro_poll,
+    "peer_chat": scenario_peer_chat,
+    "admin": scenario_admin,
+    "track_select": scenario_track_select,
+}
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+async def worker(client, recorder: Recorder, world: World, weights: dict, deadline: float, rng: random.Random):
+    names = list(weights)
+    cumulative = list(weights.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=cumulative)[0]
+        await SCENARIOS[name](client, recorder, world, rng.choice(world.user_ids), rng)
+
+
+async def run(args) -> dict:
+    import httpx
+
+    server = boot_app(args)
+    weights = MIXES[args.mix]
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            world = await seed(client, recorder, args.users, rng)
+
+            if args.warmup > 0:
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*[
+                    worker(client, recorder, world, weights, deadline, random.Random(args.seed * 1000 + i))
+                    for i in range(args.concurrency)
+                ])
+
+            recorder.recording = True
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*[
+                worker(client, recorder, world, weights, deadline, random.Random(args.seed * 1000 + args.concurrency + i))
+                for i in range(args.concurrency)
+            ])
+            elapsed = time.perf_counter() - started
+
+    results = recorder.report(elapsed)
+    results["config"] = {
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "mix": args.mix,
+        "llm_latency": args.llm_latency,
+        "llm_error_rate": args.llm_error_rate,
+        "audio_latency": args.audio_latency,
+        "store": "mongod" if args.mongo_url else "memory",
+        "seed": args.seed,
+        "python": sys.version.split()[0],
+    }
+    results["backends"] = {
+        "llm_calls": server.llm_client.provider.calls,
+        "whisper_calls": server.app.dependency_overrides[server.get_whisper_service]().calls,
+        "tts_calls": server.app.dependency_overrides[server.get_tts_service]().calls,
+    }
+    if hasattr(server.db, "stats"):
+        results["backends"]["documents"] = server.db.stats()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Endpoints whose p95 regressed by more than `threshold` (fraction) against the baseline"""
+    regressions = []
+    for label, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(label)
+        if not previous:
+            continue
+        # Ignore sub-millisecond noise on very fast endpoints
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold) and current["p95_ms"] - previous["p95_ms"] > 1:
+            regressions.append({"endpoint": label, "baseline_p95_ms": previous["p95_ms"], "p95_ms": current["p95_ms"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent simulated clients")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--llm-latency", default="lognormal:6.5:0.4", help="Fake LLM latency spec (ms)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--audio-latency", default="normal:400:100", help="Fake Whisper/TTS latency spec (ms)")
+    parser.add_argument("--mongo-url", help="Use a local mongod instead of the in-memory store")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to check for p95 regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p95 growth over the baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            results["regressions"] = compare(results, json.load(f), args.threshold)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if results.get("regressions"):
+        raise SystemExit(f"p95 regressions against {args.compare}: {len(results['regressions'])} endpoint(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+In-memory stand-in for the subset of motor's API the backend uses, so the app can be
+load-tested without a mongod. Documents are deep-copied on the way in and out, like BSON.
+"""
+import asyncio
+import copy
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def get_path(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if value is _MISSING:
+        value = None
+    if operator == "$eq":
+        return _equals(value, operand)
+    if operator == "$ne":
+        return not _equals(value, operand)
+    if operator == "$in":
+        return any(_equals(value, item) for item in operand)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in operand)
+    if value is None:
+        return False
+    try:
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        if operator == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Query operator {operator} is not supported by the in-memory store")
+
+
+def _equals(value, operand) -> bool:
+    # Like Mongo, a scalar matches an array that contains it
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        else:
+            value = get_path(doc, key)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                    return False
+            elif not _equals(None if value is _MISSING else value, condition):
+                return False
+    return True
+
+
+def evaluate(doc: dict, expression):
+    """Aggregation expressions allowed in find projections: "$field", $toString and $ifNull"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        (operator, operand), = expression.items()
+        if operator == "$toString":
+            value = evaluate(doc, operand)
+            return None if value is None else str(value)
+        if operator == "$ifNull":
+            value = evaluate(doc, operand[0])
+            return evaluate(doc, operand[1]) if value is None else value
+        raise NotImplementedError(f"Unsupported projection expression: {operator}")
+    return expression
+
+
+def _computed(spec) -> bool:
+    return isinstance(spec, (dict, str))
+
+
+def project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        for field, spec in fields.items():
+            if _computed(spec):
+                set_path(result, field, evaluate(doc, spec))
+                continue
+            value = get_path(doc, field)
+            if value is not _MISSING:
+                set_path(result, field, copy.deepcopy(value))
+    else:
+        result = copy.deepcopy(doc)
+        for field in fields:
+            unset_path(result, field)
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    else:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_key(value):
+    # None/missing sort first, as in Mongo
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False):
+    for operator, fields in update.items():
+        if operator == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    set_path(doc, path, copy.deepcopy(value))
+        elif operator == "$set":
+            for path, value in fields.items():
+                set_path(doc, path, copy.deepcopy(value))
+        elif operator == "$unset":
+            for path in fields:
+                unset_path(doc, path)
+        elif operator == "$inc":
+            for path, amount in fields.items():
+                current = get_path(doc, path)
+                set_path(doc, path, (0 if current is _MISSING else current) + amount)
+        elif operator == "$max":
+            for path, value in fields.items():
+                current = get_path(doc, path)
+                if current is _MISSING or value > current:
+                    set_path(doc, path, value)
+        elif operator in ("$push", "$addToSet"):
+            for path, spec in fields.items():
+                current = get_path(doc, path)
+                items = list(current) if current is not _MISSING else []
+                values = spec["$each"] if isinstance(spec, dict) and "$each" in spec else [spec]
+                for value in values:
+                    if operator == "$push" or value not in items:
+                        items.append(copy.deepcopy(value))
+                if isinstance(spec, dict) and "$slice" in spec:
+                    limit = spec["$slice"]
+                    items = items[limit:] if limit < 0 else items[:limit]
+                set_path(doc, path, items)
+        else:
+            raise NotImplementedError(f"Update operator {operator} is not supported by the in-memory store")
+
+
+class MemoryCursor:
+    def __init__(self, collection, query: dict, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self) -> list:
+        docs = [doc for doc in self._collection._docs.values() if matches(doc, self._query)]
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda doc: _sort_key(get_path(doc, field)), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    async def distinct(self, field: str) -> list:
+        values = []
+        for doc in self._results():
+            value = get_path(doc, field)
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class MemoryAggregation:
+    """$match, $project, $group (with $sum and $max), $sort and $limit"""
+
+    def __init__(self, collection, pipeline: list):
+        self._collection = collection
+        self._pipeline = pipeline
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(0)
+        docs = [copy.deepcopy(doc) for doc in self._collection._docs.values()]
+        for stage in self._pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$project":
+                docs = [project(doc, spec) for doc in docs]
+            elif name == "$group":
+                docs = self._group(docs, spec)
+            elif name == "$sort":
+                for field, direction in reversed(list(spec.items())):
+                    docs.sort(key=lambda doc: _sort_key(get_path(doc, field)), reverse=direction < 0)
+            elif name == "$limit":
+                docs = docs[:spec]
+            else:
+                raise NotImplementedError(f"Aggregation stage {name} is not supported by the in-memory store")
+        return docs[:length] if length else docs
+
+    @staticmethod
+    def _resolve(doc, expression):
+        if isinstance(expression, str) and expression.startswith("$"):
+            value = get_path(doc, expression[1:])
+            return None if value is _MISSING else value
+        return expression
+
+    def _group(self, docs: list, spec: dict) -> list:
+        groups = OrderedDict()
+        for doc in docs:
+            key = self._resolve(doc, spec["_id"])
+            group = groups.setdefault(repr(key), {"_id": key})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (operator, expression), = accumulator.items()
+                value = self._resolve(doc, expression)
+                if operator == "$sum":
+                    # Like Mongo, non-numeric and missing values add nothing
+                    group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+                elif operator == "$max":
+                    if value is not None and (group.get(field) is None or value > group[field]):
+                        group[field] = value
+                    else:
+                        group.setdefault(field, None)
+                else:
+                    raise NotImplementedError(f"Accumulator {operator} is not supported by the in-memory store")
+        return list(groups.values())
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs = OrderedDict()  # _id -> document
+        self._indexes = {}  # name -> IndexModel document
+
+    def _unique_fields(self) -> list:
+        return [
+            [field for field, _ in index["key"].items()]
+            for index in self._indexes.values() if index.get("unique")
+        ]
+
+    def _check_unique(self, doc: dict, ignore_id=None):
+        if doc["_id"] in self._docs and doc["_id"] != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id")
+        for fields in self._unique_fields():
+            key = [get_path(doc, field) for field in fields]
+            for other in self._docs.values():
+                if other["_id"] != doc["_id"] and [get_path(other, field) for field in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} {fields}")
+
+    def _first(self, query: dict, sort=None):
+        cursor = MemoryCursor(self, query, None)
+        if sort:
+            cursor.sort(sort)
+        for doc in cursor._results():
+            return self._docs[doc["_id"]]
+        return None
+
+    async def insert_one(self, document: dict):
+        await asyncio.sleep(0)
+        document.setdefault("_id", ObjectId())
+        doc = copy.deepcopy(document)
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: list, ordered: bool = True):
+        ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def find_one(self, query: dict = None, projection=None, sort=None):
+        await asyncio.sleep(0)
+        doc = self._first(query or {}, sort)
+        return project(doc, projection) if doc is not None else None
+
+    def find(self, query: dict = None, projection=None):
+        return MemoryCursor(self, query or {}, projection)
+
+    async def count_documents(self, query: dict) -> int:
+        await asyncio.sleep(0)
+        return sum(1 for doc in self._docs.values() if matches(doc, query))
+
+    def aggregate(self, pipeline: list):
+        return MemoryAggregation(self, pipeline)
+
+    def _upsert_document(self, query: dict, update: dict) -> dict:
+        doc = {
+            key: value for key, value in query.items()
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+        }
+        doc = copy.deepcopy(doc)
+        apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        return doc
+
+    async def _update(self, query: dict, update: dict, upsert: bool, many: bool):
+        await asyncio.sleep(0)
+        return self._update_now(query, update, upsert, many)
+
+    def _update_now(self, query: dict, update: dict, upsert: bool, many: bool):
+        # No awaits from matching to writing, so each update is atomic like in mongod
+        targets = [doc for doc in self._docs.values() if matches(doc, query)]
+        if not many:
+            targets = targets[:1]
+        for doc in targets:
+            updated = copy.deepcopy(doc)
+            apply_update(updated, update)
+            self._check_unique(updated, ignore_id=doc["_id"])
+            self._docs[doc["_id"]] = updated
+        upserted_id = None
+        if not targets and upsert:
+            doc = self._upsert_document(query, update)
+            self._check_unique(doc)
+            self._docs[doc["_id"]] = doc
+            upserted_id = doc["_id"]
+        return SimpleNamespace(
+            matched_count=len(targets), modified_count=len(targets), upserted_id=upserted_id, acknowledged=True
+        )
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        return await self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query: dict, update: dict, upsert: bool = False):
+        return await self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection=None, upsert: bool = False,
+                                  return_document: bool = False, sort=None):
+        await asyncio.sleep(0)
+        doc = self._first(query, sort)
+        if doc is None:
+            if not upsert:
+                return None
+            result = self._update_now(query, update, upsert=True, many=False)
+            return project(self._docs[result.upserted_id], projection) if return_document else None
+        before = project(doc, projection)
+        self._update_now({"_id": doc["_id"]}, update, upsert=False, many=False)
+        # pymongo's ReturnDocument.AFTER is True
+        return project(self._docs[doc["_id"]], projection) if return_document else before
+
+    async def delete_one(self, query: dict):
+        await asyncio.sleep(0)
+        doc = self._first(query)
+        if doc is not None:
+            del self._docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=1 if doc is not None else 0, acknowledged=True)
+
+    async def delete_many(self, query: dict):
+        await asyncio.sleep(0)
+        ids = [doc["_id"] for doc in self._docs.values() if matches(doc, query)]
+        for _id in ids:
+            del self._docs[_id]
+        return SimpleNamespace(deleted_count=len(ids), acknowledged=True)
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        modified = 0
+        for operation in operations:
+            # pymongo's UpdateOne keeps its arguments on private attributes
+            result = await self.update_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+            modified += result.modified_count
+        return SimpleNamespace(modified_count=modified, acknowledged=True)
+
+    async def create_indexes(self, models: list) -> list:
+        names = []
+        for model in models:
+            document = dict(model.document)
+            self._indexes[document["name"]] = document
+            names.append(document["name"])
+        return names
+
+    async def index_information(self) -> dict:
+        info = {"_id_": {"key": [("_id", 1)]}}
+        for name, document in self._indexes.items():
+            entry = {key: value for key, value in document.items() if key not in ("name", "key")}
+            entry["key"] = list(document["key"].items())
+            info[name] = entry
+        return info
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def stats(self) -> dict:
+        return {name: len(collection._docs) for name, collection in self._collections.items()}
+
+
+class MemoryMongoClient:
+    """Drop-in for AsyncIOMotorClient(url, **options)"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
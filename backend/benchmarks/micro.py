@@ -0,0 +1,373 @@
+"""
+CPU micro-benchmarks for the per-request hot paths: prompt builders, moderation and track detection,
+over representative and adversarial corpora (long messages, pathological regex inputs).
+
+Usage (from backend/):
+    python -m benchmarks.micro [--rounds 15] [--filter moderate] [--output results.json]
+    python -m benchmarks.micro --save-baseline           # record benchmarks/baselines/micro.json
+    python -m benchmarks.micro --threshold 0.3           # default allowed slowdown for families without their own
+
+Regression checks use the fastest round of each case (over --runs passes, far less sensitive to
+noisy neighbours than a median), divided by the fastest round of a calibration loop interleaved with
+its rounds. Calibration is per case family (FAMILIES): prompt builders against a pure-Python loop,
+regex-bound cases against a fixed C regex workload, since the two drift apart between machines and
+between runs. A case regresses only when both its calibrated and its raw time grew beyond the
+family's tolerance, so neither a slow machine nor calibration drift alone can fail the gate.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from prompts.matching import get_matching_prompt
+from prompts.orchestrator import get_system_prompt
+from services.moderation_service import ModerationService
+from services.track_detection import detect_track, detect_tracks_many
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "micro.json"
+
+WORDS = (
+    "cat mba iim mock percentile quant verbal career switch manager promotion salary interview "
+    "product startup consulting family city relocate burnout anxious confident prep schedule "
+    "weekend parents offer team education control category catalog roles"
+).split()
+
+
+def phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+# ============================================================================
+# CORPORA
+# ============================================================================
+
+def chat_messages(rng: random.Random) -> list:
+    """Typical chat turns: short to medium, sometimes with contact details or links"""
+    messages = []
+    for i in range(200):
+        text = phrase(rng, rng.randint(3, 40))
+        if i % 10 == 0:
+            text += " mail me at someone.name@example.com"
+        if i % 15 == 0:
+            text += " see https://example.com/path?q=1"
+        if i % 20 == 0:
+            text += " call 9876543210"
+        messages.append(text)
+    return messages
+
+
+def long_messages(rng: random.Random) -> list:
+    # Moderation allows up to 5000 characters
+    return [phrase(rng, 800)[:4999] for _ in range(20)]
+
+
+def adversarial_url(rng: random.Random) -> list:
+    """Inputs aimed at url_pattern: long runs of its character classes, partial escapes, many prefixes"""
+    return [
+        "http://" + "a" * 4990,
+        "https://" + "%" * 4990,
+        "https://" + "%a" * 2495,
+        "http:/" * 830,
+        "http://" * 710,
+        "https://x" + "$-_@.&+" * 700,
+        "h" + "ttp" * 1600,
+        ("http://" + "(),!*" * 20 + " ") * 40,
+    ]
+
+
+def adversarial_regex(rng: random.Random) -> list:
+    """Worst cases for the email, phone and repeated-character patterns"""
+    return [
+        "a" * 4999,
+        "a@" + "b." * 2495,
+        "x" * 2400 + "@" + "y" * 2400,
+        "a.b" * 1666,
+        "1" * 9 + " " + "1" * 9 + " " * 10 + "12" * 2480,
+        "abcd" * 1249,
+        "aaaa" + "b" * 4990,
+        "A" * 4999,
+    ]
+
+
+def track_adversarial(rng: random.Random) -> list:
+    """Keyword-dense text and near-miss words that must not match"""
+    return [
+        " ".join(["cat mba job roast"] * 300),
+        " ".join(["education control category catalog roles companies"] * 150),
+        "mock-test " * 500,
+        "x" * 4999,
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(4999)),
+    ]
+
+
+def prompt_users(rng: random.Random, entries: int) -> list:
+    users = []
+    for _ in range(50):
+        learnings = {
+            "big_rocks": [phrase(rng, 6) for _ in range(entries)],
+            "recurring_themes": [phrase(rng, 6) for _ in range(entries)],
+            "constraints": [phrase(rng, 5) for _ in range(entries)],
+            "north_star": phrase(rng, 8),
+            "decision_tendencies": phrase(rng, 4),
+        }
+        user_context = {
+            "name": phrase(rng, 1).title(),
+            "intent": phrase(rng, 8),
+            "current_track": rng.choice([None, "cat_mba", "jobs_career"]),
+            "message_count": rng.randint(0, 300),
+        }
+        users.append((user_context, learnings, phrase(rng, rng.randint(5, 60))))
+    return users
+
+
+def matching_pairs(rng: random.Random, entries: int) -> list:
+    def user():
+        return {
+            "name": phrase(rng, 1).title(),
+            "city": rng.choice(["Mumbai", "Delhi", "Pune"]),
+            "current_role": phrase(rng, 2),
+            "intent": phrase(rng, 10),
+            "learnings": {
+                "big_rocks": [phrase(rng, 6) for _ in range(entries)],
+                "recurring_themes": [phrase(rng, 6) for _ in range(entries)],
+                "north_star": phrase(rng, 8),
+            },
+        }
+    return [(user(), user()) for _ in range(50)]
+
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+# The substring checks detect_track used before TrackMatcher, kept as the speed reference for
+# the track_matcher cases (it also matches "cat" inside "education", which TrackMatcher must not)
+BASELINE_TRACK_KEYWORDS = [
+    ("cat_mba", ["cat", "mba", "iim", "mock test", "percentile", "admission", "gmat", "entrance"]),
+    ("jobs_career", ["job", "career", "role", "interview", "salary", "promotion", "company", "manager", "switch"]),
+    ("roast_play", ["roast", "roast me", "bored", "fun", "joke"]),
+]
+
+
+def baseline_detect_track(text: str):
+    message_lower = text.lower()
+    for track, keywords in BASELINE_TRACK_KEYWORDS:
+        if any(keyword in message_lower for keyword in keywords):
+            return track
+    return None
+
+
+def run_sync(coroutine):
+    """Drive a coroutine that never actually suspends, without an event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("Coroutine suspended; it can't be benchmarked synchronously")
+
+
+def build_cases(seed: int) -> dict:
+    """name -> (function over one item, corpus)"""
+    from services.gemini_service import GeminiService
+    from services.llm_client import FakeProvider, LLMClient
+
+    rng = random.Random(seed)
+    moderation = ModerationService()
+    gemini = GeminiService(LLMClient(FakeProvider()))
+
+    def detect(text):
+        return run_sync(gemini.detect_track(text, []))
+
+    chat = chat_messages(rng)
+    long = long_messages(rng)
+    cases = {
+        "get_system_prompt[typical]": (lambda item: get_system_prompt(*item), prompt_users(rng, 3)),
+        "get_system_prompt[heavy]": (lambda item: get_system_prompt(*item), prompt_users(rng, 40)),
+        "get_matching_prompt[typical]": (lambda item: get_matching_prompt(*item), matching_pairs(rng, 3)),
+        "get_matching_prompt[heavy]": (lambda item: get_matching_prompt(*item), matching_pairs(rng, 40)),
+        "moderate[chat]": (moderation.moderate, chat),
+        "moderate[long]": (moderation.moderate, long),
+        "moderate[adversarial_url]": (moderation.moderate, adversarial_url(rng)),
+        "moderate[adversarial_regex]": (moderation.moderate, adversarial_regex(rng)),
+        "url_pattern[adversarial]": (moderation.url_pattern.search, adversarial_url(rng)),
+        "detect_track[chat]": (detect, chat),
+        "detect_track[long]": (detect, long),
+        "detect_track[adversarial]": (detect, track_adversarial(rng)),
+    }
+    adversarial = cases["detect_track[adversarial]"][1]
+    cases.update({
+        "track_matcher[chat]": (detect_track, chat),
+        "track_matcher[long]": (detect_track, long),
+        "track_matcher[adversarial]": (detect_track, adversarial),
+        "track_matcher_many[chat]": (detect_tracks_many, [chat]),
+        "track_matcher_baseline[chat]": (baseline_detect_track, chat),
+        "track_matcher_baseline[long]": (baseline_detect_track, long),
+        "track_matcher_baseline[adversarial]": (baseline_detect_track, adversarial),
+    })
+    return cases
+
+
+# ============================================================================
+# CALIBRATION
+# ============================================================================
+
+CALIBRATION_PATTERN = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.]+\b|(?:https?://)?[\w-]+(?:\.[\w-]+)+/?\S*")
+CALIBRATION_TEXT = ("reach me at first.last at example dot com or www example com " * 300)
+
+
+def python_calibration() -> int:
+    """ns for one pass of a fixed pure-Python workload (string building and dict access)"""
+    started = time.perf_counter_ns()
+    parts = {}
+    for i in range(20000):
+        parts[i % 97] = f"{i}:{parts.get(i % 89, '')[:8]}"
+    return time.perf_counter_ns() - started
+
+
+def regex_calibration() -> int:
+    """ns for one pass of a fixed workload in the C regex engine"""
+    started = time.perf_counter_ns()
+    for _ in range(2):
+        CALIBRATION_PATTERN.findall(CALIBRATION_TEXT)
+    return time.perf_counter_ns() - started
+
+
+# Case family (the name before "[") -> (calibration, allowed slowdown or None for --threshold)
+FAMILIES = {
+    "get_system_prompt": (python_calibration, None),
+    "get_matching_prompt": (python_calibration, None),
+    "moderate": (regex_calibration, 0.4),
+    "url_pattern": (regex_calibration, 0.4),
+    "detect_track": (regex_calibration, 0.4),
+    "track_matcher": (python_calibration, 0.4),
+    "track_matcher_many": (python_calibration, 0.4),
+    "track_matcher_baseline": (python_calibration, 0.4),
+}
+
+
+def family(name: str) -> tuple:
+    return FAMILIES.get(name.split("[", 1)[0], (python_calibration, None))
+
+
+def measure(function, corpus: list, rounds: int, min_round_ns: int = 20_000_000, calibration=None) -> dict:
+    # Repeat the corpus within a round until the round is long enough to time reliably
+    started = time.perf_counter_ns()
+    for item in corpus:
+        function(item)
+    repeats = max(1, int(min_round_ns / max(time.perf_counter_ns() - started, 1)))
+
+    per_op = []
+    calibrations = []
+    # Like timeit: a collection landing in one round would dominate the allocation-heavy cases
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            if calibration:
+                # Interleaved so both minimums come from the same stretches of machine time
+                calibrations.append(calibration())
+            started = time.perf_counter_ns()
+            for _ in range(repeats):
+                for item in corpus:
+                    function(item)
+            per_op.append((time.perf_counter_ns() - started) / (repeats * len(corpus)))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    per_op.sort()
+    measured = {
+        "items": len(corpus),
+        "ns_per_op": round(statistics.median(per_op), 1),
+        "ns_per_op_min": round(per_op[0], 1),
+        "ns_per_op_max": round(per_op[-1], 1),
+        "ops_per_sec": round(1e9 / statistics.median(per_op), 1),
+    }
+    if calibration:
+        measured["calibration_ns"] = min(calibrations)
+        measured["normalized"] = round(per_op[0] / min(calibrations), 6)
+    return measured
+
+
+def run(rounds: int, seed: int = 0, name_filter: str = None, runs: int = 1) -> dict:
+    cases = {name: case for name, case in build_cases(seed).items() if not name_filter or name_filter in name}
+    results = {}
+    # Passes go over every case in turn, so one slow stretch of machine time hits at most one
+    # measurement of a case; each case keeps its best calibrated measurement
+    for _ in range(runs):
+        for name, (function, corpus) in cases.items():
+            measured = measure(function, corpus, rounds, calibration=family(name)[0])
+            if name not in results or measured["normalized"] < results[name]["normalized"]:
+                results[name] = measured
+    return {
+        "machine": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "rounds": rounds,
+        "runs": runs,
+        "seed": seed,
+        "cases": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose calibrated and raw fastest rounds both grew by more than the family's tolerance"""
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous:
+            continue
+        allowed = family(name)[1] or threshold
+        normalized_change = current["normalized"] / previous["normalized"] - 1
+        raw_change = current["ns_per_op_min"] / previous["ns_per_op_min"] - 1
+        if normalized_change > allowed and raw_change > allowed:
+            regressions.append({
+                "case": name,
+                "baseline_ns_per_op_min": previous["ns_per_op_min"],
+                "ns_per_op_min": current["ns_per_op_min"],
+                "normalized_change": round(normalized_change, 3),
+                "raw_change": round(raw_change, 3),
+                "tolerance": allowed,
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3, help="Independent measurements per case; the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Allowed slowdown over the baseline")
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.seed, args.filter, args.runs)
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            results["regressions"] = compare(results, json.load(f), args.threshold)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if results.get("regressions"):
+        raise SystemExit(f"{len(results['regressions'])} case(s) regressed beyond their tolerance against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Serialization cost of the high-volume list payloads (chat history, peer messages, intros)
+and the chat send response, per 1,000 rows.
+
+"legacy" is what the endpoints did before: format each Mongo document field by field (str(_id),
+.isoformat()) and return a dict through FastAPI's jsonable_encoder + JSONResponse. "fast" is the
+current path: rows shaped by the Mongo projection, encoded once by FastJSONResponse (orjson when
+installed); "fast_stdlib" is the same path without orjson.
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--rows 1000] [--rounds 15] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.micro import measure, phrase
+from services import fast_json
+from services.fast_json import FastJSONResponse
+
+
+# ============================================================================
+# ROWS
+# ============================================================================
+
+def message_documents(rng: random.Random, rows: int) -> list:
+    started = datetime(2026, 1, 1)
+    documents = []
+    for i in range(rows):
+        document = {
+            "_id": ObjectId(),
+            "conversation_id": str(ObjectId()),
+            "role": "user" if i % 2 == 0 else "assistant",
+            "text": phrase(rng, rng.randint(5, 60)),
+            "created_at": started + timedelta(seconds=i * 37, microseconds=rng.randint(0, 999) * 1000),
+        }
+        if i % 2:
+            document["track"] = rng.choice(["cat_mba", "jobs_career", None])
+        if i % 5 == 0:
+            document.update(is_voice=True, audio_duration=round(rng.uniform(1, 30), 2))
+        documents.append(document)
+    return documents
+
+
+def legacy_history(documents: list) -> dict:
+    return {"messages": [{
+        "id": str(msg["_id"]),
+        "role": msg["role"],
+        "text": msg["text"],
+        "track": msg.get("track"),
+        "is_voice": msg.get("is_voice", False),
+        "audio_duration": msg.get("audio_duration"),
+        "has_audio_response": msg.get("has_audio_response", False),
+        "created_at": msg["created_at"].isoformat()
+    } for msg in documents]}
+
+
+def projected_history(documents: list) -> dict:
+    # What CHAT_HISTORY_PROJECTION makes Mongo return
+    return {"messages": [{
+        "id": str(msg["_id"]),
+        "role": msg["role"],
+        "text": msg["text"],
+        "track": msg.get("track"),
+        "is_voice": msg.get("is_voice", False),
+        "audio_duration": msg.get("audio_duration"),
+        "has_audio_response": msg.get("has_audio_response", False),
+        "created_at": msg["created_at"]
+    } for msg in documents]}
+
+
+def legacy_peer_messages(documents: list) -> dict:
+    return {"messages": [{
+        "id": str(msg["_id"]),
+        "from_user_id": msg["conversation_id"],
+        "to_user_id": msg["conversation_id"],
+        "text": msg["text"],
+        "created_at": msg["created_at"].isoformat()
+    } for msg in documents]}
+
+
+def projected_peer_messages(documents: list) -> dict:
+    return {"messages": [{
+        "id": str(msg["_id"]),
+        "from_user_id": msg["conversation_id"],
+        "to_user_id": msg["conversation_id"],
+        "text": msg["text"],
+        "created_at": msg["created_at"]
+    } for msg in documents]}
+
+
+def intros(documents: list, legacy: bool) -> dict:
+    # Intros are still assembled per row (per-viewer is_new, joined profile cards); only encoding changed
+    return {"intros": [{
+        "id": str(doc["_id"]) if legacy else doc["_id"],
+        "from_user_id": doc["conversation_id"],
+        "to_user_id": doc["conversation_id"],
+        "other_user": {"id": doc["conversation_id"], "name": "Asha", "city": "Pune", "current_role": "Analyst"},
+        "reason": doc["text"],
+        "status": "suggested",
+        "is_new": doc["role"] == "user",
+        "created_at": doc["created_at"].isoformat() if legacy else doc["created_at"]
+    } for doc in documents]}
+
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+def legacy_response(content) -> bytes:
+    # FastAPI's default path for a returned dict
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_response(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def stdlib_response(content) -> bytes:
+    orjson, fast_json.orjson = fast_json.orjson, None
+    try:
+        return FastJSONResponse(content).body
+    finally:
+        fast_json.orjson = orjson
+
+
+def build_cases(rows: int, seed: int) -> dict:
+    """payload -> {variant: (function over one item, corpus)}; one item is a full payload of `rows` rows"""
+    # server builds its Mongo client at import; motor doesn't connect until a query runs
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "chekinn_benchmark")
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    from server import MessageResponse
+
+    rng = random.Random(seed)
+    documents = message_documents(rng, rows)
+    sent = [MessageResponse(
+        id=str(doc["_id"]), conversation_id=doc["conversation_id"], role=doc["role"], text=doc["text"],
+        track=doc.get("track"), is_voice=doc.get("is_voice", False), audio_duration=doc.get("audio_duration"),
+        created_at=doc["created_at"]
+    ) for doc in documents]
+
+    def legacy_send(responses):
+        # response_model: the returned model is dumped, validated again, then jsonable-encoded
+        return [legacy_response(MessageResponse.model_validate(r.model_dump()).model_dump()) for r in responses]
+
+    def fast_send(responses):
+        return [fast_response(r) for r in responses]
+
+    def stdlib_send(responses):
+        return [stdlib_response(r) for r in responses]
+
+    def variants(legacy, projected):
+        return {
+            "legacy": (lambda docs: legacy_response(legacy(docs)), [documents]),
+            "fast": (lambda docs: fast_response(projected(docs)), [documents]),
+            "fast_stdlib": (lambda docs: stdlib_response(projected(docs)), [documents]),
+        }
+
+    return {
+        "chat_history": variants(legacy_history, projected_history),
+        "peer_messages": variants(legacy_peer_messages, projected_peer_messages),
+        "intros": variants(lambda docs: intros(docs, True), lambda docs: intros(docs, False)),
+        "send_message": {
+            "legacy": (legacy_send, [sent]),
+            "fast": (fast_send, [sent]),
+            "fast_stdlib": (stdlib_send, [sent]),
+        },
+    }
+
+
+def run(rows: int, rounds: int, seed: int = 0) -> dict:
+    results = {}
+    for payload, variants in build_cases(rows, seed).items():
+        results[payload] = {}
+        for variant, (function, corpus) in variants.items():
+            if variant == "fast_stdlib" and fast_json.orjson is None:
+                continue
+            measured = measure(function, corpus, rounds)
+            results[payload][variant] = {
+                "us_per_1000_rows": round(measured["ns_per_op"] / rows, 1),
+                "us_per_1000_rows_min": round(measured["ns_per_op_min"] / rows, 1),
+            }
+        legacy = results[payload]["legacy"]["us_per_1000_rows"]
+        results[payload]["speedup"] = round(legacy / results[payload]["fast"]["us_per_1000_rows"], 2)
+    return {
+        "encoder": fast_json.backend(),
+        "rows": rows,
+        "rounds": rounds,
+        "python": sys.version.split()[0],
+        "payloads": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.rounds, args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Operational commands for the Chekinn backend.
+
+Usage:
+    python manage.py ensure-indexes
+    python manage.py check-indexes
+    python manage.py compact-learnings [--force]
+    python manage.py backfill-tracks [--dry-run] [--use-model]
+    python manage.py train-track-model [--output PATH] [--limit N]
+    python manage.py import-report [--module server] [--top 25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ['DB_NAME']]
+
+
+async def ensure_indexes(args) -> int:
+    from services.index_service import IndexService
+
+    client, db = get_db()
+    try:
+        report = await IndexService(db).ensure_indexes()
+        print(json.dumps(report, indent=2))
+        return 1 if any(r["failed"] for r in report.values()) else 0
+    finally:
+        client.close()
+
+
+async def check_indexes(args) -> int:
+    from services.index_service import IndexService
+
+    client, db = get_db()
+    try:
+        drift = await IndexService(db).check_drift()
+        print(json.dumps(drift, indent=2) if drift else "No index drift")
+        return 1 if drift else 0
+    finally:
+        client.close()
+
+
+async def compact_learnings(args) -> int:
+    from services.learning_compaction import LearningCompactor
+
+    client, db = get_db()
+    try:
+        report = await LearningCompactor(db).compact_all(force=args.force)
+        print(json.dumps(report, indent=2))
+        return 1 if report["errors"] else 0
+    finally:
+        client.close()
+
+
+def add_compact_learnings_args(parser):
+    parser.add_argument("--force", action="store_true", help="Recompact documents unchanged since the last run")
+
+
+async def backfill_tracks(args) -> int:
+    from services.track_detection import backfill_tracks as run_backfill
+
+    client, db = get_db()
+    try:
+        classify_many = None
+        if args.use_model:
+            from services.track_classifier import TrackClassifier
+            classify_many = TrackClassifier().classify_many
+        report = await run_backfill(db, dry_run=args.dry_run, classify_many=classify_many)
+        print(json.dumps(report, indent=2))
+        return 0
+    finally:
+        client.close()
+
+
+def add_backfill_tracks_args(parser):
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    parser.add_argument("--use-model", action="store_true", help="Label with the trained track model (rules as fallback)")
+
+
+async def train_track_model(args) -> int:
+    from services.track_classifier import DEFAULT_MODEL_PATH, load_labeled_turns, train_and_evaluate
+
+    client, db = get_db()
+    try:
+        texts, labels = await load_labeled_turns(db, limit=args.limit)
+    finally:
+        client.close()
+
+    if len(set(labels)) < 2:
+        print(f"Not enough labeled data to train ({len(texts)} turns, {len(set(labels))} labels)")
+        return 1
+
+    model, report = train_and_evaluate(
+        texts, labels, test_fraction=args.test_fraction, seed=args.seed, min_count=args.min_count
+    )
+    output = Path(args.output) if args.output else DEFAULT_MODEL_PATH
+    model.save(output)
+    print(json.dumps({"model": str(output), "training": model.metadata}, indent=2, default=str))
+    return 0
+
+
+def add_train_track_model_args(parser):
+    parser.add_argument("--output", help="Model file (default: models/track_model.npz)")
+    parser.add_argument("--limit", type=int, help="Use at most this many labeled turns")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Held-out share for the evaluation report")
+    parser.add_argument("--min-count", type=int, default=2, help="Drop tokens seen fewer times than this")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def parse_importtime(output: str) -> list:
+    """Rows of `python -X importtime` as dicts (self_ms, cumulative_ms, depth, module), in import order"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+async def import_report(args) -> int:
+    # A fresh interpreter, so nothing is already cached in sys.modules
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-X", "importtime", "-c", f"import {args.module}",
+        cwd=str(ROOT_DIR),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    rows = parse_importtime(stderr.decode())
+    if process.returncode != 0 or not rows:
+        print(stderr.decode()[-2000:])
+        return 1
+
+    index = next((i for i, row in enumerate(rows) if row["module"] == args.module), len(rows) - 1)
+    total = rows[index]
+    packages = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + row["self_ms"]
+    # Children are printed before their parent: walk back to find what each import line of the target costs
+    direct = []
+    for row in reversed(rows[:index]):
+        if row["depth"] <= total["depth"]:
+            break
+        if row["depth"] == total["depth"] + 1:
+            direct.append(row)
+
+    def top(items):
+        return dict(sorted(((name, round(ms, 1)) for name, ms in items), key=lambda item: -item[1])[:args.top])
+
+    print(json.dumps({
+        "module": args.module,
+        "total_ms": round(total["cumulative_ms"], 1),
+        "module_body_ms": round(total["self_ms"], 1),
+        "modules_imported": len(rows),
+        "by_direct_import_ms": top((row["module"], row["cumulative_ms"]) for row in direct),
+        "by_package_self_ms": top(packages.items()),
+        "slowest_modules_self_ms": top((row["module"], row["self_ms"]) for row in rows),
+    }, indent=2))
+    return 0
+
+
+def add_import_report_args(parser):
+    parser.add_argument("--module", default="server", help="Module to import (default: server)")
+    parser.add_argument("--top", type=int, default=25, help="Entries per section")
+
+
+# name -> (handler, help, argument setup)
+COMMANDS = {
+    "ensure-indexes": (ensure_indexes, "Create all declared indexes (idempotent)", None),
+    "check-indexes": (check_indexes, "Report drift between declared and actual indexes", None),
+    "compact-learnings": (compact_learnings, "Deduplicate and cap learnings for all users", add_compact_learnings_args),
+    "backfill-tracks": (backfill_tracks, "Re-label stored messages.track with the current track detector", add_backfill_tracks_args),
+    "train-track-model": (train_track_model, "Train the track classifier from labeled messages and report accuracy", add_train_track_model_args),
+    "import-report": (import_report, "Show where cold-start import time goes", add_import_report_args),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Chekinn backend management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, add_args) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if add_args:
+            add_args(subparser)
+
+    args = parser.parse_args()
+    handler = COMMANDS[args.command][0]
+    return asyncio.run(handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# Relevance ranking of user learnings for prompt injection
+
+import logging
+import math
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Fields ranked against the current turn (list-valued learnings)
+RANKED_FIELDS = ["big_rocks", "recurring_themes", "constraints"]
+
+# Small prior so core priorities still surface when nothing matches lexically
+FIELD_PRIORS = {
+    "big_rocks": 0.3,
+    "recurring_themes": 0.2,
+    "constraints": 0.1,
+}
+
+# Short single-value learnings, always kept when they fit the budget
+SCALAR_FIELDS = ["north_star", "decision_tendencies"]
+
+# Overridable via LEARNINGS_TOP_K / LEARNINGS_TOKEN_BUDGET, read per call so values from .env apply
+DEFAULT_TOP_K = 6
+DEFAULT_TOKEN_BUDGET = 200
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from had has have how i i'm im if in into is it
+its just me my no not of on or so that the their them then there they this to too was we were what
+when which who will with would you your about want think really also like get got am
+""".split())
+
+_token_pattern = re.compile(r"[a-z0-9]+")
+
+
+def _positive_env_int(name: str, default: int) -> int:
+    """A positive integer from the environment; bad values fall back to the default instead of failing the turn"""
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={raw!r}: not an integer, using {default}")
+        return default
+    if value < 1:
+        logger.warning(f"Ignoring {name}={raw!r}: must be positive, using {default}")
+        return default
+    return value
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list:
+    return [_stem(t) for t in _token_pattern.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def select_learnings(
+    learnings: dict,
+    query: str,
+    top_k: int = None,
+    token_budget: int = None
+) -> dict:
+    """
+    Keep only the learnings entries most relevant to the query.
+    Returns a learnings dict of the same shape, bounded by top_k entries and token_budget.
+    """
+    if not learnings:
+        return learnings
+    if top_k is None:
+        top_k = _positive_env_int("LEARNINGS_TOP_K", DEFAULT_TOP_K)
+    if token_budget is None:
+        token_budget = _positive_env_int("LEARNINGS_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+
+    # Candidate entries: (field, position, text, tokens)
+    candidates = []
+    for field in RANKED_FIELDS:
+        for position, entry in enumerate(learnings.get(field) or []):
+            if isinstance(entry, str) and entry.strip():
+                candidates.append((field, position, entry, set(tokenize(entry))))
+
+    # IDF over this user's entries: terms shared by many entries carry less signal
+    document_frequency = {}
+    for _, _, _, tokens in candidates:
+        for token in tokens:
+            document_frequency[token] = document_frequency.get(token, 0) + 1
+    total = len(candidates) or 1
+
+    query_tokens = set(tokenize(query or ""))
+    scored = []
+    for field, position, entry, tokens in candidates:
+        overlap = query_tokens & tokens
+        lexical = sum(math.log(1 + total / document_frequency[token]) for token in overlap)
+        field_size = len(learnings.get(field) or []) or 1
+        # Later entries are newer; a tiny recency bonus breaks ties
+        score = lexical + FIELD_PRIORS.get(field, 0.0) + 0.05 * position / field_size
+        scored.append((score, field, position, entry))
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    selected = {}
+    used_tokens = 0
+    for field in SCALAR_FIELDS:
+        value = learnings.get(field)
+        if value and used_tokens + estimate_tokens(str(value)) <= token_budget:
+            selected[field] = value
+            used_tokens += estimate_tokens(str(value))
+
+    chosen = []
+    for score, field, position, entry in scored:
+        if len(chosen) >= top_k:
+            break
+        cost = estimate_tokens(entry)
+        if used_tokens + cost > token_budget:
+            continue
+        chosen.append((field, position, entry))
+        used_tokens += cost
+
+    # Preserve original ordering within each field
+    for field, position, entry in sorted(chosen, key=lambda item: (item[0], item[1])):
+        selected.setdefault(field, []).append(entry)
+
+    return selected
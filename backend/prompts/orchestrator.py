@@ -1,5 +1,8 @@
 # Main orchestrator system prompt for Chekinn companion
 
+import hashlib
+from prompts.learnings_retrieval import select_learnings
+
 ORCHESTRATOR_PROMPT = """You are a thoughtful companion and light-touch orchestrator for people navigating CAT/MBA prep and career decisions.
 
 ROLE & TONE:
@@ -132,9 +135,29 @@ ETHICAL & SAFETY BOUNDARIES:
 - For serious mental health, self-harm, or crisis topics: Encourage reaching out to qualified professionals.
 """
 
-def get_system_prompt(user_context: dict = None, learnings: dict = None) -> str:
-    """Build the system prompt with user context and learnings"""
-    prompt = ORCHESTRATOR_PROMPT
+# Short prompt for trivial and playful turns routed off the full orchestrator
+LIGHT_PROMPT = """You are a warm, grounded companion for people navigating CAT/MBA prep and career decisions.
+Reply in 1-2 short sentences that are easy to read and to listen to. Match the user's energy.
+If they ask to be roasted or are being playful: be playful, not cruel; roast behavior, not identity;
+end with warmth and one gentle question.
+Never bring up introductions to other people in these replies.
+"""
+
+# The static instructions are sent byte-for-byte identical on every call so providers
+# can cache them as a prompt prefix; everything per-user goes in the suffix.
+STATIC_PREFIX = ORCHESTRATOR_PROMPT
+STATIC_PREFIX_SHA1 = hashlib.sha1(STATIC_PREFIX.encode("utf-8")).hexdigest()
+
+def build_context_suffix(user_context: dict = None, learnings: dict = None, query: str = None) -> str:
+    """Build the per-user part of the prompt: user context and learnings.
+
+    When query (the incoming message plus recent turns) is given, only the learnings
+    most relevant to it are injected, under a fixed token budget.
+    """
+    suffix = ""
+    
+    if learnings and query is not None:
+        learnings = select_learnings(learnings, query)
     
     if user_context:
         name = user_context.get("name", "there")
@@ -156,7 +179,7 @@ def get_system_prompt(user_context: dict = None, learnings: dict = None) -> str:
         else:
             context_section += f"- Deep relationship ({message_count} messages). You know them well.\n"
         
-        prompt += context_section
+        suffix += context_section
     
     if learnings:
         learnings_section = "\n\nWHAT YOU'VE LEARNED ABOUT THIS USER:\n"
@@ -176,6 +199,14 @@ def get_system_prompt(user_context: dict = None, learnings: dict = None) -> str:
         if learnings.get("decision_tendencies"):
             learnings_section += f"- Decision style: {learnings['decision_tendencies']}\n"
         
-        prompt += learnings_section
+        suffix += learnings_section
     
-    return prompt
+    return suffix
+
+def build_prompt_parts(user_context: dict = None, learnings: dict = None, query: str = None) -> tuple:
+    """Return (static prefix, dynamic suffix) for the chat prompt"""
+    return STATIC_PREFIX, build_context_suffix(user_context, learnings, query)
+
+def get_system_prompt(user_context: dict = None, learnings: dict = None, query: str = None) -> str:
+    """Build the full system prompt with user context and learnings"""
+    return STATIC_PREFIX + build_context_suffix(user_context, learnings, query)
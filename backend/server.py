@@ -1,7 +1,7 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form, Request
-from fastapi.responses import StreamingResponse, Response, HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form, Request, Header, Depends
+from fastapi.responses import StreamingResponse, Response, HTMLResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Match
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
@@ -11,7 +11,12 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
+import asyncio
 import io
+import hmac
+import time
+from contextlib import asynccontextmanager, nullcontext
 
 # Import services
 from services.gemini_service import GeminiService
@@ -20,28 +25,129 @@ from services.tts_service import TTSService
 from services.learning_service import LearningService
 from services.matching_service import MatchingService
 from services.moderation_service import ModerationService
+from services.index_service import IndexService
+from services.profile_cache import ProfileCardCache
+from services.context_cache import ConversationContextCache
+from services.learning_compaction import LearningCompactor
+from services.summary_service import SummaryService
+from services.llm_client import LLMClient
+from services.llm_ledger import LLMLedger
+from services.structured_output import get_parse_stats
+from services.turn_router import TurnRouter, ROUTE_POOL, ROUTE_LIGHT
+from services.admission_control import AdmissionRejectedError
+from services.metrics import (
+    REGISTRY, REQUEST_DURATION, PROMETHEUS_CONTENT_TYPE, MongoCommandListener,
+    span, start_request, end_request, server_timing
+)
+from services.idempotency_service import (
+    IdempotencyService, IdempotencyError, IdempotencyConflictError, IdempotencyInProgressError
+)
+from services.profiling import RequestProfiler
+from services.memory_diagnostics import MemoryDiagnostics
+from services.providers import Provider
+from services.sync_service import SyncService, InvalidSyncTokenError
+from services.fast_json import FastJSONResponse
+from services.etag import make_etag, etag_matches, etag_headers, not_modified, change_marker
+from services.payloads import (
+    CHAT_HISTORY_PROJECTION, PEER_MESSAGE_PROJECTION, INTRO_PROJECTION, LAST_PEER_MESSAGE_PROJECTION,
+    other_intro_user_id, other_peer_user_id, intro_is_new, intro_payload, peer_conversation_payload
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
 
 # Initialize services
-gemini_service = GeminiService()
-whisper_service = WhisperService()
-tts_service = TTSService()
-learning_service = LearningService(db)
-matching_service = MatchingService(db, gemini_service)
+llm_ledger = LLMLedger(db)
+llm_client = LLMClient.from_env()
+llm_client.ledger = llm_ledger
+gemini_service = GeminiService(llm_client)
+# Audio services wrap the OpenAI SDK; endpoints receive them through Depends on first use
+get_whisper_service = Provider(WhisperService)
+get_tts_service = Provider(TTSService)
+profile_cache = ProfileCardCache(
+    db,
+    max_size=int(os.getenv("PROFILE_CACHE_SIZE", "5000")),
+    ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "300"))
+)
+context_cache = ConversationContextCache(
+    max_users=int(os.getenv("CONTEXT_CACHE_USERS", "1000")),
+    max_turns=int(os.getenv("CONTEXT_CACHE_TURNS", "20")),
+    max_bytes=int(os.getenv("CONTEXT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("CONTEXT_CACHE_TTL", "600"))
+)
+learning_service = LearningService(db, llm_client)
+matching_service = MatchingService(db, gemini_service, profile_cache, llm_client)
 moderation_service = ModerationService()
+index_service = IndexService(db)
+learning_compactor = LearningCompactor(db)
+summary_service = SummaryService(db, llm_client)
+turn_router = TurnRouter(enabled=os.getenv("FAST_PATH_ENABLED", "true").lower() == "true")
+idempotency_service = IdempotencyService(
+    db,
+    wait_timeout=float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+)
+sync_service = SyncService(
+    db,
+    profile_cache,
+    message_limit=int(os.getenv("SYNC_MESSAGE_LIMIT", "200")),
+    intro_limit=int(os.getenv("SYNC_INTRO_LIMIT", "100")),
+    conversation_limit=int(os.getenv("SYNC_CONVERSATION_LIMIT", "50"))
+)
+request_profiler = RequestProfiler.from_env()
+memory_diagnostics = MemoryDiagnostics(max_snapshots=int(os.getenv("MEMORY_SNAPSHOTS_MAX", "5")))
+memory_diagnostics.register("profile_cache", profile_cache.memory_usage)
+memory_diagnostics.register("context_cache", lambda: {
+    key: value for key, value in context_cache.stats().items() if key in ("size", "max_users", "bytes", "max_bytes")
+})
+memory_diagnostics.register("track_classifier", gemini_service.track_classifier.memory_usage)
+memory_diagnostics.register("idempotency_inflight", lambda: {"entries": idempotency_service.stats()["inflight"]})
+memory_diagnostics.register("llm_ledger_queue", lambda: {"entries": llm_ledger.stats()["queued"]})
+
+# Background tasks started on startup and cancelled on shutdown
+background_tasks = []
 
-# Setup templates
-templates = Jinja2Templates(directory=str(ROOT_DIR / "templates"))
+# ============================================================================
+# LIFESPAN
+# ============================================================================
+
+async def ensure_db_indexes():
+    # Idempotent; set ENSURE_INDEXES_ON_STARTUP=false to manage indexes via `python manage.py ensure-indexes`
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() != "true":
+        return
+    try:
+        await index_service.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {str(e)}")
+
+def start_learning_compaction():
+    # Periodic dedupe/cap of every user's learnings; LEARNINGS_COMPACTION_INTERVAL=0 disables it
+    interval = float(os.getenv("LEARNINGS_COMPACTION_INTERVAL", str(6 * 3600)))
+    if interval > 0:
+        background_tasks.append(asyncio.create_task(learning_compactor.run_periodically(interval)))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_db_indexes()
+    # Before serving, so the first chat turn doesn't block the event loop on numpy and the model file
+    await gemini_service.track_classifier.preload()
+    llm_ledger.start()
+    start_learning_compaction()
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await summary_service.shutdown()
+        await llm_ledger.stop()
+        client.close()
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
@@ -195,42 +301,86 @@ async def get_user(user_id: str):
 # CHAT ROUTES
 # ============================================================================
 
-@api_router.post("/chat/message", response_model=MessageResponse)
-async def send_message(message: MessageCreate):
-    """Send a message and get AI response"""
-    try:
-        # Get or create conversation
-        conversation = await db.conversations.find_one({"user_id": message.user_id})
-        if not conversation:
-            conversation = {
-                "user_id": message.user_id,
+async def load_conversation_context(user_id: str):
+    """Load the chat context for a user from Mongo and cache it"""
+    # Get or create conversation (upsert: user_id is unique)
+    conversation = await db.conversations.find_one_and_update(
+        {"user_id": user_id},
+        {
+            "$setOnInsert": {
                 "current_track": None,
                 "message_count": 0,
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
-            conv_result = await db.conversations.insert_one(conversation)
-            conversation["_id"] = conv_result.inserted_id
-        
-        # Get user info and learnings
-        user = await db.users.find_one({"_id": ObjectId(message.user_id)})
-        learnings = await db.learnings.find_one({"user_id": message.user_id})
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    # Get user info and learnings
+    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    learnings = await db.learnings.find_one({"user_id": user_id})
+    
+    # Get conversation history
+    messages = await db.messages.find(
+        {"conversation_id": str(conversation["_id"])}
+    ).sort("created_at", -1).limit(context_cache.max_turns).to_list(context_cache.max_turns)
+    messages.reverse()
+    
+    # Build conversation history for AI
+    conversation_history = [{"role": msg["role"], "text": msg["text"]} for msg in messages]
+    
+    return context_cache.put(
+        user_id,
+        user=user,
+        conversation=conversation,
+        learnings=learnings.get("data") if learnings else None,
+        turns=conversation_history
+    )
+
+async def run_idempotent(scope: str, user_id: str, idempotency_key: Optional[str], payload: BaseModel, handler) -> FastJSONResponse:
+    """Run handler once per Idempotency-Key; retries get the stored response"""
+    try:
+        result, replayed = await idempotency_service.run(
+            scope, user_id, idempotency_key, payload.model_dump(mode="json"), handler
+        )
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except IdempotencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Encoded directly: the handler already built a validated model (or this is its stored JSON form),
+    # so running it through response_model again would only validate it twice
+    return FastJSONResponse(result, headers={"Idempotent-Replayed": "true"} if replayed else None)
+
+@api_router.post("/chat/message", response_model=MessageResponse)
+async def send_message(message: MessageCreate, idempotency_key: Optional[str] = Header(None)):
+    """Send a message and get AI response. Retries with the same Idempotency-Key replay the first response."""
+    return await run_idempotent(
+        "chat_message", message.user_id, idempotency_key, message,
+        lambda: process_chat_message(message)
+    )
+
+async def process_chat_message(message: MessageCreate) -> MessageResponse:
+    try:
+        # Active chatters are served from the context cache; otherwise load from Mongo
+        context = context_cache.get(message.user_id)
+        if context is None:
+            context = await load_conversation_context(message.user_id)
         
-        # Get conversation history
-        messages = await db.messages.find(
-            {"conversation_id": str(conversation["_id"])}
-        ).sort("created_at", -1).limit(20).to_list(20)
-        messages.reverse()
+        conversation = context.conversation
+        user = context.user
+        learnings = context.learnings
+        conversation_history = list(context.turns)
         
-        # Build conversation history for AI
-        conversation_history = []
-        for msg in messages:
-            conversation_history.append({
-                "role": msg["role"],
-                "text": msg["text"]
-            })
+        # Detect track (cheap, no LLM) and route the turn
+        track = await gemini_service.detect_track(message.text, conversation_history)
+        route, category = turn_router.route(message.text, track, conversation_history)
         
-        # Save user message
+        # Written together with the reply once generation succeeds: a 429/500 before then leaves nothing
+        # behind, so the idempotency key can be released and the client's retry can't duplicate the turn
         user_message = {
             "conversation_id": str(conversation["_id"]),
             "role": "user",
@@ -240,25 +390,47 @@ async def send_message(message: MessageCreate):
             "has_audio_response": False,
             "created_at": datetime.utcnow()
         }
-        user_msg_result = await db.messages.insert_one(user_message)
         
-        # Generate AI response
-        ai_response = await gemini_service.generate_response(
-            user_message=message.text,
-            conversation_history=conversation_history,
-            user_context={
-                "name": user.get("name", "there"),
-                "intent": user.get("intent"),
-                "current_track": conversation.get("current_track"),
-                "message_count": conversation.get("message_count", 0)
-            },
-            learnings=learnings.get("data") if learnings else None
-        )
+        user_context = {
+            "name": user.get("name", "there"),
+            "intent": user.get("intent"),
+            "current_track": conversation.get("current_track"),
+            "message_count": conversation.get("message_count", 0)
+        }
         
-        # Detect track
-        track = await gemini_service.detect_track(message.text, conversation_history)
+        # Generate AI response. An LLM turn holds its admission slot from here until the reply is
+        # generated (llm_client.complete reuses it), so once admitted it can't be shed halfway through
+        if route != ROUTE_POOL and llm_client.admission is not None:
+            turn_slot = llm_client.admission.slot("chat", message.user_id)
+        else:
+            turn_slot = nullcontext()
+        async with turn_slot:
+            if route == ROUTE_POOL:
+                ai_response = turn_router.pooled_response(
+                    category,
+                    name=user_context["name"],
+                    message_count=user_context["message_count"],
+                    seed=message.user_id
+                )
+            elif route == ROUTE_LIGHT:
+                ai_response = await gemini_service.generate_light_response(
+                    user_message=message.text,
+                    conversation_history=conversation_history,
+                    user_context=user_context,
+                    user_id=message.user_id,
+                    model=os.getenv("LLM_LIGHT_MODEL") or None
+                )
+            else:
+                ai_response = await gemini_service.generate_response(
+                    user_message=message.text,
+                    conversation_history=conversation_history,
+                    user_context=user_context,
+                    learnings=learnings,
+                    summary=conversation.get("summary"),
+                    user_id=message.user_id
+                )
         
-        # Save assistant message
+        # Save both messages
         assistant_message = {
             "conversation_id": str(conversation["_id"]),
             "role": "assistant",
@@ -268,7 +440,7 @@ async def send_message(message: MessageCreate):
             "has_audio_response": False,
             "created_at": datetime.utcnow()
         }
-        assistant_msg_result = await db.messages.insert_one(assistant_message)
+        insert_result = await db.messages.insert_many([user_message, assistant_message], ordered=True)
         
         # Update conversation
         await db.conversations.update_one(
@@ -282,19 +454,37 @@ async def send_message(message: MessageCreate):
             }
         )
         
+        # Keep the cached context in step with what was just written
+        message_count = conversation.get("message_count", 0)
+        new_turns = [
+            {"role": "user", "text": message.text},
+            {"role": "assistant", "text": ai_response}
+        ]
+        context_cache.append_turns(
+            message.user_id,
+            new_turns,
+            message_count_inc=2,
+            current_track=track
+        )
+        
+        # Background: fold older turns into the rolling summary every few turns
+        summary_service.schedule(
+            conversation,
+            on_update=lambda conversation_id, fields: context_cache.update_conversation(message.user_id, **fields)
+        )
+        
         # Background: extract learnings (run async)
-        if conversation.get("message_count", 0) % 5 == 0:  # Every 5 messages
+        if message_count % 5 == 0:  # Every 5 messages
             # Note: In production, use a task queue like Celery
-            await learning_service.extract_and_update_learnings(
+            updated_learnings = await learning_service.extract_and_update_learnings(
                 user_id=message.user_id,
-                conversation_history=conversation_history + [
-                    {"role": "user", "text": message.text},
-                    {"role": "assistant", "text": ai_response}
-                ]
+                conversation_history=conversation_history + new_turns
             )
+            if updated_learnings is not None:
+                context_cache.set_learnings(message.user_id, updated_learnings)
         
         return MessageResponse(
-            id=str(assistant_msg_result.inserted_id),
+            id=str(insert_result.inserted_ids[1]),
             conversation_id=str(conversation["_id"]),
             role="assistant",
             text=ai_response,
@@ -304,6 +494,9 @@ async def send_message(message: MessageCreate):
             created_at=assistant_message["created_at"]
         )
     
+    except AdmissionRejectedError as e:
+        logger.warning(f"Chat turn rejected for {message.user_id}: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error in send_message: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -329,44 +522,47 @@ async def get_user_learnings(user_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/chat/history/{user_id}")
-async def get_chat_history(user_id: str, limit: int = 50):
-    """Get chat history for a user"""
-    conversation = await db.conversations.find_one({"user_id": user_id})
+async def get_chat_history(user_id: str, limit: int = 50, if_none_match: Optional[str] = Header(None)):
+    """Get chat history for a user. Answers 304 when If-None-Match still matches the conversation's ETag."""
+    conversation = await db.conversations.find_one(
+        {"user_id": user_id},
+        {"_id": 1, "message_count": 1, "updated_at": 1, "history_version": 1}
+    )
     if not conversation:
         return {"messages": []}
     
+    # Read before the messages, so a body is never older than the ETag it is sent with
+    etag = make_etag(
+        "history", conversation["_id"], conversation.get("message_count", 0),
+        conversation.get("updated_at"), conversation.get("history_version", 0), limit
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
     messages = await db.messages.find(
-        {"conversation_id": str(conversation["_id"])}
+        {"conversation_id": str(conversation["_id"])},
+        CHAT_HISTORY_PROJECTION
     ).sort("created_at", 1).limit(limit).to_list(limit)
     
-    formatted_messages = []
-    for msg in messages:
-        formatted_messages.append({
-            "id": str(msg["_id"]),
-            "role": msg["role"],
-            "text": msg["text"],
-            "track": msg.get("track"),
-            "is_voice": msg.get("is_voice", False),
-            "audio_duration": msg.get("audio_duration"),
-            "has_audio_response": msg.get("has_audio_response", False),
-            "created_at": msg["created_at"].isoformat()
-        })
-    
-    return {"messages": formatted_messages}
+    return FastJSONResponse({"messages": messages}, headers=etag_headers(etag))
 
 # ============================================================================
 # AUDIO ROUTES
 # ============================================================================
 
 @api_router.post("/audio/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    whisper_service: WhisperService = Depends(get_whisper_service)
+):
     """Transcribe audio file using Whisper API"""
     try:
         # Read file content
         content = await file.read()
         
         # Transcribe using Whisper
-        transcription = await whisper_service.transcribe(content, file.filename)
+        with span("whisper"):
+            transcription = await whisper_service.transcribe(content, file.filename)
         
         return {
             "success": True,
@@ -384,12 +580,14 @@ async def transcribe_audio(file: UploadFile = File(...)):
 @api_router.post("/audio/synthesize")
 async def synthesize_speech(
     text: str = Form(...),
-    voice: str = Form("alloy")
+    voice: str = Form("alloy"),
+    tts_service: TTSService = Depends(get_tts_service)
 ):
     """Synthesize speech from text using OpenAI TTS"""
     try:
         # Generate audio
-        audio_data = await tts_service.synthesize(text, voice)
+        with span("tts"):
+            audio_data = await tts_service.synthesize(text, voice)
         
         # Return audio as streaming response
         return StreamingResponse(
@@ -419,6 +617,7 @@ async def select_track(request: TrackSelectorRequest):
         {"_id": conversation["_id"]},
         {"$set": {"current_track": request.track, "updated_at": datetime.utcnow()}}
     )
+    context_cache.update_conversation(request.user_id, current_track=request.track)
     
     return {"success": True, "track": request.track}
 
@@ -427,46 +626,28 @@ async def select_track(request: TrackSelectorRequest):
 # ============================================================================
 
 @api_router.get("/intros/{user_id}")
-async def get_intros(user_id: str):
-    """Get intro suggestions for a user"""
-    intros = await db.intros.find(
-        {"$or": [{"from_user_id": user_id}, {"to_user_id": user_id}]}
-    ).sort("created_at", -1).to_list(20)
+async def get_intros(user_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get intro suggestions for a user. Answers 304 when none of the user's intros changed."""
+    query = {"$or": [{"from_user_id": user_id}, {"to_user_id": user_id}]}
+    # Taken before marking intros as notified: the next poll then sees the bump and gets is_new=false
+    etag = make_etag("intros", user_id, *await change_marker(db.intros, query))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    intros = await db.intros.find(query, INTRO_PROJECTION).sort("created_at", -1).to_list(20)
     
     formatted_intros = []
     intro_ids_to_mark = []
     
-    for intro in intros:
-        # Get other user info
-        other_user_id = intro["to_user_id"] if intro["from_user_id"] == user_id else intro["from_user_id"]
-        other_user = await db.users.find_one({"_id": ObjectId(other_user_id)})
-        
-        # Determine if this intro is new for the current user
-        is_new = False
-        if intro["from_user_id"] == user_id:
-            is_new = not intro.get("from_user_notified", False)
-            if is_new:
-                intro_ids_to_mark.append((intro["_id"], "from"))
-        else:
-            is_new = not intro.get("to_user_notified", False)
-            if is_new:
-                intro_ids_to_mark.append((intro["_id"], "to"))
-        
-        formatted_intros.append({
-            "id": str(intro["_id"]),
-            "from_user_id": intro["from_user_id"],
-            "to_user_id": intro["to_user_id"],
-            "other_user": {
-                "id": other_user_id,
-                "name": other_user.get("name", "User"),
-                "city": other_user.get("city"),
-                "current_role": other_user.get("current_role")
-            },
-            "reason": intro["reason"],
-            "status": intro["status"],
-            "is_new": is_new,
-            "created_at": intro["created_at"].isoformat()
-        })
+    # Get other users' profile cards in one batch
+    other_user_ids = [other_intro_user_id(intro, user_id) for intro in intros]
+    cards = await profile_cache.get_many(other_user_ids)
+    
+    for intro, other_user_id in zip(intros, other_user_ids):
+        # Intros new for the current user are marked as notified once shown
+        if intro_is_new(intro, user_id):
+            intro_ids_to_mark.append((intro["_id"], "from" if intro["from_user_id"] == user_id else "to"))
+        formatted_intros.append(intro_payload(intro, user_id, cards.get(other_user_id, {})))
     
     # Mark intros as notified
     for intro_id, user_type in intro_ids_to_mark:
@@ -481,7 +662,7 @@ async def get_intros(user_id: str):
                 {"$set": {"to_user_notified": True, "updated_at": datetime.utcnow()}}
             )
     
-    return {"intros": formatted_intros}
+    return FastJSONResponse({"intros": formatted_intros}, headers=etag_headers(etag))
 
 @api_router.post("/intros/action")
 async def intro_action(request: IntroActionRequest):
@@ -589,53 +770,52 @@ async def create_peer_conversation(from_user_id: str, to_user_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/peer/conversations/{user_id}")
-async def get_user_peer_conversations(user_id: str):
-    """Get all peer conversations for a user"""
+async def get_user_peer_conversations(user_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get all peer conversations for a user. Answers 304 when no conversation got a message since the ETag."""
     try:
         # Find all conversations where user is participant
-        conversations = await db.peer_conversations.find({
+        query = {
             "$or": [
                 {"user1_id": user_id},
                 {"user2_id": user_id}
             ]
-        }).sort("updated_at", -1).to_list(50)
+        }
+        # Every peer message bumps updated_at and message_count on its conversation
+        etag = make_etag("peer_conversations", user_id, *await change_marker(db.peer_conversations, query, "message_count"))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        
+        conversations = await db.peer_conversations.find(query).sort("updated_at", -1).to_list(50)
+        
+        # Get other users' profile cards in one batch
+        other_user_ids = [other_peer_user_id(conv, user_id) for conv in conversations]
+        cards = await profile_cache.get_many(other_user_ids)
         
         result = []
-        for conv in conversations:
-            # Get other user ID
-            other_user_id = conv["user2_id"] if conv["user1_id"] == user_id else conv["user1_id"]
-            
-            # Get other user info
-            other_user = await db.users.find_one({"_id": ObjectId(other_user_id)})
-            
+        for conv, other_user_id in zip(conversations, other_user_ids):
             # Get last message
             last_message = await db.peer_messages.find_one(
                 {"peer_conversation_id": str(conv["_id"])},
+                LAST_PEER_MESSAGE_PROJECTION,
                 sort=[("created_at", -1)]
             )
-            
-            result.append({
-                "conversation_id": str(conv["_id"]),
-                "other_user": {
-                    "id": other_user_id,
-                    "name": other_user.get("name", "User"),
-                    "city": other_user.get("city"),
-                    "current_role": other_user.get("current_role")
-                },
-                "last_message": last_message.get("text") if last_message else None,
-                "last_message_at": last_message.get("created_at").isoformat() if last_message else conv["created_at"].isoformat(),
-                "message_count": conv.get("message_count", 0)
-            })
+            result.append(peer_conversation_payload(conv, user_id, cards.get(other_user_id, {}), last_message))
         
-        return {"conversations": result}
+        return FastJSONResponse({"conversations": result}, headers=etag_headers(etag))
     
     except Exception as e:
         logger.error(f"Error getting peer conversations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/peer/messages", response_model=PeerMessageResponse)
-async def send_peer_message(message: PeerMessageCreate):
-    """Send a message in a peer conversation"""
+async def send_peer_message(message: PeerMessageCreate, idempotency_key: Optional[str] = Header(None)):
+    """Send a message in a peer conversation. Retries with the same Idempotency-Key are not re-sent."""
+    return await run_idempotent(
+        "peer_message", message.from_user_id, idempotency_key, message,
+        lambda: process_peer_message(message)
+    )
+
+async def process_peer_message(message: PeerMessageCreate) -> PeerMessageResponse:
     try:
         # Get or create conversation
         conversation = await db.peer_conversations.find_one({
@@ -663,7 +843,8 @@ async def send_peer_message(message: PeerMessageCreate):
             raise HTTPException(status_code=403, detail="This conversation has been ended")
         
         # Moderate message content
-        moderation_result = moderation_service.moderate(message.text)
+        with span("moderation"):
+            moderation_result = moderation_service.moderate(message.text)
         
         if not moderation_result["allowed"]:
             logger.warning(f"Message blocked from {message.from_user_id}: {moderation_result['reason']}")
@@ -711,20 +892,11 @@ async def get_peer_messages(conversation_id: str, limit: int = 50):
     """Get messages in a peer conversation"""
     try:
         messages = await db.peer_messages.find(
-            {"peer_conversation_id": conversation_id}
+            {"peer_conversation_id": conversation_id},
+            PEER_MESSAGE_PROJECTION
         ).sort("created_at", 1).limit(limit).to_list(limit)
         
-        formatted_messages = []
-        for msg in messages:
-            formatted_messages.append({
-                "id": str(msg["_id"]),
-                "from_user_id": msg["from_user_id"],
-                "to_user_id": msg["to_user_id"],
-                "text": msg["text"],
-                "created_at": msg["created_at"].isoformat()
-            })
-        
-        return {"messages": formatted_messages}
+        return FastJSONResponse({"messages": messages})
     
     except Exception as e:
         logger.error(f"Error getting peer messages: {str(e)}")
@@ -745,13 +917,16 @@ async def end_peer_conversation(conversation_id: str, user_id: str):
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Mark conversation as ended
+        ended_at = datetime.utcnow()
         await db.peer_conversations.update_one(
             {"_id": ObjectId(conversation_id)},
             {
                 "$set": {
                     "status": "ended",
                     "ended_by": user_id,
-                    "ended_at": datetime.utcnow()
+                    "ended_at": ended_at,
+                    # Bumped so the peer inbox ETag and /sync pick up the ended conversation
+                    "updated_at": ended_at
                 }
             }
         )
@@ -762,6 +937,29 @@ async def end_peer_conversation(conversation_id: str, user_id: str):
         logger.error(f"Error ending conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================================================
+# SYNC ROUTES
+# ============================================================================
+
+@api_router.get("/sync/{user_id}")
+async def sync_user(user_id: str, since: Optional[str] = None):
+    """
+    Everything that changed for a user since `since` (the sync_token of the previous response):
+    new chat messages, new/updated intros, changed peer conversations and the profile if it changed.
+    Without `since` it returns a full snapshot. Rows may repeat across syncs; merge them by id.
+    """
+    try:
+        result = await sync_service.sync(user_id, since)
+    except InvalidSyncTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error syncing user: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return FastJSONResponse(result)
+
 # ============================================================================
 # ADMIN ROUTES (Manual Matchmaking)
 # ============================================================================
@@ -771,17 +969,18 @@ async def get_all_users_for_admin():
     """Get all users for admin panel with message count and learnings status"""
     try:
         users = await db.users.find({}).sort("created_at", -1).to_list(500)
+        profile_cache.prime(users)
         
         formatted_users = []
         for user in users:
             user_id = str(user["_id"])
             
             # Get conversation to check message count
-            conversation = await db.conversations.find_one({"user_id": user_id})
+            conversation = await db.conversations.find_one({"user_id": user_id}, {"message_count": 1})
             message_count = conversation.get("message_count", 0) if conversation else 0
             
             # Check if learnings exist
-            learnings = await db.learnings.find_one({"user_id": user_id})
+            learnings = await db.learnings.find_one({"user_id": user_id}, {"_id": 1})
             has_learnings = learnings is not None
             
             formatted_users.append({
@@ -793,10 +992,10 @@ async def get_all_users_for_admin():
                 "open_to_intros": user.get("open_to_intros", True),
                 "message_count": message_count,
                 "learnings_count": 1 if has_learnings else 0,
-                "created_at": user["created_at"].isoformat() if "created_at" in user else None
+                "created_at": user.get("created_at")
             })
         
-        return {"users": formatted_users}
+        return FastJSONResponse({"users": formatted_users})
     
     except Exception as e:
         logger.error(f"Error getting users for admin: {str(e)}")
@@ -810,6 +1009,7 @@ async def get_potential_matches_for_admin(user_id: str):
         users = await db.users.find({
             "_id": {"$ne": ObjectId(user_id)}
         }).to_list(500)
+        profile_cache.prime(users)
         
         # Filter out users who already have intros with this user
         existing_intros = await db.intros.find({
@@ -846,6 +1046,131 @@ async def get_potential_matches_for_admin(user_id: str):
         logger.error(f"Error getting matches for admin: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/indexes")
+async def get_index_drift_admin():
+    """Report drift between declared and actual MongoDB indexes"""
+    try:
+        drift = await index_service.check_drift()
+        return {"in_sync": not drift, "drift": drift}
+    
+    except Exception as e:
+        logger.error(f"Error checking index drift: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats_admin():
+    """Hit ratios and sizes of in-process caches"""
+    return {
+        "profile_cards": profile_cache.stats(),
+        "conversation_contexts": context_cache.stats()
+    }
+
+@api_router.get("/admin/parse-stats")
+async def get_parse_stats_admin():
+    """Structured-output parse outcomes and failure rates per LLM purpose"""
+    return {"parse_stats": get_parse_stats()}
+
+@api_router.get("/admin/llm-stats")
+async def get_llm_stats_admin(hours: float = 24):
+    """LLM call latency percentiles, token estimates and outcomes, overall and per purpose"""
+    try:
+        stats = await llm_ledger.summarize(hours)
+        stats["ledger"] = llm_ledger.stats()
+        # Duplicate submissions answered without another LLM call
+        stats["idempotency"] = idempotency_service.stats()
+        return stats
+    
+    except Exception as e:
+        logger.error(f"Error getting LLM stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/admin/route-stats")
+async def get_route_stats_admin():
+    """Chat turn routing counts and hit rates (pool / light / full), plus track classifier usage"""
+    return {"routes": turn_router.stats(), "track_classifier": gemini_service.track_classifier.stats()}
+
+@api_router.get("/admin/admission-stats")
+async def get_admission_stats_admin():
+    """LLM admission control: in-flight calls, queue depth, waits and rejections per priority class"""
+    if llm_client.admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_client.admission.stats()}
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Diagnostics can slow the whole process and expose internals, so they need ADMIN_TOKEN (X-Admin-Token)"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@api_router.get("/admin/memory", dependencies=[Depends(require_admin_token)])
+async def get_memory_admin():
+    """Process RSS, tracemalloc status, retained snapshots and sizes of in-process caches"""
+    return await asyncio.to_thread(memory_diagnostics.summary)
+
+@api_router.post("/admin/memory/tracemalloc", dependencies=[Depends(require_admin_token)])
+async def toggle_tracemalloc_admin(enabled: bool = True, frames: int = 25):
+    """Start or stop tracemalloc; tracing adds CPU and memory overhead, so stop it when done"""
+    return memory_diagnostics.start(frames) if enabled else memory_diagnostics.stop()
+
+@api_router.post("/admin/memory/snapshots", dependencies=[Depends(require_admin_token)])
+async def take_memory_snapshot_admin(label: Optional[str] = None, limit: int = 20):
+    """Take a tracemalloc snapshot and return its top allocation sites"""
+    try:
+        snapshot = await asyncio.to_thread(memory_diagnostics.take_snapshot, label)
+        top = await asyncio.to_thread(memory_diagnostics.top, snapshot["id"], "lineno", limit)
+        return {**snapshot, "top": top}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.get("/admin/memory/snapshots/{snapshot_id}", dependencies=[Depends(require_admin_token)])
+async def get_memory_snapshot_admin(snapshot_id: int, key_type: str = "lineno", limit: int = 20):
+    """Top allocation sites of a retained snapshot, grouped by lineno, filename or traceback"""
+    try:
+        return {"top": await asyncio.to_thread(memory_diagnostics.top, snapshot_id, key_type, limit)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/admin/memory/diff", dependencies=[Depends(require_admin_token)])
+async def diff_memory_snapshots_admin(from_id: int, to_id: int, key_type: str = "lineno", limit: int = 20):
+    """Allocation sites that grew the most between two snapshots"""
+    try:
+        return {"diff": await asyncio.to_thread(memory_diagnostics.diff, from_id, to_id, key_type, limit)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def require_profiles_access(
+    x_admin_token: Optional[str] = Header(None),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """Captured profiles show code paths and request details: ADMIN_TOKEN or the PROFILING_TOKEN that triggers them"""
+    if request_profiler.token_matches(x_profile_token):
+        return
+    require_admin_token(x_admin_token)
+
+@api_router.get("/admin/profiles", dependencies=[Depends(require_profiles_access)])
+async def list_profiles_admin(limit: int = 100):
+    """Request profiles captured via PROFILING_ROUTES sampling or the X-Profile-Token header, newest first"""
+    return {
+        "profiler": request_profiler.stats(),
+        "captures": await asyncio.to_thread(request_profiler.list_captures, limit)
+    }
+
+@api_router.get("/admin/profiles/{capture_id}", dependencies=[Depends(require_profiles_access)])
+async def download_profile_admin(capture_id: str):
+    """Folded stacks for one capture; feed to flamegraph.pl or drop into speedscope"""
+    path = request_profiler.capture_path(capture_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    content = await asyncio.to_thread(path.read_text)
+    return PlainTextResponse(
+        content,
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.folded"'}
+    )
+
 class AdminIntroCreate(BaseModel):
     from_user_id: str
     to_user_id: str
@@ -1110,6 +1435,66 @@ async def admin_panel(password: str = None):
 # Include router
 app.include_router(api_router)
 
+# ============================================================================
+# METRICS
+# ============================================================================
+
+REGISTRY.gauge(
+    "chekinn_llm_in_flight", "LLM calls currently holding an admission slot", (),
+    lambda: {(): llm_client.admission.in_flight} if llm_client.admission is not None else {}
+)
+REGISTRY.gauge(
+    "chekinn_llm_queue_depth", "LLM calls waiting for a slot, by priority class", ("priority",),
+    lambda: {(name,): depth for name, depth in llm_client.admission.queue_depths().items()}
+    if llm_client.admission is not None else {}
+)
+REGISTRY.gauge(
+    "chekinn_cache_entries", "Entries in in-process caches", ("cache",),
+    lambda: {("profile_cards",): profile_cache.stats()["size"], ("conversation_contexts",): context_cache.stats()["size"]}
+)
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-route latency histogram plus a Server-Timing header with the request's stage breakdown"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    token, spans = start_request()
+    capture = start_profile(request) if request_profiler.enabled else None
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = server_timing(spans, time.perf_counter() - started)
+        return response
+    finally:
+        # Route templates keep label cardinality bounded; unmatched paths share one label
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        elapsed = time.perf_counter() - started
+        REQUEST_DURATION.observe(elapsed, request.method, route_path, str(status))
+        if capture is not None:
+            profile = request_profiler.finish(capture, request.method, route_path, status, elapsed, spans)
+            asyncio.get_running_loop().run_in_executor(None, request_profiler.write, profile)
+        end_request(token)
+
+def start_profile(request: Request):
+    """Begin sampling this request if its route is sampled or it carries the profiling token"""
+    # Routing hasn't run yet, so resolve the route template the same way the router will
+    route_path = None
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            route_path = route.path
+            break
+    reason = request_profiler.should_profile(request.method, route_path, request.headers.get("x-profile-token"))
+    return request_profiler.begin(reason) if reason else None
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition"""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -1117,12 +1502,10 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the web client read ETags for conditional polling
+    expose_headers=["ETag"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0  # a user is waiting on the reply
+PRIORITY_BACKGROUND = 1   # extraction and summaries triggered by chat
+PRIORITY_BATCH = 2        # matching runs
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+    PRIORITY_BATCH: "batch",
+}
+
+# LLM purpose -> priority class; "<purpose>_repair" calls inherit their parent's class
+PURPOSE_PRIORITY = {
+    "chat": PRIORITY_INTERACTIVE,
+    "chat_light": PRIORITY_INTERACTIVE,
+    "learning_extraction": PRIORITY_BACKGROUND,
+    "summary": PRIORITY_BACKGROUND,
+    "matching": PRIORITY_BATCH,
+}
+
+# Longest a call may wait for a slot before it is shed
+QUEUE_TIMEOUTS = {
+    PRIORITY_INTERACTIVE: 10.0,
+    PRIORITY_BACKGROUND: 30.0,
+    PRIORITY_BATCH: 120.0,
+}
+
+
+# (controller, task) holding a slot in this context; tasks spawned inside inherit the value but
+# aren't the holder, so they still queue for their own slot
+_held_slot = ContextVar("admission_held_slot", default=None)
+
+
+class AdmissionRejectedError(Exception):
+    """No LLM capacity for this call right now"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def priority_for(purpose: str) -> int:
+    if purpose.endswith("_repair"):
+        purpose = purpose[:-len("_repair")]
+    return PURPOSE_PRIORITY.get(purpose, PRIORITY_BACKGROUND)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency for LLM calls. Waiting calls are served strictly by priority class and
+    round-robin across users within a class; some slots are held back for interactive turns.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        interactive_reserved: int = 4,
+        max_queue_depth: int = 100,
+        max_queued_per_user: int = 10,
+        queue_timeouts: dict = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.interactive_reserved = min(interactive_reserved, max_concurrency - 1)
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeouts = queue_timeouts or QUEUE_TIMEOUTS
+        self.in_flight = 0
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}  # user -> deque of futures
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._service_time = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.rejected = {priority: 0 for priority in PRIORITY_NAMES}
+        self.timed_out = {priority: 0 for priority in PRIORITY_NAMES}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            interactive_reserved=int(os.getenv("LLM_INTERACTIVE_RESERVED", "4")),
+            max_queue_depth=int(os.getenv("LLM_QUEUE_DEPTH", "100")),
+            max_queued_per_user=int(os.getenv("LLM_QUEUE_PER_USER", "10"))
+        )
+
+    def _limit(self, priority: int) -> int:
+        # Background and batch work can never take the slots held back for chat
+        if priority == PRIORITY_INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.interactive_reserved
+
+    def _can_start(self, priority: int) -> bool:
+        if self.in_flight >= self._limit(priority):
+            return False
+        # Don't jump ahead of anyone already waiting at the same or a higher priority
+        return all(self._depth[p] == 0 for p in PRIORITY_NAMES if p <= priority)
+
+    def retry_after(self, priority: int) -> int:
+        ahead = sum(self._depth[p] for p in PRIORITY_NAMES if p <= priority) + 1
+        return max(1, math.ceil(ahead * self._service_time / max(self._limit(priority), 1)))
+
+    def check(self, purpose: str, user_id: str = None):
+        """Raise AdmissionRejectedError now if a call for this purpose would be rejected on arrival"""
+        priority = priority_for(purpose)
+        if self._can_start(priority):
+            return
+        self._check_queue(priority, user_id)
+
+    def _check_queue(self, priority: int, user_id: str):
+        waiters = self._queues[priority].get(user_id)
+        if self._depth[priority] >= self.max_queue_depth:
+            reason = f"LLM queue full for {PRIORITY_NAMES[priority]} work"
+        elif waiters is not None and len(waiters) >= self.max_queued_per_user:
+            reason = "Too many queued requests for this user"
+        else:
+            return
+        raise AdmissionRejectedError(reason, retry_after=self.retry_after(priority))
+
+    @asynccontextmanager
+    async def slot(self, purpose: str, user_id: str = None):
+        """Hold one LLM slot for the duration of the block; nested blocks in the same task reuse it"""
+        holder = (self, asyncio.current_task())
+        held = _held_slot.get()
+        if held is not None and held[0] is self and held[1] is holder[1]:
+            yield
+            return
+        await self.acquire(purpose, user_id)
+        token = _held_slot.set(holder)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            _held_slot.reset(token)
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self.release()
+
+    async def acquire(self, purpose: str, user_id: str = None):
+        priority = priority_for(purpose)
+        if self._can_start(priority):
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            self._waits[priority].append(0.0)
+            return
+
+        try:
+            self._check_queue(priority, user_id)
+        except AdmissionRejectedError:
+            self.rejected[priority] += 1
+            raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_id, deque()).append(future)
+        self._depth[priority] += 1
+        enqueued = time.monotonic()
+        try:
+            # release() hands the slot over by resolving the future (in_flight already counted)
+            await asyncio.wait_for(future, timeout=self.queue_timeouts[priority])
+        except asyncio.TimeoutError:
+            self._remove(priority, user_id, future)
+            if future.done() and not future.cancelled():
+                # The slot was granted just as the wait timed out; hand it back
+                self.release()
+            self.timed_out[priority] += 1
+            raise AdmissionRejectedError(
+                f"Timed out waiting for LLM capacity ({PRIORITY_NAMES[priority]})",
+                retry_after=self.retry_after(priority)
+            )
+        except asyncio.CancelledError:
+            self._remove(priority, user_id, future)
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled
+                self.release()
+            raise
+        self.admitted[priority] += 1
+        self._waits[priority].append(time.monotonic() - enqueued)
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _remove(self, priority: int, user_id: str, future):
+        waiters = self._queues[priority].get(user_id)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self._depth[priority] -= 1
+            if not waiters:
+                del self._queues[priority][user_id]
+
+    def _dispatch(self):
+        for priority in sorted(PRIORITY_NAMES):
+            queue = self._queues[priority]
+            while queue and self.in_flight < self._limit(priority):
+                # Round-robin: serve the user at the head, then move them to the back
+                user_id, waiters = next(iter(queue.items()))
+                future = waiters.popleft()
+                self._depth[priority] -= 1
+                if waiters:
+                    queue.move_to_end(user_id)
+                else:
+                    del queue[user_id]
+                if future.done():
+                    continue
+                self.in_flight += 1
+                future.set_result(None)
+            if queue:
+                # Lower classes wait until this one drains
+                return
+
+    def queue_depths(self) -> dict:
+        return {name: self._depth[priority] for priority, name in PRIORITY_NAMES.items()}
+
+    def stats(self) -> dict:
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            classes[name] = {
+                "queued": self._depth[priority],
+                "queued_users": len(self._queues[priority]),
+                "admitted": self.admitted[priority],
+                "rejected": self.rejected[priority],
+                "timed_out": self.timed_out[priority],
+                "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                "wait_ms_p95": round(waits[min(int(len(waits) * 0.95), len(waits) - 1)] * 1000, 1) if waits else None,
+            }
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "interactive_reserved": self.interactive_reserved,
+            "avg_slot_seconds": round(self._service_time, 3),
+            "classes": classes
+        }
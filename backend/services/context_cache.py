@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate_size(value) -> int:
+    """Rough size in bytes of a cached value (text dominates)"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class ConversationContext:
+    """Everything send_message needs for one user: profile, conversation, learnings, recent turns"""
+
+    __slots__ = ("user", "conversation", "learnings", "turns", "expires_at", "size")
+
+    def __init__(self, user: dict, conversation: dict, learnings: dict, turns: list, max_turns: int):
+        self.user = user
+        self.conversation = conversation
+        self.learnings = learnings
+        self.turns = deque(turns, maxlen=max_turns)
+        self.expires_at = 0.0
+        self.size = 0
+
+    def recompute_size(self) -> int:
+        self.size = (
+            _estimate_size(self.user)
+            + _estimate_size(self.conversation)
+            + _estimate_size(self.learnings)
+            + sum(len(turn["text"]) for turn in self.turns)
+        )
+        return self.size
+
+
+class ConversationContextCache:
+    """Per-user LRU of chat contexts, updated write-through by the chat path"""
+
+    def __init__(
+        self,
+        max_users: int = 1000,
+        max_turns: int = 20,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 600
+    ):
+        self.max_users = max_users
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # user_id -> ConversationContext
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str):
+        """Return the cached context, or None on miss/expiry"""
+        context = self._entries.get(user_id)
+        if context is None or context.expires_at <= time.monotonic():
+            if context is not None:
+                self._remove(user_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return context
+
+    def put(self, user_id: str, user: dict, conversation: dict, learnings: dict, turns: list) -> ConversationContext:
+        """Store a freshly loaded context"""
+        context = ConversationContext(user, conversation, learnings, turns, self.max_turns)
+        self._remove(user_id)
+        self._entries[user_id] = context
+        self._touch(user_id, context)
+        return context
+
+    def append_turns(self, user_id: str, turns: list, message_count_inc: int = 0, **conversation_fields):
+        """Write-through after messages are saved"""
+        context = self._entries.get(user_id)
+        if context is None:
+            return
+        context.turns.extend(turns)
+        context.conversation.update(conversation_fields)
+        context.conversation["message_count"] = context.conversation.get("message_count", 0) + message_count_inc
+        self._touch(user_id, context)
+
+    def update_conversation(self, user_id: str, **fields):
+        """Write-through after the conversation document is updated"""
+        context = self._entries.get(user_id)
+        if context is None:
+            return
+        context.conversation.update(fields)
+        self._touch(user_id, context)
+
+    def set_learnings(self, user_id: str, learnings: dict):
+        """Write-through after learnings are saved"""
+        context = self._entries.get(user_id)
+        if context is None:
+            return
+        context.learnings = learnings
+        self._touch(user_id, context)
+
+    def invalidate(self, user_id: str):
+        self._remove(user_id)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_users": self.max_users,
+            "max_turns": self.max_turns,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _touch(self, user_id: str, context: ConversationContext):
+        # Refresh TTL and size accounting, then evict least recently used entries over the limits
+        self.total_bytes -= context.size
+        self.total_bytes += context.recompute_size()
+        context.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_users or self.total_bytes > self.max_bytes
+        ):
+            oldest_user_id = next(iter(self._entries))
+            self._remove(oldest_user_id)
+            self.evictions += 1
+
+    def _remove(self, user_id: str):
+        context = self._entries.pop(user_id, None)
+        if context is not None:
+            self.total_bytes -= context.size
@@ -0,0 +1,61 @@
+import hashlib
+
+from starlette.responses import Response
+
+# Polling clients must revalidate every time; the ETag makes that a cheap 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag from a resource's change markers (ids, counts, updated_at). Weak because it is
+    derived from metadata rather than the response bytes.
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored and "*" matches anything"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+async def change_marker(collection, query: dict, sum_field: str = None) -> tuple:
+    """
+    (count, latest updated_at[, sum of sum_field]) over the matching documents in one aggregation.
+    Any insert, delete or updated_at bump changes it.
+    """
+    group = {"_id": None, "count": {"$sum": 1}, "updated_at": {"$max": "$updated_at"}}
+    # Without _id the match can be answered from an index on (filter field, updated_at) alone
+    projection = {"_id": 0, "updated_at": 1}
+    if sum_field:
+        group["total"] = {"$sum": f"${sum_field}"}
+        projection[sum_field] = 1
+    rows = await collection.aggregate([
+        {"$match": query},
+        {"$project": projection},
+        {"$group": group}
+    ]).to_list(1)
+    if not rows:
+        return (0, None, 0) if sum_field else (0, None)
+    row = rows[0]
+    return (row["count"], row["updated_at"], row["total"]) if sum_field else (row["count"], row["updated_at"])
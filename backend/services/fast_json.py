@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same output, only slower
+    orjson = None
+
+
+def _default(value):
+    # Mongo documents carry ObjectIds; datetimes only reach here on the stdlib path
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """
+    JSON-encode API payloads straight from Mongo rows: naive datetimes come out exactly like
+    .isoformat() and ObjectIds as strings, matching what the field-by-field formatting produced.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that skips FastAPI's jsonable_encoder pass. Return it from list endpoints whose
+    rows are already JSON-shaped (see the projections in server.py); the body is encoded once.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
@@ -1,37 +1,33 @@
-import os
-from dotenv import load_dotenv
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from prompts.orchestrator import get_system_prompt
+from prompts.orchestrator import LIGHT_PROMPT, build_prompt_parts
+from services.admission_control import AdmissionRejectedError
+from services.llm_client import LLMClient
+from services.track_classifier import TrackClassifier
 import logging
-import json
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 class GeminiService:
-    def __init__(self):
-        self.api_key = os.getenv("EMERGENT_LLM_KEY")
-        if not self.api_key:
-            raise ValueError("EMERGENT_LLM_KEY not found in environment")
+    def __init__(self, llm_client: LLMClient = None):
+        self.llm_client = llm_client or LLMClient.from_env()
+        self.track_classifier = TrackClassifier()
     
     async def generate_response(
         self,
         user_message: str,
         conversation_history: list = None,
         user_context: dict = None,
-        learnings: dict = None
+        learnings: dict = None,
+        summary: str = None,
+        user_id: str = None
     ) -> str:
         """Generate AI response using Gemini"""
         try:
-            # Build system prompt
-            system_prompt = get_system_prompt(user_context, learnings)
-            
-            # Create chat instance
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=f"user_{user_context.get('name', 'unknown')}",
-                system_message=system_prompt
-            ).with_model("gemini", "gemini-2.5-flash")
+            # Static instructions go in the system message (a cacheable prefix); the user context
+            # and the learnings most relevant to this turn go in front of the message
+            recent_text = " ".join(msg["text"] for msg in (conversation_history or [])[-3:])
+            system_prompt, context_suffix = build_prompt_parts(
+                user_context, learnings, query=f"{user_message} {recent_text}"
+            )
             
             # Build conversation context
             full_message = user_message
@@ -43,14 +39,61 @@ class GeminiService:
                 ])
                 full_message = f"Previous context:\n{context_text}\n\nUser: {user_message}"
             
-            # Create user message
-            message = UserMessage(text=full_message)
+            # Older turns are carried by the rolling summary instead of being replayed
+            if summary:
+                full_message = f"Summary of earlier conversation:\n{summary}\n\n{full_message}"
+            
+            if context_suffix:
+                full_message = f"{context_suffix.strip()}\n\n{full_message}"
             
             # Get response
-            response = await chat.send_message(message)
+            response = await self.llm_client.complete(
+                system_message=system_prompt,
+                message=full_message,
+                purpose="chat",
+                session_id=f"user_{user_context.get('name', 'unknown')}",
+                user_id=user_id
+            )
             
             return response
         
+        except AdmissionRejectedError:
+            # Surfaced as a 429 instead of a canned reply
+            raise
+        except Exception as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            return "I'm having trouble connecting right now. Could you try again?"
+    
+    async def generate_light_response(
+        self,
+        user_message: str,
+        conversation_history: list = None,
+        user_context: dict = None,
+        user_id: str = None,
+        model: str = None
+    ) -> str:
+        """Generate a short reply for trivial or playful turns with the light prompt"""
+        try:
+            recent = (conversation_history or [])[-2:]
+            context_text = "\n".join([f"{msg['role']}: {msg['text']}" for msg in recent])
+            name = (user_context or {}).get("name", "there")
+            full_message = f"User's name: {name}\n"
+            if context_text:
+                full_message += f"Previous context:\n{context_text}\n"
+            full_message += f"\nUser: {user_message}"
+            
+            return await self.llm_client.complete(
+                system_message=LIGHT_PROMPT,
+                message=full_message,
+                purpose="chat_light",
+                session_id=f"user_{name}",
+                model=model,
+                user_id=user_id
+            )
+        
+        except AdmissionRejectedError:
+            # Surfaced as a 429 instead of a canned reply
+            raise
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
             return "I'm having trouble connecting right now. Could you try again?"
@@ -58,23 +101,10 @@ class GeminiService:
     async def detect_track(self, message: str, conversation_history: list = None) -> str:
         """Detect conversation track"""
         try:
-            # Simple keyword-based detection (can be enhanced with AI)
-            message_lower = message.lower()
-            
-            # CAT/MBA keywords
-            cat_keywords = ['cat', 'mba', 'iim', 'mock test', 'percentile', 'admission', 'gmat', 'entrance']
-            if any(keyword in message_lower for keyword in cat_keywords):
-                return 'cat_mba'
-            
-            # Jobs/Career keywords
-            career_keywords = ['job', 'career', 'role', 'interview', 'salary', 'promotion', 'company', 'manager', 'switch']
-            if any(keyword in message_lower for keyword in career_keywords):
-                return 'jobs_career'
-            
-            # Roast/Play keywords
-            roast_keywords = ['roast', 'roast me', 'bored', 'fun', 'joke']
-            if any(keyword in message_lower for keyword in roast_keywords):
-                return 'roast_play'
+            # Trained model when available and confident, keyword rules otherwise
+            track = self.track_classifier.classify(message)
+            if track:
+                return track
             
             # Default: check conversation history for context
             if conversation_history:
@@ -87,3 +117,7 @@ class GeminiService:
         except Exception as e:
             logger.error(f"Track detection error: {str(e)}")
             return None
+    
+    def detect_tracks_many(self, messages: list) -> list:
+        """Detect tracks for a batch of messages (no history fallback)"""
+        return self.track_classifier.classify_many(messages)
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    """The Idempotency-Key can't be used for this request"""
+
+
+class IdempotencyConflictError(IdempotencyError):
+    """The key was already used with a different request body"""
+
+
+class IdempotencyInProgressError(IdempotencyError):
+    """Another request with the same key is still running"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def fingerprint(payload) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def to_jsonable(result):
+    # Pydantic response models are stored in their JSON form
+    return result.model_dump(mode="json") if hasattr(result, "model_dump") else result
+
+
+class IdempotencyService:
+    """
+    Runs a handler at most once per (scope, user, Idempotency-Key). Completed responses are stored in
+    `idempotency_keys` (expired by a TTL index) and replayed; concurrent duplicates wait for the first.
+    """
+
+    def __init__(self, db, lock_timeout: float = 120.0, wait_timeout: float = 30.0, poll_interval: float = 0.2):
+        self.db = db
+        # A pending key older than this is assumed orphaned (e.g. the process died) and can be taken over
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._inflight = {}  # key id -> Future resolving to the stored record, or None if the leader failed
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+        self.conflicts = 0
+
+    async def run(self, scope: str, user_id: str, key: str, payload, handler) -> tuple:
+        """Return (response, replayed). Without a key the handler just runs."""
+        if not key:
+            return await handler(), False
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        key_id = f"{scope}:{user_id}:{key}"
+        request_fingerprint = fingerprint(payload)
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            # Same-process duplicate: wait on the leader directly instead of polling Mongo
+            future = self._inflight.get(key_id)
+            if future is not None:
+                self.coalesced += 1
+                record = await asyncio.shield(future)
+                if record is not None:
+                    return self._replay(record, request_fingerprint), True
+                continue
+
+            if await self._claim(key_id, scope, user_id, request_fingerprint):
+                return await self._execute(key_id, request_fingerprint, handler), False
+
+            record = await self._wait_for_completion(key_id, request_fingerprint, deadline)
+            if record is not None:
+                return self._replay(record, request_fingerprint), True
+            # The first attempt failed and released the key; try to claim it ourselves
+
+    async def _claim(self, key_id: str, scope: str, user_id: str, request_fingerprint: str) -> bool:
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=self.lock_timeout)
+        try:
+            await self.db.idempotency_keys.insert_one({
+                "_id": key_id,
+                "scope": scope,
+                "user_id": user_id,
+                "fingerprint": request_fingerprint,
+                "status": "pending",
+                "locked_until": locked_until,
+                "created_at": now
+            })
+            return True
+        except DuplicateKeyError:
+            pass
+        taken = await self.db.idempotency_keys.update_one(
+            {"_id": key_id, "status": "pending", "fingerprint": request_fingerprint, "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": locked_until}}
+        )
+        return taken.modified_count == 1
+
+    async def _execute(self, key_id: str, request_fingerprint: str, handler):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key_id] = future
+        record = None
+        try:
+            result = await handler()
+            record = {"fingerprint": request_fingerprint, "response": to_jsonable(result)}
+            self.executed += 1
+            try:
+                await self.db.idempotency_keys.update_one(
+                    {"_id": key_id},
+                    {"$set": {"status": "done", "response": record["response"], "completed_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                # The work is done; a lost record only means a later replay may wait for the lock to expire
+                logger.error(f"Failed to store idempotent response {key_id}: {str(e)}")
+            return result
+        except BaseException:
+            # Release the key so the client's retry can run
+            await self.db.idempotency_keys.delete_one({"_id": key_id, "status": "pending"})
+            raise
+        finally:
+            if self._inflight.get(key_id) is future:
+                del self._inflight[key_id]
+            future.set_result(record)
+
+    async def _wait_for_completion(self, key_id: str, request_fingerprint: str, deadline: float):
+        """The completed record, or None if the key was released"""
+        while True:
+            record = await self.db.idempotency_keys.find_one({"_id": key_id})
+            if record is None:
+                return None
+            if record.get("fingerprint") != request_fingerprint:
+                self.conflicts += 1
+                raise IdempotencyConflictError("Idempotency-Key was already used with a different request")
+            if record.get("status") == "done":
+                return record
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    def _replay(self, record: dict, request_fingerprint: str):
+        if record["fingerprint"] != request_fingerprint:
+            self.conflicts += 1
+            raise IdempotencyConflictError("Idempotency-Key was already used with a different request")
+        self.replayed += 1
+        return record["response"]
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "conflicts": self.conflicts,
+            "inflight": len(self._inflight)
+        }
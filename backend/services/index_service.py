@@ -0,0 +1,127 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Declarative index registry: collection -> index specs.
+# Every index is named explicitly so drift detection can compare by name.
+INDEXES = {
+    "users": [
+        {"name": "created_at_desc", "keys": [("created_at", DESCENDING)]},
+        {"name": "open_to_intros_city", "keys": [("open_to_intros", ASCENDING), ("city", ASCENDING)]},
+    ],
+    "conversations": [
+        # One AI conversation per user
+        {"name": "user_id_unique", "keys": [("user_id", ASCENDING)], "unique": True},
+        {"name": "updated_at_desc", "keys": [("updated_at", DESCENDING)]},
+    ],
+    "messages": [
+        {"name": "conversation_id_created_at", "keys": [("conversation_id", ASCENDING), ("created_at", ASCENDING)]},
+        {"name": "track", "keys": [("track", ASCENDING)]},
+    ],
+    "learnings": [
+        # One learnings document per user
+        {"name": "user_id_unique", "keys": [("user_id", ASCENDING)], "unique": True},
+    ],
+    "intros": [
+        {"name": "from_user_id_created_at", "keys": [("from_user_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"name": "to_user_id_created_at", "keys": [("to_user_id", ASCENDING), ("created_at", DESCENDING)]},
+        # Cover the ETag change marker of GET /intros/{user_id}
+        {"name": "from_user_id_updated_at", "keys": [("from_user_id", ASCENDING), ("updated_at", DESCENDING)]},
+        {"name": "to_user_id_updated_at", "keys": [("to_user_id", ASCENDING), ("updated_at", DESCENDING)]},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+    ],
+    "peer_conversations": [
+        {"name": "user1_id_user2_id", "keys": [("user1_id", ASCENDING), ("user2_id", ASCENDING)]},
+        {"name": "user2_id", "keys": [("user2_id", ASCENDING)]},
+        {"name": "updated_at_desc", "keys": [("updated_at", DESCENDING)]},
+        # Per-side ranges for /api/sync
+        {"name": "user1_id_updated_at", "keys": [("user1_id", ASCENDING), ("updated_at", DESCENDING)]},
+        {"name": "user2_id_updated_at", "keys": [("user2_id", ASCENDING), ("updated_at", DESCENDING)]},
+    ],
+    "llm_calls": [
+        # Append-only ledger; rows expire after 90 days
+        {"name": "created_at_ttl", "keys": [("created_at", ASCENDING)], "expireAfterSeconds": 90 * 24 * 3600},
+        {"name": "purpose_created_at", "keys": [("purpose", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "idempotency_keys": [
+        # Stored responses are replayable for 24 hours
+        {"name": "created_at_ttl", "keys": [("created_at", ASCENDING)], "expireAfterSeconds": 24 * 3600},
+    ],
+    "peer_messages": [
+        {"name": "peer_conversation_id_created_at", "keys": [("peer_conversation_id", ASCENDING), ("created_at", ASCENDING)]},
+    ],
+}
+
+# Index options we declare and therefore compare when checking drift
+COMPARED_OPTIONS = ["unique", "sparse", "expireAfterSeconds", "partialFilterExpression"]
+
+
+def _index_model(spec: dict) -> IndexModel:
+    options = {key: spec[key] for key in COMPARED_OPTIONS if key in spec}
+    return IndexModel(spec["keys"], name=spec["name"], **options)
+
+
+def _spec_matches(spec: dict, info: dict) -> bool:
+    """Compare a declared spec with an entry from index_information()"""
+    actual_keys = [
+        (field, int(direction) if isinstance(direction, (int, float)) else direction)
+        for field, direction in info.get("key", [])
+    ]
+    if actual_keys != list(spec["keys"]):
+        return False
+    if bool(spec.get("unique")) != bool(info.get("unique")) or bool(spec.get("sparse")) != bool(info.get("sparse")):
+        return False
+    for option in ["expireAfterSeconds", "partialFilterExpression"]:
+        if spec.get(option) != info.get(option):
+            return False
+    return True
+
+
+class IndexService:
+    """Applies the declared index registry and reports drift"""
+
+    def __init__(self, db, registry: dict = None):
+        self.db = db
+        self.registry = registry or INDEXES
+
+    async def ensure_indexes(self) -> dict:
+        """Create every declared index (idempotent). Returns created/failed names per collection."""
+        report = {}
+        for collection, specs in self.registry.items():
+            created, failed = [], []
+            for spec in specs:
+                try:
+                    await self.db[collection].create_indexes([_index_model(spec)])
+                    created.append(spec["name"])
+                except OperationFailure as e:
+                    # e.g. duplicates blocking a unique index, or a conflicting index with the same keys
+                    logger.error(f"Index {collection}.{spec['name']} failed: {str(e)}")
+                    failed.append({"name": spec["name"], "error": str(e)})
+            report[collection] = {"ensured": created, "failed": failed}
+        logger.info(f"Ensured indexes on {len(self.registry)} collections")
+        return report
+
+    async def check_drift(self) -> dict:
+        """Compare declared indexes with the actual ones. Only collections with drift are returned."""
+        drift = {}
+        for collection, specs in self.registry.items():
+            actual = await self.db[collection].index_information()
+            actual.pop("_id_", None)
+
+            declared = {spec["name"]: spec for spec in specs}
+            missing = [name for name in declared if name not in actual]
+            extra = [name for name in actual if name not in declared]
+            mismatched = [
+                name for name, spec in declared.items()
+                if name in actual and not _spec_matches(spec, actual[name])
+            ]
+
+            if missing or extra or mismatched:
+                drift[collection] = {
+                    "missing": missing,
+                    "extra": extra,
+                    "mismatched": mismatched
+                }
+        return drift
@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import math
+import re
+import asyncio
+from datetime import datetime
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+# Maximum entries kept per learnings field after compaction
+FIELD_CAPS = {
+    "big_rocks": 10,
+    "recurring_themes": 10,
+    "constraints": 10,
+    "emotional_patterns": 10,
+    "important_people": 20,
+    "life_events": 20,
+}
+
+# Which attribute identifies an object entry
+OBJECT_TEXT_KEYS = {
+    "important_people": "name",
+    "life_events": "event",
+}
+
+# Entries at least this similar (after normalization) are treated as the same learning
+SIMILARITY_THRESHOLD = 0.85
+
+# Score = FREQUENCY_WEIGHT * log(1 + mentions) + RECENCY_WEIGHT * 0.5 ** (age_days / half-life)
+FREQUENCY_WEIGHT = 1.0
+RECENCY_WEIGHT = 1.0
+RECENCY_HALF_LIFE_DAYS = 30
+
+_non_word = re.compile(r"[^\w\s]+")
+_spaces = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _spaces.sub(" ", _non_word.sub(" ", str(text).lower())).strip()
+
+
+def entry_text(field: str, entry) -> str:
+    """Text that identifies a learnings entry (strings, or the name/event of an object)"""
+    if isinstance(entry, dict):
+        return str(entry.get(OBJECT_TEXT_KEYS.get(field, ""), "") or "")
+    return str(entry)
+
+
+def entry_key(field: str, entry) -> str:
+    """Stable key for an entry's mention stats (safe to use in a Mongo field path)"""
+    return hashlib.sha1(normalize_text(entry_text(field, entry)).encode("utf-8")).hexdigest()[:16]
+
+
+def is_similar(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # quick_ratio is an upper bound on ratio and much cheaper
+    return matcher.quick_ratio() >= SIMILARITY_THRESHOLD and matcher.ratio() >= SIMILARITY_THRESHOLD
+
+
+def score_entry(count: int, last_seen, now: datetime) -> float:
+    frequency = math.log1p(count)
+    recency = 0.0
+    if isinstance(last_seen, datetime):
+        age_days = max((now - last_seen).total_seconds(), 0) / 86400
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+    return FREQUENCY_WEIGHT * frequency + RECENCY_WEIGHT * recency
+
+
+def compact_field(field: str, entries: list, stats: dict, now: datetime, cap: int):
+    """
+    Deduplicate and cap one field.
+    Returns (kept entries in original order, stats for kept entries).
+    """
+    clusters = []  # each: {"norm", "entry", "count", "last_seen", "position"}
+    for position, entry in enumerate(entries):
+        norm = normalize_text(entry_text(field, entry))
+        if not norm:
+            continue
+        entry_stats = stats.get(entry_key(field, entry), {})
+        count = entry_stats.get("count", 1)
+        last_seen = entry_stats.get("last_seen")
+
+        cluster = next((c for c in clusters if is_similar(c["norm"], norm)), None)
+        if cluster is None:
+            clusters.append({
+                "norm": norm,
+                "entry": entry,
+                "count": count,
+                "last_seen": last_seen,
+                "position": position
+            })
+            continue
+
+        # Later entries are more recent; keep the latest wording in the earliest slot
+        cluster["entry"] = entry
+        cluster["norm"] = norm
+        cluster["count"] += count
+        if isinstance(last_seen, datetime) and (
+            not isinstance(cluster["last_seen"], datetime) or last_seen > cluster["last_seen"]
+        ):
+            cluster["last_seen"] = last_seen
+
+    # Entries without stats fall back to list position as a recency signal
+    for cluster in clusters:
+        if not isinstance(cluster["last_seen"], datetime):
+            cluster["score"] = score_entry(cluster["count"], None, now) + cluster["position"] / max(len(entries), 1)
+        else:
+            cluster["score"] = score_entry(cluster["count"], cluster["last_seen"], now)
+
+    kept = sorted(clusters, key=lambda c: c["score"], reverse=True)[:cap]
+    kept.sort(key=lambda c: c["position"])
+
+    kept_stats = {}
+    for cluster in kept:
+        kept_stats[entry_key(field, cluster["entry"])] = {
+            "count": cluster["count"],
+            "last_seen": cluster["last_seen"] or now,
+            "score": round(cluster["score"], 4)
+        }
+    return [cluster["entry"] for cluster in kept], kept_stats
+
+
+class LearningCompactor:
+    """Periodic batch that keeps every user's learnings deduplicated and bounded"""
+
+    def __init__(self, db, field_caps: dict = None):
+        self.db = db
+        self.field_caps = field_caps or FIELD_CAPS
+
+    async def compact_user(self, doc: dict, force: bool = False) -> bool:
+        """Compact one learnings document. Returns True if it was rewritten."""
+        updated_at = doc.get("updated_at")
+        compacted_at = doc.get("compacted_at")
+        if not force and isinstance(updated_at, datetime) and isinstance(compacted_at, datetime) and compacted_at >= updated_at:
+            return False
+
+        now = datetime.utcnow()
+        data = doc.get("data") or {}
+        stats = doc.get("stats") or {}
+
+        set_fields = {"compacted_at": now}
+        for field, cap in self.field_caps.items():
+            entries = data.get(field)
+            if not isinstance(entries, list):
+                continue
+            kept, kept_stats = compact_field(field, entries, stats.get(field) or {}, now, cap)
+            set_fields[f"data.{field}"] = kept
+            set_fields[f"stats.{field}"] = kept_stats
+
+        # Optimistic concurrency: skip if an extraction wrote in the meantime; the next run picks it up
+        version_filter = {"_id": doc["_id"], "version": doc.get("version")}
+        if doc.get("version") is None:
+            version_filter["version"] = {"$exists": False}
+        result = await self.db.learnings.update_one(
+            version_filter,
+            {"$set": set_fields, "$inc": {"version": 1}}
+        )
+        return result.modified_count == 1
+
+    async def compact_all(self, batch_size: int = 100, force: bool = False) -> dict:
+        """Compact learnings for all users"""
+        report = {"scanned": 0, "compacted": 0, "errors": 0}
+        cursor = self.db.learnings.find(
+            {},
+            {"data": 1, "stats": 1, "version": 1, "updated_at": 1, "compacted_at": 1}
+        ).batch_size(batch_size)
+
+        async for doc in cursor:
+            report["scanned"] += 1
+            try:
+                if await self.compact_user(doc, force=force):
+                    report["compacted"] += 1
+            except Exception as e:
+                report["errors"] += 1
+                logger.error(f"Learnings compaction error for {doc.get('_id')}: {str(e)}")
+
+        logger.info(f"Learnings compaction: {report}")
+        return report
+
+    async def run_periodically(self, interval_seconds: float):
+        """Run compact_all forever, every interval_seconds"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.compact_all()
+            except Exception as e:
+                logger.error(f"Learnings compaction run failed: {str(e)}")
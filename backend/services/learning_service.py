@@ -1,10 +1,11 @@
 import logging
 import json
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import os
-from dotenv import load_dotenv
+from datetime import datetime
+from pymongo import ReturnDocument
+from services.learning_compaction import entry_key
+from services.llm_client import LLMClient
+from services.structured_output import LearningsExtraction, StructuredOutputError, parse_with_repair
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 LEARNING_EXTRACTION_PROMPT = """You are analyzing a conversation to extract new learnings about a user who is focused on CAT/MBA or jobs/career.
@@ -28,13 +29,70 @@ Be conservative — only extract what is clearly stated or strongly implied.
 Respond ONLY with valid JSON, nothing else.
 """
 
+# Learnings fields by merge behaviour
+SET_FIELDS = ['big_rocks', 'recurring_themes', 'constraints', 'emotional_patterns']
+SCALAR_FIELDS = ['north_star', 'communication_style', 'decision_tendencies']
+LOG_FIELDS = ['important_people', 'life_events']
+
+# Keep only the most recent entries of append-only fields
+MAX_LOG_ITEMS = 50
+
+
+def build_learnings_update(new_learnings: dict, now: datetime) -> dict:
+    """Translate extracted learnings into per-field atomic update operators"""
+    add_to_set = {}
+    set_fields = {"updated_at": now}
+    push = {}
+    mention_counts = {}
+    last_seen = {}
+
+    # Mention frequency and recency per entry, used to rank entries during compaction
+    def record_mentions(field: str, items: list):
+        for item in items:
+            stats_path = f"stats.{field}.{entry_key(field, item)}"
+            mention_counts[f"{stats_path}.count"] = mention_counts.get(f"{stats_path}.count", 0) + 1
+            last_seen[f"{stats_path}.last_seen"] = now
+
+    # Merge arrays without duplicates
+    for key in SET_FIELDS:
+        items = [item for item in new_learnings.get(key) or [] if isinstance(item, str) and item.strip()]
+        if items:
+            add_to_set[f"data.{key}"] = {"$each": items}
+        record_mentions(key, items)
+
+    # Update single values
+    for key in SCALAR_FIELDS:
+        if new_learnings.get(key):
+            set_fields[f"data.{key}"] = new_learnings[key]
+
+    # Append objects, bounded to the latest MAX_LOG_ITEMS
+    for key in LOG_FIELDS:
+        items = [item for item in new_learnings.get(key) or [] if isinstance(item, dict)]
+        if items:
+            push[f"data.{key}"] = {"$each": items, "$slice": -MAX_LOG_ITEMS}
+        record_mentions(key, items)
+
+    update = {
+        "$set": set_fields,
+        "$inc": {"version": 1, **mention_counts},
+        "$setOnInsert": {"created_at": now}
+    }
+    if last_seen:
+        update["$max"] = last_seen
+    if add_to_set:
+        update["$addToSet"] = add_to_set
+    if push:
+        update["$push"] = push
+    return update
+
+
 class LearningService:
-    def __init__(self, db):
+    def __init__(self, db, llm_client: LLMClient):
         self.db = db
-        self.api_key = os.getenv("EMERGENT_LLM_KEY")
+        self.llm_client = llm_client
     
     async def extract_and_update_learnings(self, user_id: str, conversation_history: list):
-        """Extract learnings from conversation and update database"""
+        """Extract learnings from conversation and update database. Returns the saved learnings data."""
         try:
             # Get existing learnings
             existing = await self.db.learnings.find_one({"user_id": user_id})
@@ -45,69 +103,36 @@ class LearningService:
             ])
             
             # Extract new learnings
-            chat = LlmChat(
-                api_key=self.api_key,
+            prompt = f"Conversation:\n{conv_text}\n\nExisting learnings: {json.dumps(existing.get('data') if existing else {}, default=str)}\n\nExtract new learnings:"
+            response = await self.llm_client.complete(
+                system_message=LEARNING_EXTRACTION_PROMPT,
+                message=prompt,
+                purpose="learning_extraction",
                 session_id=f"learning_{user_id}",
-                system_message=LEARNING_EXTRACTION_PROMPT
-            ).with_model("gemini", "gemini-2.5-flash")
-            
-            prompt = f"Conversation:\n{conv_text}\n\nExisting learnings: {json.dumps(existing.get('data') if existing else {})}\n\nExtract new learnings:"
-            message = UserMessage(text=prompt)
-            response = await chat.send_message(message)
+                user_id=user_id
+            )
             
             # Parse JSON response
             try:
-                # Clean response - remove markdown code blocks if present
-                cleaned_response = response.strip()
-                if cleaned_response.startswith("```json"):
-                    cleaned_response = cleaned_response[7:]
-                if cleaned_response.startswith("```"):
-                    cleaned_response = cleaned_response[3:]
-                if cleaned_response.endswith("```"):
-                    cleaned_response = cleaned_response[:-3]
-                cleaned_response = cleaned_response.strip()
-                
-                new_learnings = json.loads(cleaned_response)
-            except json.JSONDecodeError as e:
+                parsed = await parse_with_repair(response, LearningsExtraction, "learning_extraction", self.llm_client, user_id)
+                new_learnings = parsed.model_dump(exclude_none=True)
+            except StructuredOutputError:
                 logger.error(f"Failed to parse learnings JSON: {response}")
-                return
+                return None
             
-            # Merge with existing learnings
-            if existing:
-                merged = existing.get("data", {})
-                
-                # Merge arrays
-                for key in ['big_rocks', 'recurring_themes', 'constraints', 'emotional_patterns']:
-                    if key in new_learnings:
-                        existing_items = set(merged.get(key, []))
-                        new_items = set(new_learnings[key])
-                        merged[key] = list(existing_items | new_items)
-                
-                # Update single values
-                for key in ['north_star', 'communication_style', 'decision_tendencies']:
-                    if key in new_learnings and new_learnings[key]:
-                        merged[key] = new_learnings[key]
-                
-                # Merge objects
-                for key in ['important_people', 'life_events']:
-                    if key in new_learnings:
-                        merged[key] = merged.get(key, []) + new_learnings[key]
-                
-                # Update database
-                await self.db.learnings.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"data": merged, "updated_at": "now"}}
-                )
-            else:
-                # Create new learnings document
-                await self.db.learnings.insert_one({
-                    "user_id": user_id,
-                    "data": new_learnings,
-                    "created_at": "now",
-                    "updated_at": "now"
-                })
+            # Merge atomically in Mongo: concurrent extractions can't lose each other's updates,
+            # and the upsert creates the document on first extraction without a racy insert
+            updated = await self.db.learnings.find_one_and_update(
+                {"user_id": user_id},
+                build_learnings_update(new_learnings, datetime.utcnow()),
+                upsert=True,
+                projection={"data": 1, "version": 1},
+                return_document=ReturnDocument.AFTER
+            )
             
-            logger.info(f"Updated learnings for user {user_id}")
+            logger.info(f"Updated learnings for user {user_id} (version {updated.get('version')})")
+            return updated.get("data", {})
         
         except Exception as e:
             logger.error(f"Learning extraction error: {str(e)}")
+            return None
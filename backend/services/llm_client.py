@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from services.admission_control import AdmissionController, AdmissionRejectedError
+from services.llm_ledger import estimate_tokens
+from services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini/gemini-2.5-flash"
+
+
+class LLMError(Exception):
+    """An LLM call failed after retries"""
+
+
+class CircuitOpenError(LLMError):
+    """Calls are short-circuited because the provider keeps failing"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError("LLM circuit breaker is open")
+        if state == "half_open":
+            self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+# ============================================================================
+# PROVIDERS
+# ============================================================================
+
+class EmergentProvider:
+    """Emergent universal key via emergentintegrations"""
+
+    name = "emergent"
+
+    def __init__(self, api_key: str):
+        # Checked on the first call so the app can boot (tests, benchmarks, health checks) without a key
+        if not api_key:
+            logger.warning("EMERGENT_LLM_KEY not found in environment. LLM calls will fail.")
+        self.api_key = api_key
+        self._sdk = None
+
+    def _load_sdk(self):
+        # Deferred so importing this module doesn't pull in the SDK
+        if self._sdk is None:
+            if not self.api_key:
+                raise ValueError("EMERGENT_LLM_KEY not found in environment")
+            from emergentintegrations.llm.chat import LlmChat, UserMessage
+            self._sdk = (LlmChat, UserMessage)
+        return self._sdk
+
+    async def complete(self, system_message: str, message: str, model: str, session_id: str) -> str:
+        LlmChat, UserMessage = self._load_sdk()
+        provider, model_name = model.split("/", 1)
+        # LlmChat carries per-session history, so it is built per call; the SDK's HTTP client is shared
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(provider, model_name)
+        return await chat.send_message(UserMessage(text=message))
+
+
+def parse_latency_spec(spec: str, rng: random.Random):
+    """
+    Build a latency sampler (seconds) from a spec in milliseconds:
+    "fixed:50", "uniform:20:80", "normal:200:50", "lognormal:5.3:0.4" (mu/sigma of ln(ms))
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(rng.gauss(values[0], values[1]), 0) / 1000
+    if kind == "lognormal":
+        return lambda: rng.lognormvariate(values[0], values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeProvider:
+    """Deterministic local stand-in for load tests and offline development"""
+
+    name = "fake"
+
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0, seed: int = 0):
+        self._rng = random.Random(seed)
+        self._sample_latency = parse_latency_spec(latency, self._rng)
+        self.error_rate = error_rate
+        self.calls = 0
+
+    async def complete(self, system_message: str, message: str, model: str, session_id: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self._sample_latency())
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise RuntimeError("Fake provider injected failure")
+
+        digest = hashlib.sha1(f"{system_message}\n{message}".encode("utf-8")).hexdigest()
+        bucket = int(digest[:8], 16)
+
+        # Shape the reply like the real prompts expect
+        if "Respond ONLY with valid JSON" in system_message or "Respond ONLY with valid JSON" in message:
+            if "should_match" in system_message + message:
+                score = round((bucket % 100) / 100, 2)
+                return json.dumps({"should_match": score >= 0.6, "score": score, "reason": "You are both weighing a similar decision."})
+            return json.dumps({"recurring_themes": [f"theme {bucket % 7}"], "big_rocks": [f"priority {bucket % 5}"]})
+        if "rolling summary" in system_message:
+            return f"The user has been talking about topic {bucket % 11}."
+        return f"Got it. Tell me a bit more about that? ({digest[:6]})"
+
+
+PROVIDERS = {
+    EmergentProvider.name: lambda: EmergentProvider(os.getenv("EMERGENT_LLM_KEY")),
+    FakeProvider.name: lambda: FakeProvider(
+        latency=os.getenv("LLM_FAKE_LATENCY", "fixed:0"),
+        error_rate=float(os.getenv("LLM_FAKE_ERROR_RATE", "0")),
+        seed=int(os.getenv("LLM_FAKE_SEED", "0"))
+    ),
+}
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class LLMClient:
+    """Shared LLM entry point: one provider instance, timeouts, jittered retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        provider,
+        model: str = DEFAULT_MODEL,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 4.0,
+        circuit_breaker: CircuitBreaker = None,
+        ledger=None,
+        admission: AdmissionController = None
+    ):
+        self.provider = provider
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        # Optional LLMLedger recording every call
+        self.ledger = ledger
+        # Optional AdmissionController bounding concurrent calls by priority
+        self.admission = admission
+
+    @classmethod
+    def from_env(cls):
+        provider_name = os.getenv("LLM_PROVIDER", EmergentProvider.name)
+        if provider_name not in PROVIDERS:
+            raise ValueError(f"Unknown LLM_PROVIDER: {provider_name}")
+        return cls(
+            PROVIDERS[provider_name](),
+            model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+            timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+            ),
+            admission=AdmissionController.from_env() if os.getenv("LLM_ADMISSION_ENABLED", "true").lower() == "true" else None
+        )
+
+    async def complete(
+        self,
+        system_message: str,
+        message: str,
+        purpose: str,
+        session_id: str = None,
+        model: str = None,
+        user_id: str = None
+    ) -> str:
+        """
+        Send one message and return the reply text. Raises LLMError when all attempts fail and
+        AdmissionRejectedError when there is no capacity for this purpose.
+        """
+        model = model or self.model
+        session_id = session_id or purpose
+        started = time.perf_counter()
+        state = {"attempts": 0, "outcome": "error", "response": None}
+
+        try:
+            with span("llm"):
+                if self.admission is None:
+                    return await self._attempt_all(system_message, message, purpose, model, session_id, state)
+                async with self.admission.slot(purpose, user_id):
+                    return await self._attempt_all(system_message, message, purpose, model, session_id, state)
+        except AdmissionRejectedError:
+            state["outcome"] = "rejected"
+            raise
+        finally:
+            response = state["response"]
+            if self.ledger is not None:
+                self.ledger.record({
+                    "purpose": purpose,
+                    "provider": self.provider.name,
+                    "model": model,
+                    "user_id": user_id,
+                    "prompt_chars": len(system_message) + len(message),
+                    "completion_chars": len(response) if response else 0,
+                    "prompt_tokens_est": estimate_tokens(system_message) + estimate_tokens(message),
+                    "completion_tokens_est": estimate_tokens(response),
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "attempts": state["attempts"],
+                    "outcome": state["outcome"]
+                })
+
+    async def _attempt_all(self, system_message: str, message: str, purpose: str, model: str, session_id: str, state: dict) -> str:
+        """The retry loop; per-call bookkeeping goes into `state` for the ledger"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            state["attempts"] += 1
+            try:
+                self.circuit_breaker.before_call()
+            except CircuitOpenError:
+                state["outcome"] = "circuit_open"
+                raise
+            try:
+                state["response"] = await asyncio.wait_for(
+                    self.provider.complete(system_message, message, model, session_id),
+                    timeout=self.timeout
+                )
+                self.circuit_breaker.record_success()
+                state["outcome"] = "ok"
+                return state["response"]
+            except Exception as e:
+                last_error = e
+                state["outcome"] = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                self.circuit_breaker.record_failure()
+                logger.warning(f"LLM call failed ({purpose}, attempt {attempt + 1}): {type(e).__name__}: {str(e)}")
+                if attempt < self.max_retries:
+                    # Full jitter exponential backoff
+                    await asyncio.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+
+        raise LLMError(f"LLM call for {purpose} failed: {str(last_error)}") from last_error
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on ledger rows pulled into one stats computation
+MAX_STATS_ROWS = 50000
+
+
+def estimate_tokens(text: str) -> int:
+    """Provider-agnostic token estimate (~4 characters per token); the SDK doesn't surface usage"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    index = min(int(round((len(sorted_values) - 1) * pct / 100)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize_calls(rows: list) -> dict:
+    """Count, error rate, latency percentiles and token totals for a list of ledger rows"""
+    latencies = sorted(row["latency_ms"] for row in rows if row.get("latency_ms") is not None)
+    errors = sum(1 for row in rows if row.get("outcome") != "ok")
+    prompt_tokens = sum(row.get("prompt_tokens_est", 0) for row in rows)
+    completion_tokens = sum(row.get("completion_tokens_est", 0) for row in rows)
+    return {
+        "calls": len(rows),
+        "errors": errors,
+        "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None
+        },
+        "prompt_tokens_est": prompt_tokens,
+        "completion_tokens_est": completion_tokens,
+        "avg_prompt_tokens_est": round(prompt_tokens / len(rows), 1) if rows else 0.0
+    }
+
+
+class LLMLedger:
+    """Append-only record of every LLM call, written to Mongo in batches off the request path"""
+
+    def __init__(self, db, batch_size: int = 100, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def record(self, entry: dict):
+        """Queue a call record; never blocks, drops the record if the queue is full"""
+        entry.setdefault("created_at", datetime.utcnow())
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and flush whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            await self._write(self._drain(self.batch_size))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors
+        }
+
+    async def summarize(self, hours: float = 24) -> dict:
+        """Percentile and per-purpose breakdown of calls in the last `hours`"""
+        since = datetime.utcnow() - timedelta(hours=hours)
+        rows = await self.db.llm_calls.find(
+            {"created_at": {"$gte": since}},
+            {"_id": 0, "purpose": 1, "latency_ms": 1, "outcome": 1, "prompt_tokens_est": 1, "completion_tokens_est": 1}
+        ).sort("created_at", -1).limit(MAX_STATS_ROWS).to_list(MAX_STATS_ROWS)
+
+        by_purpose = {}
+        by_outcome = {}
+        for row in rows:
+            by_purpose.setdefault(row.get("purpose", "unknown"), []).append(row)
+            by_outcome[row.get("outcome", "unknown")] = by_outcome.get(row.get("outcome", "unknown"), 0) + 1
+
+        return {
+            "window_hours": hours,
+            "truncated": len(rows) >= MAX_STATS_ROWS,
+            "overall": summarize_calls(rows),
+            "by_purpose": {purpose: summarize_calls(purpose_rows) for purpose, purpose_rows in by_purpose.items()},
+            "by_outcome": by_outcome
+        }
+
+    def _drain(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            try:
+                # Give the batch a moment to fill before writing
+                if self._queue.qsize() < self.batch_size - 1:
+                    await asyncio.sleep(self.flush_interval)
+            finally:
+                # Runs on cancellation too, so a dequeued record is never lost on shutdown
+                await self._write([first] + self._drain(self.batch_size - 1))
+
+    async def _write(self, batch: list):
+        if not batch:
+            return
+        try:
+            await self.db.llm_calls.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"LLM ledger write failed ({len(batch)} records): {str(e)}")
@@ -1,25 +1,26 @@
 import logging
-import json
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import os
-from dotenv import load_dotenv
 from bson import ObjectId
 from prompts.matching import get_matching_prompt
+from services.llm_client import LLMClient
+from services.structured_output import MatchResult, StructuredOutputError, parse_with_repair
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 class MatchingService:
-    def __init__(self, db, gemini_service):
+    def __init__(self, db, gemini_service, profile_cache=None, llm_client: LLMClient = None):
         self.db = db
         self.gemini_service = gemini_service
-        self.api_key = os.getenv("EMERGENT_LLM_KEY")
+        self.profile_cache = profile_cache
+        self.llm_client = llm_client or gemini_service.llm_client
     
     async def find_matches(self, user_id: str, max_matches: int = 3) -> list:
         """Find potential matches for a user"""
         try:
             # Get user info
-            user = await self.db.users.find_one({"_id": ObjectId(user_id)})
+            if self.profile_cache:
+                user = await self.profile_cache.get(user_id)
+            else:
+                user = await self.db.users.find_one({"_id": ObjectId(user_id)})
             if not user or not user.get("open_to_intros"):
                 return []
             
@@ -48,6 +49,8 @@ class MatchingService:
                 query["city"] = user.get("city")
             
             candidates = await self.db.users.find(query).limit(20).to_list(20)
+            if self.profile_cache:
+                self.profile_cache.prime(candidates)
             
             # Filter out users already matched
             existing_intros = await self.db.intros.find({
@@ -78,7 +81,7 @@ class MatchingService:
                 }
                 
                 # Use AI to evaluate match
-                match_result = await self._evaluate_match(user_data, candidate_data)
+                match_result = await self._evaluate_match(user_data, candidate_data, user_id)
                 
                 if match_result["should_match"] and match_result["score"] >= 0.6:
                     scored_matches.append({
@@ -95,37 +98,26 @@ class MatchingService:
             logger.error(f"Matching error: {str(e)}")
             return []
     
-    async def _evaluate_match(self, user_a: dict, user_b: dict) -> dict:
+    async def _evaluate_match(self, user_a: dict, user_b: dict, user_id: str = None) -> dict:
         """Evaluate if two users should be matched using AI"""
         try:
             # Build matching prompt
             prompt = get_matching_prompt(user_a, user_b)
             
             # Get AI evaluation
-            chat = LlmChat(
-                api_key=self.api_key,
+            response = await self.llm_client.complete(
+                system_message="You are a matching algorithm. Respond ONLY with valid JSON.",
+                message=prompt,
+                purpose="matching",
                 session_id="matching_eval",
-                system_message="You are a matching algorithm. Respond ONLY with valid JSON."
-            ).with_model("gemini", "gemini-2.5-flash")
-            
-            message = UserMessage(text=prompt)
-            response = await chat.send_message(message)
+                user_id=user_id
+            )
             
             # Parse JSON
             try:
-                # Clean response
-                cleaned = response.strip()
-                if cleaned.startswith("```json"):
-                    cleaned = cleaned[7:]
-                if cleaned.startswith("```"):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith("```"):
-                    cleaned = cleaned[:-3]
-                cleaned = cleaned.strip()
-                
-                result = json.loads(cleaned)
-                return result
-            except json.JSONDecodeError:
+                result = await parse_with_repair(response, MatchResult, "matching", self.llm_client, user_id)
+                return result.model_dump()
+            except StructuredOutputError:
                 logger.error(f"Failed to parse matching JSON: {response}")
                 return {"should_match": False, "score": 0.0, "reason": "Evaluation failed"}
         
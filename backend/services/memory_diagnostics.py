@@ -0,0 +1,179 @@
+import itertools
+import logging
+import random
+import resource
+import sys
+import tracemalloc
+import types
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+# Shared, process-wide objects that would drag half the interpreter into a cache's size
+_opaque = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+# Frames from the diagnostics themselves would otherwise dominate every snapshot
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def deep_sizeof(obj, seen: set = None) -> int:
+    """Approximate bytes held by obj and everything it references through containers and attributes"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, _opaque):
+        return size
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        # numpy arrays report their buffer separately
+        return size + nbytes
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def estimate_mapping_bytes(mapping, sample: int = 200, seed: int = 0) -> int:
+    """Extrapolate the deep size of a large mapping from a random sample of its entries"""
+    if not mapping:
+        return sys.getsizeof(mapping)
+    keys = list(mapping.keys())
+    chosen = keys if len(keys) <= sample else random.Random(seed).sample(keys, sample)
+    sampled = sum(deep_sizeof(key) + deep_sizeof(mapping[key]) for key in chosen)
+    return sys.getsizeof(mapping) + int(sampled * len(keys) / len(chosen))
+
+
+def process_memory() -> dict:
+    """Current and peak resident set size of this worker"""
+    memory = {"max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return memory
+
+
+def _format_stat(stat) -> dict:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    return {"site": frames[0] if frames else None, "traceback": frames, "size_bytes": stat.size, "count": stat.count}
+
+
+def _format_diff(stat) -> dict:
+    entry = _format_stat(stat)
+    entry.update(size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+    return entry
+
+
+class MemoryDiagnostics:
+    """tracemalloc snapshots, diffs and top allocation sites, plus registered in-process structure sizes"""
+
+    def __init__(self, max_snapshots: int = 5, frames: int = 25):
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self._snapshots = OrderedDict()  # snapshot id -> (taken_at, label, Snapshot)
+        self._ids = itertools.count(1)
+        self._sizes = {}  # name -> callable returning a dict of size figures
+
+    def register(self, name: str, sizes):
+        """Report `sizes()` under `name` in every summary"""
+        self._sizes[name] = sizes
+
+    def start(self, frames: int = None) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or self.frames)
+            logger.info(f"tracemalloc started with {tracemalloc.get_traceback_limit()} frames")
+        return self.tracing()
+
+    def stop(self) -> dict:
+        # Snapshots stay available; only new allocations stop being traced
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        return self.tracing()
+
+    def tracing(self) -> dict:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        }
+
+    def take_snapshot(self, label: str = None) -> dict:
+        """Blocking; run it off the event loop. Raises RuntimeError if tracemalloc isn't tracing"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        snapshot_id = next(self._ids)
+        self._snapshots[snapshot_id] = (datetime.utcnow(), label, snapshot)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return self._describe(snapshot_id)
+
+    def _describe(self, snapshot_id: int) -> dict:
+        taken_at, label, snapshot = self._snapshots[snapshot_id]
+        return {
+            "id": snapshot_id,
+            "label": label,
+            "taken_at": taken_at.isoformat(),
+            "traces": len(snapshot.traces),
+            "size_bytes": sum(trace.size for trace in snapshot.traces),
+        }
+
+    def _get(self, snapshot_id: int):
+        if snapshot_id not in self._snapshots:
+            raise KeyError(f"Unknown snapshot {snapshot_id}")
+        return self._snapshots[snapshot_id][2]
+
+    def top(self, snapshot_id: int, key_type: str = "lineno", limit: int = 20) -> list:
+        """Largest allocation sites in one snapshot"""
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type must be one of {', '.join(KEY_TYPES)}")
+        stats = self._get(snapshot_id).statistics(key_type)
+        return [_format_stat(stat) for stat in stats[:limit]]
+
+    def diff(self, from_id: int, to_id: int, key_type: str = "lineno", limit: int = 20) -> list:
+        """Allocation sites that grew the most between two snapshots"""
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type must be one of {', '.join(KEY_TYPES)}")
+        stats = self._get(to_id).compare_to(self._get(from_id), key_type)
+        return [_format_diff(stat) for stat in stats[:limit]]
+
+    def sizes(self) -> dict:
+        sizes = {}
+        for name, callback in self._sizes.items():
+            try:
+                sizes[name] = callback()
+            except Exception as e:
+                sizes[name] = {"error": str(e)}
+        return sizes
+
+    def summary(self) -> dict:
+        return {
+            "process": process_memory(),
+            "tracemalloc": self.tracing(),
+            "snapshots": [self._describe(snapshot_id) for snapshot_id in self._snapshots],
+            "structures": self.sizes(),
+        }
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pymongo import monitoring
+from services.structured_output import get_parse_stats
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a sub-millisecond Mongo read up to a slow LLM generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values; safe to observe from executor threads"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Gauge read at scrape time from a callback returning {label values tuple: value}"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple, collect):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.collect()
+        except Exception as e:
+            logger.error(f"Gauge {self.name} failed: {str(e)}")
+            return lines
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def histogram(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, label_names: tuple, collect) -> Gauge:
+        self._metrics[name] = Gauge(name, help_text, label_names, collect)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "chekinn_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+SPAN_DURATION = REGISTRY.histogram(
+    "chekinn_stage_duration_seconds",
+    "Time spent in a stage (mongo, llm, whisper, tts, moderation)",
+    ("stage",)
+)
+PARSE_OUTCOMES = ("parsed", "repaired", "failed")
+REGISTRY.gauge(
+    "chekinn_structured_parse_total",
+    "Structured LLM replies by schema and parse outcome since startup",
+    ("schema", "outcome"),
+    lambda: {
+        (schema, outcome): stats[outcome]
+        for schema, stats in get_parse_stats().items()
+        for outcome in PARSE_OUTCOMES
+    }
+)
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+# Per-request {stage: [seconds, calls]}; tasks spawned during the request share the same dict
+_request_spans = ContextVar("request_spans", default=None)
+
+
+def start_request():
+    """Begin collecting spans for the current request; returns (token, spans)"""
+    spans = {}
+    return _request_spans.set(spans), spans
+
+
+def end_request(token):
+    _request_spans.reset(token)
+
+
+def record_span(stage: str, seconds: float):
+    SPAN_DURATION.observe(seconds, stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        totals = spans.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+class span:
+    """Time a block as `stage`: `with span("tts"):` or `async with span("llm"):`"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_span(self.stage, time.perf_counter() - self._started)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+def server_timing(spans: dict, total_seconds: float) -> str:
+    """Server-Timing header value, e.g. `mongo;dur=4.2;desc="3 calls", total;dur=812.0`"""
+    parts = [
+        f'{stage};dur={seconds * 1000:.1f};desc="{calls} calls"'
+        for stage, (seconds, calls) in sorted(spans.items())
+    ]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records every Mongo command as a `mongo` span (motor carries the request context into its threads)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_span("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_span("mongo", event.duration_micros / 1e6)
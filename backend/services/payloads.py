@@ -0,0 +1,99 @@
+# Row shapes shared by the list endpoints and /api/sync, so a row looks the same whichever
+# endpoint delivered it and clients can merge rows by id
+
+# Mongo shapes these rows itself (string ids, defaults for missing fields); they go to
+# FastJSONResponse unchanged and datetimes are encoded natively
+CHAT_HISTORY_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "role": 1,
+    "text": 1,
+    "track": {"$ifNull": ["$track", None]},
+    "is_voice": {"$ifNull": ["$is_voice", False]},
+    "audio_duration": {"$ifNull": ["$audio_duration", None]},
+    "has_audio_response": {"$ifNull": ["$has_audio_response", False]},
+    "created_at": 1
+}
+
+PEER_MESSAGE_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "from_user_id": 1,
+    "to_user_id": 1,
+    "text": 1,
+    "created_at": 1
+}
+
+INTRO_PROJECTION = {
+    "from_user_id": 1,
+    "to_user_id": 1,
+    "reason": 1,
+    "status": 1,
+    "from_user_notified": 1,
+    "to_user_notified": 1,
+    "created_at": 1
+}
+
+LAST_PEER_MESSAGE_PROJECTION = {"_id": 0, "text": 1, "created_at": 1}
+
+
+def user_payload(user: dict) -> dict:
+    """Same fields as UserResponse"""
+    return {
+        "id": str(user["_id"]),
+        "name": user["name"],
+        "city": user.get("city"),
+        "current_role": user.get("current_role"),
+        "industries": user.get("industries", []),
+        "intent": user.get("intent"),
+        "open_to_intros": user.get("open_to_intros", True),
+        "preferred_mode": user.get("preferred_mode", "voice"),
+        "created_at": user["created_at"]
+    }
+
+
+def other_user_payload(user_id: str, card: dict) -> dict:
+    return {
+        "id": user_id,
+        "name": card.get("name", "User"),
+        "city": card.get("city"),
+        "current_role": card.get("current_role")
+    }
+
+
+def other_intro_user_id(intro: dict, user_id: str) -> str:
+    return intro["to_user_id"] if intro["from_user_id"] == user_id else intro["from_user_id"]
+
+
+def intro_is_new(intro: dict, user_id: str) -> bool:
+    """Whether user_id hasn't been shown this intro yet"""
+    side = "from_user_notified" if intro["from_user_id"] == user_id else "to_user_notified"
+    return not intro.get(side, False)
+
+
+def intro_payload(intro: dict, user_id: str, card: dict) -> dict:
+    return {
+        "id": intro["_id"],
+        "from_user_id": intro["from_user_id"],
+        "to_user_id": intro["to_user_id"],
+        "other_user": other_user_payload(other_intro_user_id(intro, user_id), card),
+        "reason": intro["reason"],
+        "status": intro["status"],
+        "is_new": intro_is_new(intro, user_id),
+        "created_at": intro["created_at"]
+    }
+
+
+def other_peer_user_id(conversation: dict, user_id: str) -> str:
+    return conversation["user2_id"] if conversation["user1_id"] == user_id else conversation["user1_id"]
+
+
+def peer_conversation_payload(conversation: dict, user_id: str, card: dict, last_message: dict = None) -> dict:
+    return {
+        "conversation_id": str(conversation["_id"]),
+        "other_user": other_user_payload(other_peer_user_id(conversation, user_id), card),
+        "last_message": last_message.get("text") if last_message else None,
+        "last_message_at": last_message.get("created_at") if last_message else conversation["created_at"],
+        "message_count": conversation.get("message_count", 0),
+        "status": conversation.get("status", "active")
+    }
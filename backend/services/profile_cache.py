@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from bson import ObjectId
+
+from services.memory_diagnostics import estimate_mapping_bytes
+
+logger = logging.getLogger(__name__)
+
+# Fields rendered wherever another user is shown (intros, peer inbox, matching, admin)
+CARD_FIELDS = ["name", "city", "current_role", "intent", "open_to_intros"]
+
+
+def to_card(user: dict) -> dict:
+    """Build a profile card from a users document"""
+    card = {"id": str(user["_id"])}
+    for field in CARD_FIELDS:
+        card[field] = user.get(field)
+    return card
+
+
+class ProfileCardCache:
+    """Read-through async LRU cache of user profile cards with TTL and single-flight loading"""
+
+    def __init__(self, db, max_size: int = 5000, ttl_seconds: float = 300):
+        self.db = db
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # user_id -> (expires_at, card)
+        self._inflight = {}  # user_id -> Future resolving to {user_id: card} or None on failure
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, user_id: str) -> dict:
+        """Get one profile card, or None if the user doesn't exist"""
+        cards = await self.get_many([user_id])
+        return cards.get(user_id)
+
+    async def get_many(self, user_ids: list) -> dict:
+        """Get profile cards for many users with at most one Mongo query. Missing users are omitted."""
+        now = time.monotonic()
+        result = {}
+        to_load = []
+        waiting = {}
+
+        for user_id in dict.fromkeys(user_ids):
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                result[user_id] = entry[1]
+                self.hits += 1
+            elif user_id in self._inflight:
+                waiting[user_id] = self._inflight[user_id]
+                self.coalesced += 1
+            else:
+                to_load.append(user_id)
+                self.misses += 1
+
+        if to_load:
+            future = asyncio.get_running_loop().create_future()
+            for user_id in to_load:
+                self._inflight[user_id] = future
+            loaded = None
+            try:
+                loaded = await self._load(to_load)
+                result.update(loaded)
+            finally:
+                for user_id in to_load:
+                    if self._inflight.get(user_id) is future:
+                        del self._inflight[user_id]
+                future.set_result(loaded)
+
+        for user_id, future in waiting.items():
+            loaded = await future
+            if loaded is None:
+                # The leader failed; load on our own so its error doesn't fan out
+                loaded = await self._load([user_id])
+            if user_id in loaded:
+                result[user_id] = loaded[user_id]
+
+        return result
+
+    def prime(self, users: list):
+        """Store cards for users documents that were already fetched by another query"""
+        for user in users:
+            self._store(str(user["_id"]), to_card(user))
+
+    def invalidate(self, user_id: str):
+        """Drop a user's card; call after any write to the users document"""
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def memory_usage(self) -> dict:
+        """Entry count and an approximate footprint extrapolated from a sample of entries"""
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "inflight": len(self._inflight),
+            "approx_bytes": estimate_mapping_bytes(self._entries)
+        }
+
+    async def _load(self, user_ids: list) -> dict:
+        object_ids = [ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)]
+        if not object_ids:
+            return {}
+
+        projection = {field: 1 for field in CARD_FIELDS}
+        users = await self.db.users.find(
+            {"_id": {"$in": object_ids}}, projection
+        ).to_list(len(object_ids))
+
+        cards = {}
+        for user in users:
+            card = to_card(user)
+            self._store(card["id"], card)
+            cards[card["id"]] = card
+        return cards
+
+    def _store(self, user_id: str, card: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, card)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,218 @@
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_capture_id = re.compile(r"^[\w.-]+$")
+_slug = re.compile(r"[^\w]+")
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def folded_stack(frame) -> str:
+    """Root-to-leaf `a;b;c` stack, the format flamegraph.pl and speedscope read"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def parse_route_fractions(spec: str) -> dict:
+    """"POST /api/chat/message=0.05, GET /api/intros/{user_id}=0.1" -> {(method, path): fraction}"""
+    fractions = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        route, fraction = item.rsplit("=", 1)
+        method, _, path = route.strip().partition(" ")
+        fractions[(method.upper(), path.strip())] = float(fraction)
+    return fractions
+
+
+class StackSampler:
+    """
+    Background thread sampling one thread's Python stack every `interval` seconds while any
+    capture is active. Everything on the event loop is sampled, so concurrent requests share samples.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._active = {}  # id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+        self._target = None
+
+    def begin(self, target_thread_id: int) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._active[id(samples)] = samples
+            self._target = target_thread_id
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def end(self, samples: Counter):
+        with self._lock:
+            self._active.pop(id(samples), None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active.values())
+                target = self._target
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stack = folded_stack(frame)
+                for samples in active:
+                    samples[stack] += 1
+            time.sleep(self.interval)
+
+
+class Capture:
+    __slots__ = ("samples", "reason", "started_at", "concurrent")
+
+    def __init__(self, samples: Counter, reason: str, concurrent: int):
+        self.samples = samples
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.concurrent = concurrent
+
+
+class RequestProfiler:
+    """Opt-in sampling of selected requests into folded-stack files with a JSON sidecar"""
+
+    def __init__(
+        self,
+        directory,
+        route_fractions: dict = None,
+        token: str = None,
+        interval: float = 0.005,
+        max_captures: int = 200
+    ):
+        self.directory = Path(directory)
+        self.route_fractions = route_fractions or {}
+        self.token = token
+        self.max_captures = max_captures
+        self.sampler = StackSampler(interval)
+        self.active = 0
+        self.captured = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("PROFILING_DIR", "/tmp/chekinn-profiles"),
+            route_fractions=parse_route_fractions(os.getenv("PROFILING_ROUTES", "")),
+            token=os.getenv("PROFILING_TOKEN") or None,
+            interval=float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000,
+            max_captures=int(os.getenv("PROFILING_MAX_CAPTURES", "200"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.route_fractions) or self.token is not None
+
+    def token_matches(self, header_token: str = None) -> bool:
+        return self.token is not None and bool(header_token) and hmac.compare_digest(header_token, self.token)
+
+    def should_profile(self, method: str, route_path: str, header_token: str = None):
+        """The reason to profile this request, or None"""
+        if self.token_matches(header_token):
+            return "header"
+        fraction = self.route_fractions.get((method, route_path))
+        if fraction and random.random() < fraction:
+            return "sampled"
+        return None
+
+    def begin(self, reason: str) -> Capture:
+        self.active += 1
+        return Capture(self.sampler.begin(threading.get_ident()), reason, self.active)
+
+    def finish(self, capture: Capture, method: str, route_path: str, status: int, total_seconds: float, spans: dict) -> dict:
+        """Stop sampling and return the capture metadata; write() persists it"""
+        self.sampler.end(capture.samples)
+        self.active -= 1
+        self.captured += 1
+        stamp = capture.started_at.strftime("%Y%m%dT%H%M%S%f")
+        capture_id = f"{stamp}_{method}_{_slug.sub('_', route_path).strip('_')}_{int(total_seconds * 1000)}ms"
+        return {
+            "id": capture_id,
+            "method": method,
+            "route": route_path,
+            "status": status,
+            "reason": capture.reason,
+            "started_at": capture.started_at.isoformat(),
+            "total_ms": round(total_seconds * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, (seconds, _) in spans.items()},
+            "samples": sum(capture.samples.values()),
+            "interval_ms": self.sampler.interval * 1000,
+            # Other requests on the loop while this one ran also appear in the samples
+            "concurrent_captures": capture.concurrent,
+            "_folded": capture.samples,
+        }
+
+    def write(self, metadata: dict):
+        """Write <id>.folded and <id>.json, then trim old captures; blocking, run off the event loop"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            samples = metadata.pop("_folded")
+            with open(self.directory / f"{metadata['id']}.folded", "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            with open(self.directory / f"{metadata['id']}.json", "w") as f:
+                json.dump(metadata, f, indent=2)
+            self._trim()
+        except Exception as e:
+            logger.error(f"Failed to write profile {metadata.get('id')}: {str(e)}")
+
+    def _trim(self):
+        captures = sorted(self.directory.glob("*.json"))
+        for old in captures[:max(len(captures) - self.max_captures, 0)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list_captures(self, limit: int = 100) -> list:
+        if not self.directory.exists():
+            return []
+        captures = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True)[:limit]:
+            try:
+                with open(path) as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def capture_path(self, capture_id: str):
+        """Path of a capture's folded file, or None if the id is unknown or malformed"""
+        if not _capture_id.match(capture_id):
+            return None
+        path = self.directory / f"{capture_id}.folded"
+        return path if path.exists() else None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "routes": {f"{method} {path}": fraction for (method, path), fraction in self.route_fractions.items()},
+            "header_enabled": self.token is not None,
+            "active": self.active,
+            "captured": self.captured,
+            "directory": str(self.directory),
+        }
@@ -0,0 +1,31 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Provider:
+    """
+    Builds a service on first use and returns the same instance afterwards. Instances are FastAPI
+    dependencies (`Depends(provider)`), so tests and benchmarks can swap them via app.dependency_overrides.
+    """
+
+    def __init__(self, factory, name: str = None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", repr(factory))
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self.factory()
+                    logger.info(f"Initialized {self.name} in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return self._instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# SCHEMAS
+# ============================================================================
+
+class LearningsExtraction(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    big_rocks: List[str] = []
+    recurring_themes: List[str] = []
+    constraints: List[str] = []
+    north_star: Optional[str] = None
+    communication_style: Optional[str] = None
+    emotional_patterns: List[str] = []
+    decision_tendencies: Optional[str] = None
+    important_people: List[Dict[str, Any]] = []
+    life_events: List[Dict[str, Any]] = []
+
+
+class MatchResult(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    should_match: bool = False
+    score: float = 0.0
+    reason: str = ""
+
+    @field_validator("score")
+    @classmethod
+    def clamp_score(cls, v):
+        return min(max(v, 0.0), 1.0)
+
+
+class StructuredOutputError(ValueError):
+    """The model reply could not be turned into the expected schema"""
+
+
+# ============================================================================
+# EXTRACTION
+# ============================================================================
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before } or ] outside of strings"""
+    out = []
+    in_string = False
+    escaped = False
+    pending_comma = None  # index in out of a comma that may turn out to be trailing
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+            pending_comma = None
+        elif char == ",":
+            pending_comma = len(out)
+        elif char in "}]" and pending_comma is not None:
+            del out[pending_comma]
+            pending_comma = None
+        elif not char.isspace():
+            pending_comma = None
+        out.append(char)
+    return "".join(out)
+
+
+def _find_json_span(text: str) -> str:
+    """Return the first balanced {...} or [...] block, skipping prose and code fences around it"""
+    start = next((i for i, c in enumerate(text) if c in "{["), None)
+    if start is None:
+        raise StructuredOutputError("No JSON object found")
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Unterminated: hand back the rest and let json.loads report it
+    return text[start:]
+
+
+def extract_json(text: str):
+    """Parse JSON from an LLM reply tolerating code fences, leading/trailing prose and trailing commas"""
+    if not text:
+        raise StructuredOutputError("Empty response")
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _strip_trailing_commas(_find_json_span(stripped))
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Invalid JSON: {str(e)}") from e
+
+
+def parse_structured(text: str, schema):
+    """Extract JSON and validate it against a pydantic schema"""
+    data = extract_json(text)
+    try:
+        return schema.model_validate(data)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Schema validation failed: {str(e)}") from e
+
+
+# ============================================================================
+# REPAIR + METRICS
+# ============================================================================
+
+REPAIR_PROMPT = "You fix malformed JSON. Respond ONLY with valid JSON, nothing else."
+
+# purpose -> counters
+_parse_stats = {}
+
+
+def _count(purpose: str, outcome: str):
+    stats = _parse_stats.setdefault(purpose, {"total": 0, "parsed": 0, "repaired": 0, "failed": 0})
+    stats[outcome] += 1
+
+
+def get_parse_stats() -> dict:
+    """Parse outcomes and failure rate per purpose"""
+    report = {}
+    for purpose, stats in _parse_stats.items():
+        report[purpose] = {
+            **stats,
+            "failure_rate": round(stats["failed"] / stats["total"], 4) if stats["total"] else 0.0
+        }
+    return report
+
+
+async def parse_with_repair(text: str, schema, purpose: str, llm_client=None, user_id: str = None):
+    """
+    Parse a reply into schema. On failure, optionally spend one cheap LLM call asking for a
+    corrected version. Raises StructuredOutputError if that fails too.
+    """
+    _count(purpose, "total")
+    try:
+        result = parse_structured(text, schema)
+        _count(purpose, "parsed")
+        return result
+    except StructuredOutputError as e:
+        first_error = e
+
+    if llm_client is not None:
+        fields = ", ".join(schema.model_fields)
+        try:
+            repaired = await llm_client.complete(
+                system_message=REPAIR_PROMPT,
+                message=f"Expected a JSON object with fields: {fields}\n\nError: {first_error}\n\nInput:\n{text[:4000]}",
+                purpose=f"{purpose}_repair",
+                model=os.getenv("LLM_REPAIR_MODEL") or None,
+                user_id=user_id
+            )
+            result = parse_structured(repaired, schema)
+            _count(purpose, "repaired")
+            return result
+        except Exception as e:
+            logger.warning(f"Repair failed for {purpose}: {str(e)}")
+
+    _count(purpose, "failed")
+    raise StructuredOutputError(f"Failed to parse {purpose} output: {str(first_error)}")
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from services.llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a rolling summary of a conversation between a user and their CAT/MBA and career companion.
+You get the current summary (possibly empty) and the messages that happened after it.
+Write an updated summary that:
+- Keeps what matters for future conversations: goals, decisions, worries, people, plans, open questions
+- Drops small talk and anything already resolved
+- Is written in third person, plain prose, under 150 words
+
+Respond ONLY with the updated summary text.
+"""
+
+# Messages generate_response already replays verbatim; the summary covers everything before them
+VERBATIM_MESSAGES = 5
+
+# Upper bound on messages folded into one summary update
+MAX_MESSAGES_PER_UPDATE = 200
+
+
+class SummaryService:
+    """Keeps a compact rolling summary on each conversations document"""
+
+    def __init__(self, db, llm_client: LLMClient, every_turns: int = None):
+        self.db = db
+        self.llm_client = llm_client
+        # One turn = one user message plus one assistant reply
+        self.every_messages = 2 * (every_turns or int(os.getenv("SUMMARY_EVERY_TURNS", "5")))
+        self._inflight = set()  # conversation ids with an update running
+        self._tasks = set()
+
+    def is_due(self, conversation: dict) -> bool:
+        message_count = conversation.get("message_count", 0)
+        summarized = conversation.get("summary_message_count", 0)
+        return message_count - summarized >= self.every_messages + VERBATIM_MESSAGES
+
+    def schedule(self, conversation: dict, on_update=None):
+        """Update the summary in the background if it's due. on_update(conversation_id, fields) runs after a save."""
+        conversation_id = str(conversation["_id"])
+        if conversation_id in self._inflight or not self.is_due(conversation):
+            return
+        self._inflight.add(conversation_id)
+        task = asyncio.create_task(self._run(conversation, on_update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self):
+        """Cancel pending updates and wait for them, so none writes after the Mongo client closes"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, conversation: dict, on_update):
+        conversation_id = str(conversation["_id"])
+        try:
+            fields = await self.update_summary(conversation)
+            if fields and on_update:
+                on_update(conversation_id, fields)
+        except Exception as e:
+            logger.error(f"Summary update error for {conversation_id}: {str(e)}")
+        finally:
+            self._inflight.discard(conversation_id)
+
+    async def update_summary(self, conversation: dict) -> dict:
+        """Fold messages older than the verbatim window into the summary. Returns the saved fields, or None."""
+        conversation_id = str(conversation["_id"])
+        previous_summary = conversation.get("summary") or ""
+        summarized_through = conversation.get("summary_through")
+
+        query = {"conversation_id": conversation_id}
+        if summarized_through:
+            query["created_at"] = {"$gt": summarized_through}
+        messages = await self.db.messages.find(
+            query, {"role": 1, "text": 1, "created_at": 1}
+        ).sort("created_at", 1).limit(MAX_MESSAGES_PER_UPDATE + VERBATIM_MESSAGES).to_list(
+            MAX_MESSAGES_PER_UPDATE + VERBATIM_MESSAGES
+        )
+
+        to_summarize = messages[:-VERBATIM_MESSAGES]
+        if len(to_summarize) < 2:
+            return None
+
+        conv_text = "\n".join([f"{msg['role']}: {msg['text']}" for msg in to_summarize])
+        prompt = f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{conv_text}\n\nUpdated summary:"
+        summary = (await self.llm_client.complete(
+            system_message=SUMMARY_PROMPT,
+            message=prompt,
+            purpose="summary",
+            session_id=f"summary_{conversation_id}",
+            user_id=conversation.get("user_id")
+        )).strip()
+        if not summary:
+            return None
+
+        fields = {
+            "summary": summary,
+            "summary_through": to_summarize[-1]["created_at"],
+            "summary_message_count": conversation.get("summary_message_count", 0) + len(to_summarize),
+            "summary_updated_at": datetime.utcnow()
+        }
+        # Only advance from the state we read, so an overlapping update can't move the summary backwards
+        result = await self.db.conversations.update_one(
+            {"_id": conversation["_id"], "summary_through": summarized_through},
+            {"$set": fields}
+        )
+        if result.matched_count == 0:
+            return None
+
+        logger.info(f"Updated summary for conversation {conversation_id} ({len(to_summarize)} messages)")
+        return fields
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import calendar
+import json
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services.payloads import (
+    CHAT_HISTORY_PROJECTION, INTRO_PROJECTION, LAST_PEER_MESSAGE_PROJECTION,
+    user_payload, other_intro_user_id, other_peer_user_id, intro_payload, peer_conversation_payload
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 1
+EPOCH = datetime(1970, 1, 1)
+
+# Each sync re-reads this far behind the previous watermark, so writes that committed late
+# (or were stamped by a host with a slightly different clock) are never skipped. Rows come
+# back again at most once; clients merge everything by id.
+DEFAULT_OVERLAP_SECONDS = 5
+
+
+class InvalidSyncTokenError(ValueError):
+    pass
+
+
+def encode_token(watermark: datetime) -> str:
+    # Watermarks are naive UTC; timegm reads them as UTC whatever the host's TZ is
+    millis = calendar.timegm(watermark.utctimetuple()) * 1000 + watermark.microsecond // 1000
+    raw = json.dumps({"v": TOKEN_VERSION, "t": millis}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str) -> datetime:
+    """Watermark (naive UTC, like every stored timestamp) carried by a sync token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        if data.get("v") != TOKEN_VERSION:
+            raise InvalidSyncTokenError("Unsupported sync token version")
+        return EPOCH + timedelta(milliseconds=data["t"])
+    except InvalidSyncTokenError:
+        raise
+    except Exception:
+        raise InvalidSyncTokenError("Malformed sync token")
+
+
+class SyncService:
+    """
+    Delta sync for the mobile client: everything that changed for a user since a sync token, in
+    one response. Each section is one indexed range query on (owner, updated_at/created_at), run
+    concurrently, so cost follows the number of changed rows rather than the size of the account.
+    """
+
+    def __init__(self, db, profile_cache, message_limit: int = 200, intro_limit: int = 100,
+                 conversation_limit: int = 50, overlap_seconds: float = DEFAULT_OVERLAP_SECONDS):
+        self.db = db
+        self.profile_cache = profile_cache
+        self.message_limit = message_limit
+        self.intro_limit = intro_limit
+        self.conversation_limit = conversation_limit
+        self.overlap = timedelta(seconds=overlap_seconds)
+
+    async def sync(self, user_id: str, since_token: str = None) -> dict:
+        """
+        Changes since since_token (a full snapshot without one). Returns None for an unknown user;
+        raises InvalidSyncTokenError for a token this server didn't issue.
+        """
+        since = decode_token(since_token) - self.overlap if since_token else None
+        # Taken before any query runs: a write landing mid-sync is picked up by the next one
+        watermark = datetime.utcnow()
+
+        user, (conversation, messages, truncated), intros, peer_conversations = await asyncio.gather(
+            self._user(user_id),
+            self._messages(user_id, since),
+            self._intros(user_id, since),
+            self._peer_conversations(user_id, since)
+        )
+        if user is None:
+            return None
+
+        return {
+            "sync_token": encode_token(watermark),
+            "full": since is None,
+            "user": user_payload(user) if since is None or user.get("updated_at", watermark) >= since else None,
+            "conversation": conversation,
+            "messages": messages,
+            "messages_truncated": truncated,
+            "intros": intros,
+            "peer_conversations": peer_conversations
+        }
+
+    async def _user(self, user_id: str):
+        if not ObjectId.is_valid(user_id):
+            return None
+        return await self.db.users.find_one({"_id": ObjectId(user_id)})
+
+    async def _messages(self, user_id: str, since) -> tuple:
+        conversation = await self.db.conversations.find_one(
+            {"user_id": user_id},
+            {"_id": 1, "current_track": 1, "message_count": 1, "history_version": 1, "updated_at": 1}
+        )
+        if not conversation:
+            return None, [], False
+
+        query = {"conversation_id": str(conversation["_id"])}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        # Newest first so a long gap keeps the latest messages; one extra row tells us it was cut
+        messages = await self.db.messages.find(query, CHAT_HISTORY_PROJECTION).sort(
+            "created_at", -1
+        ).limit(self.message_limit + 1).to_list(self.message_limit + 1)
+        truncated = len(messages) > self.message_limit
+        messages = messages[:self.message_limit]
+        messages.reverse()
+
+        # history_version moves when stored messages are rewritten in place (track backfill);
+        # a client that sees it change refetches /chat/history instead of merging
+        summary = {
+            "id": str(conversation["_id"]),
+            "current_track": conversation.get("current_track"),
+            "message_count": conversation.get("message_count", 0),
+            "history_version": conversation.get("history_version", 0)
+        }
+        return summary, messages, truncated
+
+    async def _intros(self, user_id: str, since) -> list:
+        # Two arms so each can use its (from/to_user_id, updated_at) index
+        arms = [{"from_user_id": user_id}, {"to_user_id": user_id}]
+        if since is not None:
+            arms = [{**arm, "updated_at": {"$gte": since}} for arm in arms]
+        intros = await self.db.intros.find({"$or": arms}, INTRO_PROJECTION).sort(
+            "created_at", -1
+        ).to_list(self.intro_limit)
+
+        # Unlike GET /intros this doesn't mark anything notified: is_new stays true until the
+        # intros screen has actually been shown
+        cards = await self.profile_cache.get_many([other_intro_user_id(intro, user_id) for intro in intros])
+        return [
+            intro_payload(intro, user_id, cards.get(other_intro_user_id(intro, user_id), {}))
+            for intro in intros
+        ]
+
+    async def _peer_conversations(self, user_id: str, since) -> list:
+        arms = [{"user1_id": user_id}, {"user2_id": user_id}]
+        if since is not None:
+            arms = [{**arm, "updated_at": {"$gte": since}} for arm in arms]
+        conversations = await self.db.peer_conversations.find({"$or": arms}).sort(
+            "updated_at", -1
+        ).to_list(self.conversation_limit)
+        if not conversations:
+            return []
+
+        other_user_ids = [other_peer_user_id(conv, user_id) for conv in conversations]
+        cards, last_messages = await asyncio.gather(
+            self.profile_cache.get_many(other_user_ids),
+            asyncio.gather(*[
+                self.db.peer_messages.find_one(
+                    {"peer_conversation_id": str(conv["_id"])},
+                    LAST_PEER_MESSAGE_PROJECTION,
+                    sort=[("created_at", -1)]
+                )
+                for conv in conversations
+            ])
+        )
+        return [
+            peer_conversation_payload(conv, user_id, cards.get(other_user_id, {}), last_message)
+            for conv, other_user_id, last_message in zip(conversations, other_user_ids, last_messages)
+        ]
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from pathlib import Path
+
+from services.memory_diagnostics import deep_sizeof
+from services.track_detection import detect_tracks_many, pair_user_turns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = Path(__file__).parent.parent / "models" / "track_model.npz"
+
+# Below this posterior the keyword rules decide
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Label for turns without a track, so the model can also say "none of these"
+NO_TRACK = "none"
+
+_token = re.compile(r"[a-z0-9]+")
+
+_numpy = None
+
+
+def _np():
+    """numpy, imported on first use so servers without a trained model never load it"""
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word unigrams plus bigrams"""
+    words = _token.findall((text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesTrackModel:
+    """
+    Multinomial naive Bayes over unigrams/bigrams. Training and inference work on (text, column)
+    token pairs and never build a texts x vocabulary matrix, so memory follows the token count.
+    """
+
+    def __init__(self, vocabulary: dict, classes: list, log_prior, log_likelihood, metadata: dict = None):
+        self.vocabulary = vocabulary          # token -> column
+        self.classes = classes                # row order of log_prior
+        self.log_prior = log_prior            # (C,)
+        self.log_likelihood = log_likelihood  # (V, C)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def fit(cls, texts: list, labels: list, alpha: float = 1.0, min_count: int = 2, max_features: int = 20000):
+        np = _np()
+        classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(classes)}
+
+        # Keep the most frequent tokens seen at least min_count times
+        counts = {}
+        for text in texts:
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+        kept = sorted((t for t, c in counts.items() if c >= min_count), key=lambda t: -counts[t])[:max_features]
+        vocabulary = {token: i for i, token in enumerate(sorted(kept))}
+
+        rows, cols = cls._token_positions(texts, vocabulary)
+        y = np.array([class_index[label] for label in labels], dtype=np.int64)
+        class_counts = np.bincount(y, minlength=len(classes))
+
+        # Per-class token counts straight from the (column, class) pairs
+        token_counts = np.zeros((len(vocabulary), len(classes)))  # (V, C)
+        np.add.at(token_counts, (cols, y[rows]), 1)
+        token_counts += alpha
+        log_likelihood = np.log(token_counts) - np.log(token_counts.sum(axis=0, keepdims=True))
+        log_prior = np.log(class_counts / len(labels))
+
+        metadata = {
+            "trained_at": time.time(),
+            "examples": len(labels),
+            "vocabulary_size": len(vocabulary),
+            "alpha": alpha,
+            "class_counts": {label: int(count) for label, count in zip(classes, class_counts)},
+        }
+        return cls(vocabulary, classes, log_prior, log_likelihood, metadata)
+
+    @staticmethod
+    def _token_positions(texts: list, vocabulary: dict) -> tuple:
+        """(text index, vocabulary column) arrays, one entry per in-vocabulary token occurrence"""
+        np = _np()
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                col = vocabulary.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    def predict_proba(self, texts: list):
+        """(N, C) posterior probabilities"""
+        np = _np()
+        rows, cols = self._token_positions(texts, self.vocabulary)
+        scores = np.tile(self.log_prior, (len(texts), 1))
+        np.add.at(scores, rows, self.log_likelihood[cols])
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict_many(self, texts: list) -> tuple:
+        """(labels, confidences) for a batch"""
+        np = _np()
+        if not texts:
+            return [], []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[i] for i in best], probabilities[np.arange(len(texts)), best].tolist()
+
+    def save(self, path):
+        np = _np()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tokens = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(tokens, dtype=str),
+            classes=np.array(self.classes, dtype=str),
+            log_prior=self.log_prior,
+            log_likelihood=self.log_likelihood.astype(np.float32),
+            metadata=np.array(json.dumps(self.metadata)),
+        )
+
+    @classmethod
+    def load(cls, path):
+        np = _np()
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = {str(token): i for i, token in enumerate(data["vocabulary"])}
+            return cls(
+                vocabulary,
+                [str(label) for label in data["classes"]],
+                data["log_prior"],
+                data["log_likelihood"].astype(np.float64),
+                json.loads(str(data["metadata"])),
+            )
+
+
+class TrackClassifier:
+    """Trained model first, keyword rules when the model is missing or unsure"""
+
+    def __init__(self, model_path=None, min_confidence: float = None):
+        self.model_path = Path(model_path or os.getenv("TRACK_MODEL_PATH") or DEFAULT_MODEL_PATH)
+        self.min_confidence = (
+            min_confidence if min_confidence is not None
+            else float(os.getenv("TRACK_MODEL_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE)))
+        )
+        self._model = None
+        self._loaded = False
+        self.counts = {"model": 0, "rules": 0}
+
+    def _load(self):
+        if self._loaded:
+            return
+        # Marked first: while a load runs in a worker thread, callers fall back to the rules
+        self._loaded = True
+        if self.model_path.exists():
+            try:
+                self._model = NaiveBayesTrackModel.load(self.model_path)
+                logger.info(f"Loaded track model from {self.model_path} ({len(self._model.vocabulary)} tokens)")
+            except Exception as e:
+                logger.error(f"Failed to load track model {self.model_path}: {str(e)}")
+
+    async def preload(self):
+        """Import numpy and read the model in a worker thread, off the event loop (server startup)"""
+        await asyncio.to_thread(self._load)
+
+    @property
+    def model(self):
+        # Scripts load synchronously on first use; the server preloads at startup
+        self._load()
+        return self._model
+
+    def classify_many(self, texts: list) -> list:
+        rules = detect_tracks_many(texts)
+        if self.model is None:
+            self.counts["rules"] += len(texts)
+            return rules
+
+        labels, confidences = self.model.predict_many(texts)
+        results = []
+        for label, confidence, rule_label in zip(labels, confidences, rules):
+            if confidence >= self.min_confidence:
+                self.counts["model"] += 1
+                results.append(None if label == NO_TRACK else label)
+            else:
+                self.counts["rules"] += 1
+                results.append(rule_label)
+        return results
+
+    def classify(self, text: str):
+        return self.classify_many([text])[0]
+
+    def stats(self) -> dict:
+        return {
+            "model_loaded": self._model is not None,
+            "model_path": str(self.model_path),
+            "min_confidence": self.min_confidence,
+            "decided_by": dict(self.counts),
+            "metadata": self._model.metadata if self._model is not None else None,
+        }
+
+    def memory_usage(self) -> dict:
+        if self._model is None:
+            return {"model_loaded": False, "approx_bytes": 0}
+        return {
+            "model_loaded": True,
+            "vocabulary": len(self._model.vocabulary),
+            "approx_bytes": deep_sizeof(self._model)
+        }
+
+
+# ============================================================================
+# TRAINING
+# ============================================================================
+
+async def load_labeled_turns(db, limit: int = None) -> tuple:
+    """(texts, labels) from user messages paired with the track stored on the reply"""
+    texts, labels = [], []
+    async for conversation in db.conversations.find({}, {"_id": 1}):
+        messages = await db.messages.find(
+            {"conversation_id": str(conversation["_id"])},
+            {"role": 1, "text": 1, "track": 1}
+        ).sort("created_at", 1).to_list(None)
+        for reply, text in pair_user_turns(messages):
+            texts.append(text)
+            labels.append(reply.get("track") or NO_TRACK)
+            if limit and len(texts) >= limit:
+                return texts, labels
+    return texts, labels
+
+
+def _throughput(classify_many, texts: list) -> float:
+    started = time.perf_counter()
+    classify_many(texts)
+    elapsed = time.perf_counter() - started
+    return round(len(texts) / elapsed, 1) if elapsed > 0 else None
+
+
+def evaluate(model: NaiveBayesTrackModel, texts: list, labels: list, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> dict:
+    """Accuracy and throughput of the model, the keyword rules and the combined classifier"""
+    if not texts:
+        return {"examples": 0}
+    rules = [label or NO_TRACK for label in detect_tracks_many(texts)]
+    predicted, confidences = model.predict_many(texts)
+    combined = [p if c >= min_confidence else r for p, c, r in zip(predicted, confidences, rules)]
+
+    def accuracy(values):
+        return round(sum(1 for v, label in zip(values, labels) if v == label) / len(labels), 4)
+
+    return {
+        "examples": len(texts),
+        "accuracy": {"model": accuracy(predicted), "rules": accuracy(rules), "combined": accuracy(combined)},
+        "model_coverage": round(sum(1 for c in confidences if c >= min_confidence) / len(texts), 4),
+        "throughput_per_sec": {
+            "model": _throughput(lambda batch: model.predict_many(batch), texts),
+            "rules": _throughput(detect_tracks_many, texts),
+        },
+    }
+
+
+def train_and_evaluate(texts: list, labels: list, test_fraction: float = 0.2, seed: int = 0, **fit_options) -> tuple:
+    """Fit on a shuffled split, evaluate on the held-out part, then refit on everything"""
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    split = int(len(order) * (1 - test_fraction))
+    train, test = order[:split], order[split:]
+
+    holdout_model = NaiveBayesTrackModel.fit([texts[i] for i in train], [labels[i] for i in train], **fit_options)
+    report = evaluate(holdout_model, [texts[i] for i in test], [labels[i] for i in test])
+
+    model = NaiveBayesTrackModel.fit(texts, labels, **fit_options)
+    model.metadata["evaluation"] = report
+    return model, report
@@ -0,0 +1,216 @@
+import logging
+import re
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# track -> {keyword: weight}. Phrases match on word boundaries, with optional plural.
+TRACK_KEYWORDS = {
+    "cat_mba": {
+        "cat": 2, "mba": 3, "iim": 3, "mock test": 3, "mock": 1, "percentile": 2,
+        "admission": 1, "gmat": 3, "gre": 2, "entrance": 1, "b school": 3, "bschool": 3,
+        "quant": 2, "varc": 3, "dilr": 3, "xat": 3, "snap": 1, "nmat": 3,
+    },
+    "jobs_career": {
+        "job": 2, "career": 3, "role": 1, "interview": 2, "salary": 2, "promotion": 3, "company": 1,
+        "companies": 1, "manager": 1, "switch": 1, "appraisal": 3, "resume": 2, "cv": 2,
+        "offer letter": 3, "hike": 2, "layoff": 3, "notice period": 3, "boss": 1, "internship": 2,
+    },
+    "roast_play": {
+        "roast": 3, "roast me": 4, "bored": 2, "fun": 1, "joke": 2, "meme": 2,
+    },
+}
+
+# Tie-break order (matches the original if/elif precedence)
+TRACK_PRIORITY = ["cat_mba", "jobs_career", "roast_play"]
+
+
+# Words, plus runs of punctuation that break a phrase; a phrase may only span whitespace and hyphens
+_token = re.compile(r"\w+|[^\w\s\-]+")
+
+# Same tokens for ASCII text without the regex engine: one byte table lowercases, turns hyphens
+# into spaces and every other punctuation byte into a NUL that becomes its own (breaker) token
+_BREAKER = b"\x00"
+_ascii_table = bytes(
+    ord(" ") if byte == ord("-")
+    else _BREAKER[0] if not re.match(r"[\w\s]", chr(byte))
+    else ord(chr(byte).lower())
+    for byte in range(128)
+) + bytes(range(128, 256))
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens, with punctuation runs kept as tokens so phrases can't span them"""
+    if text.isascii():
+        data = text.encode("ascii").translate(_ascii_table)
+        return data.replace(_BREAKER, b" " + _BREAKER + b" ").decode("ascii").split()
+    # Split before lowercasing: lower() can change a character's class ("İ" gains a combining dot)
+    return [token.lower() for token in _token.findall(text)]
+
+
+def _keyword_forms(keyword: str) -> list:
+    """
+    Token tuples a keyword matches: its words may be separated or run together ("b school",
+    "bschool") and the last one may take a plural "s"/"es"
+    """
+    words = keyword.lower().split()
+    forms = [(words[0],)]
+    for word in words[1:]:
+        forms = [form + (word,) for form in forms] + [form[:-1] + (form[-1] + word,) for form in forms]
+    return [form[:-1] + (form[-1] + suffix,) for form in forms for suffix in ("", "s", "es")]
+
+
+class TrackMatcher:
+    """
+    Keyword weights looked up per token: the text is tokenized once, single words are one dict
+    lookup each and phrases are checked only at tokens that can start one. Each match adds its
+    weight to its track.
+    """
+
+    def __init__(self, track_keywords: dict = None):
+        track_keywords = track_keywords or TRACK_KEYWORDS
+        entries = [
+            (keyword, track, weight)
+            for track, keywords in track_keywords.items()
+            for keyword, weight in keywords.items()
+        ]
+        # Longer phrases first so "roast me" wins over "roast" and "mock test" over "mock"
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+        self._phrases = {}  # token tuple -> (rank, track, weight)
+        for rank, (keyword, track, weight) in enumerate(entries):
+            for form in _keyword_forms(keyword):
+                self._phrases.setdefault(form, (rank, track, weight))
+        self._words = {form[0]: hit for form, hit in self._phrases.items() if len(form) == 1}
+        # First token of every multi-token phrase -> the phrase lengths starting with it
+        self._phrase_starts = {}
+        for form in self._phrases:
+            if len(form) > 1:
+                self._phrase_starts.setdefault(form[0], set()).add(len(form))
+        # Every later token of a phrase; without one of these no phrase can match
+        self._phrase_tails = {token for form in self._phrases if len(form) > 1 for token in form[1:]}
+        self._priority = {track: i for i, track in enumerate(TRACK_PRIORITY)}
+
+    def scores(self, text: str) -> dict:
+        if not text:
+            return {}
+        tokens = tokenize(text)
+        totals = {}
+        for _, track, weight in filter(None, map(self._words.get, tokens)):
+            totals[track] = totals.get(track, 0) + weight
+        if not self._phrase_tails.isdisjoint(tokens) and not self._phrase_starts.keys().isdisjoint(tokens):
+            self._apply_phrases(tokens, totals)
+        return totals
+
+    def _apply_phrases(self, tokens: list, totals: dict):
+        """
+        Swap single-word hits for the phrases covering them. Left to right, a phrase consumes its
+        words and the longest keyword starting at a token wins, as in a regex alternation.
+        """
+        positions = []
+        for token in self._phrase_starts:
+            index = -1
+            for _ in range(tokens.count(token)):
+                index = tokens.index(token, index + 1)
+                positions.append(index)
+        positions.sort()
+
+        words = self._words
+        consumed = 0
+        for i in positions:
+            if i < consumed:
+                continue
+            best = words.get(tokens[i])
+            size = 1
+            for n in self._phrase_starts[tokens[i]]:
+                hit = self._phrases.get(tuple(tokens[i:i + n])) if i + n <= len(tokens) else None
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best, size = hit, n
+            if size == 1:
+                continue
+            for covered in tokens[i:i + size]:
+                covered_hit = words.get(covered)
+                if covered_hit is not None:
+                    totals[covered_hit[1]] -= covered_hit[2]
+            totals[best[1]] = totals.get(best[1], 0) + best[2]
+            consumed = i + size
+        # Weights are positive, so a zero total means every hit of that track was absorbed by a phrase
+        for track in [track for track, total in totals.items() if total == 0]:
+            del totals[track]
+
+    def detect(self, text: str):
+        """Highest-scoring track, or None if no keyword matched"""
+        totals = self.scores(text)
+        if not totals:
+            return None
+        return max(totals, key=lambda track: (totals[track], -self._priority.get(track, len(self._priority))))
+
+    def detect_many(self, texts: list) -> list:
+        """detect() over a batch; repeated texts (greetings, "ok", ...) are classified once"""
+        labels = {}
+        detect = self.detect
+        results = []
+        for text in texts:
+            if text not in labels:
+                labels[text] = detect(text)
+            results.append(labels[text])
+        return results
+
+
+_default_matcher = TrackMatcher()
+
+
+def detect_track(text: str):
+    return _default_matcher.detect(text)
+
+
+def detect_tracks_many(texts: list) -> list:
+    """Classify a batch of messages"""
+    return _default_matcher.detect_many(texts)
+
+
+def pair_user_turns(messages: list) -> list:
+    """(assistant message, preceding user text) pairs from a conversation sorted by created_at"""
+    pairs = []
+    previous_user_text = None
+    for msg in messages:
+        if msg["role"] == "user":
+            previous_user_text = msg["text"]
+        elif msg["role"] == "assistant" and previous_user_text is not None:
+            pairs.append((msg, previous_user_text))
+            previous_user_text = None
+    return pairs
+
+
+async def backfill_tracks(db, dry_run: bool = False, batch_size: int = 500, classify_many=None) -> dict:
+    """
+    Re-label messages.track on assistant messages from the user message that preceded them.
+    classify_many defaults to detect_tracks_many.
+    """
+    classify_many = classify_many or detect_tracks_many
+    report = {"conversations": 0, "messages": 0, "changed": 0, "distribution": {}}
+
+    async for conversation in db.conversations.find({}, {"_id": 1}):
+        report["conversations"] += 1
+        messages = await db.messages.find(
+            {"conversation_id": str(conversation["_id"])},
+            {"role": 1, "text": 1, "track": 1}
+        ).sort("created_at", 1).to_list(None)
+
+        pairs = pair_user_turns(messages)
+        labels = classify_many([text for _, text in pairs])
+        operations = []
+        for (msg, _), label in zip(pairs, labels):
+            report["messages"] += 1
+            report["distribution"][str(label)] = report["distribution"].get(str(label), 0) + 1
+            if msg.get("track") != label:
+                report["changed"] += 1
+                operations.append(UpdateOne({"_id": msg["_id"]}, {"$set": {"track": label}}))
+
+        if not dry_run and operations:
+            for start in range(0, len(operations), batch_size):
+                await db.messages.bulk_write(operations[start:start + batch_size], ordered=False)
+            # Invalidates chat history ETags without touching updated_at, which analytics reads as activity
+            await db.conversations.update_one({"_id": conversation["_id"]}, {"$inc": {"history_version": 1}})
+
+    logger.info(f"Track backfill{' (dry run)' if dry_run else ''}: {report}")
+    return report
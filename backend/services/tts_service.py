@@ -1,9 +1,6 @@
 import os
-import openai
-from dotenv import load_dotenv
 import logging
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 class TTSService:
@@ -18,7 +15,15 @@ class TTSService:
         if not self.api_key:
             logger.warning("No OpenAI API key found. TTS synthesis will fail.")
         
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self._client = None
+    
+    @property
+    def client(self):
+        # The openai SDK is slow to import, so it is loaded on the first call rather than at startup
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=self.api_key)
+        return self._client
     
     async def synthesize(self, text: str, voice: str = "alloy") -> bytes:
         """Synthesize speech from text using OpenAI TTS"""
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+ROUTE_POOL = "pool"    # precomputed reply, no LLM call
+ROUTE_LIGHT = "light"  # short prompt, optionally a smaller model
+ROUTE_FULL = "full"    # full orchestrator prompt
+
+# Trivial turns by category; matched against the normalized message
+TRIVIAL_PHRASES = {
+    "greeting": {"hi", "hii", "hey", "heyy", "hello", "hola", "yo", "sup", "good morning", "good evening", "gm"},
+    "thanks": {"thanks", "thank you", "thx", "ty", "thanks a lot", "thank u"},
+    "bye": {"bye", "goodbye", "good night", "gn", "see you", "ttyl", "later"},
+    "ack": {"ok", "okay", "k", "kk", "cool", "nice", "hmm", "hmmm", "lol", "haha", "got it", "sure", "alright"},
+}
+
+# Categories answered from the pool; acks still go to the light prompt so the reply fits the thread
+POOL_CATEGORIES = {"greeting", "thanks", "bye"}
+
+RESPONSE_POOL = {
+    "greeting": [
+        "Hey {name}! What's on your mind today?",
+        "Hi {name} — good to hear from you. How's everything going?",
+        "Hey {name}. What are you thinking about today — prep, work, or something else?",
+    ],
+    "first_greeting": [
+        "Hey {name}, nice to meet you! What's taking up most of your headspace these days?",
+        "Hi {name}! I'm here whenever you want to think out loud. What's going on lately?",
+    ],
+    "thanks": [
+        "Anytime, {name}.",
+        "Happy to help. I'm here whenever you want to pick this up again.",
+        "Of course! Let me know how it goes.",
+    ],
+    "bye": [
+        "Take care, {name}. Talk soon.",
+        "Bye for now — come back anytime.",
+        "Catch you later, {name}!",
+    ],
+}
+
+# Playful turns longer than this get the full orchestrator
+ROAST_MAX_WORDS = 12
+
+_non_word = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_non_word.sub(" ", text.lower()).split())
+
+
+class TurnRouter:
+    """Decides how much orchestration a chat turn needs before any LLM call is made"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counts = {ROUTE_POOL: 0, ROUTE_LIGHT: 0, ROUTE_FULL: 0}
+
+    def route(self, text: str, track: str, conversation_history: list = None) -> tuple:
+        """Return (route, category) for a turn"""
+        route, category = self._classify(text, track, conversation_history or [])
+        self.counts[route] += 1
+        return route, category
+
+    def _classify(self, text: str, track: str, conversation_history: list) -> tuple:
+        if not self.enabled:
+            return ROUTE_FULL, None
+        normalized = normalize(text)
+
+        # A reply to our own question ("Curious or skip?") is part of a flow and needs full context
+        last = conversation_history[-1] if conversation_history else None
+        if last and last.get("role") == "assistant" and last.get("text", "").rstrip().endswith("?"):
+            if normalized not in TRIVIAL_PHRASES["greeting"]:
+                return ROUTE_FULL, None
+
+        # Substantive CAT/MBA and career turns always get the full orchestrator
+        if track in ("cat_mba", "jobs_career"):
+            return ROUTE_FULL, None
+
+        for category, phrases in TRIVIAL_PHRASES.items():
+            if normalized in phrases:
+                return (ROUTE_POOL if category in POOL_CATEGORIES else ROUTE_LIGHT), category
+
+        if track == "roast_play" and len(normalized.split()) <= ROAST_MAX_WORDS:
+            return ROUTE_LIGHT, "roast_play"
+
+        return ROUTE_FULL, None
+
+    def pooled_response(self, category: str, name: str, message_count: int, seed: str = "") -> str:
+        """Pick a precomputed reply, deterministic per seed"""
+        if category == "greeting" and message_count == 0:
+            category = "first_greeting"
+        options = RESPONSE_POOL[category]
+        index = int(hashlib.sha1(f"{seed}:{message_count}".encode("utf-8")).hexdigest()[:8], 16) % len(options)
+        return options[index].format(name=name or "there")
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            "enabled": self.enabled,
+            "total": total,
+            "counts": dict(self.counts),
+            "hit_rates": {
+                route: round(count / total, 4) if total else 0.0
+                for route, count in self.counts.items()
+            }
+        }
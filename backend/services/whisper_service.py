@@ -1,10 +1,7 @@
 import os
-import openai
-from dotenv import load_dotenv
 import tempfile
 import logging
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 class WhisperService:
@@ -19,7 +16,15 @@ class WhisperService:
         if not self.api_key:
             logger.warning("No OpenAI API key found. Whisper transcription will fail.")
         
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self._client = None
+    
+    @property
+    def client(self):
+        # The openai SDK is slow to import, so it is loaded on the first call rather than at startup
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=self.api_key)
+        return self._client
     
     async def transcribe(self, audio_content: bytes, filename: str = "audio.mp3") -> dict:
         """Transcribe audio using OpenAI Whisper API"""
@@ -13,6 +13,47 @@ const api = axios.create({
   },
 });
 
+// Message sends carry an Idempotency-Key so a retry after a dropped response isn't processed twice
+const newIdempotencyKey = () => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
+const postIdempotent = async (url: string, body: any, retries: number = 2) => {
+  const headers = { 'Idempotency-Key': newIdempotencyKey() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await api.post(url, body, { headers });
+    } catch (error: any) {
+      const status = error?.response?.status;
+      // Retry network failures, 5xx, "still in progress" and "busy" with the same key
+      const retryable = !status || status >= 500 || status === 409 || status === 429;
+      if (!retryable || attempt >= retries) throw error;
+      const retryAfter = Number(error?.response?.headers?.['retry-after']);
+      const delay = retryAfter > 0 ? Math.min(retryAfter, 5) * 1000 : 500 * (attempt + 1);
+      await new Promise((resolve) => setTimeout(resolve, delay));
+    }
+  }
+};
+
+// Polled endpoints send ETags; revalidate with If-None-Match and reuse the last body on 304
+const etagCache = new Map<string, { etag: string; data: any }>();
+
+const getConditional = async (url: string, params?: Record<string, any>) => {
+  const cacheKey = `${url}?${JSON.stringify(params ?? {})}`;
+  const cached = etagCache.get(cacheKey);
+  const response = await api.get(url, {
+    params,
+    headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  const etag = response.headers?.etag;
+  if (etag) {
+    etagCache.set(cacheKey, { etag, data: response.data });
+  }
+  return response.data;
+};
+
 export const apiService = {
   // User endpoints
   createUser: async (userData: Partial<User>): Promise<User> => {
@@ -27,7 +68,7 @@ export const apiService = {
 
   // Chat endpoints
   sendMessage: async (userId: string, text: string, isVoice: boolean = false, audioDuration?: number): Promise<Message> => {
-    const response = await api.post('/chat/message', {
+    const response = await postIdempotent('/chat/message', {
       user_id: userId,
       text,
       is_voice: isVoice,
@@ -37,10 +78,8 @@ export const apiService = {
   },
 
   getChatHistory: async (userId: string, limit: number = 50): Promise<Message[]> => {
-    const response = await api.get(`/chat/history/${userId}`, {
-      params: { limit },
-    });
-    return response.data.messages;
+    const data = await getConditional(`/chat/history/${userId}`, { limit });
+    return data.messages;
   },
 
   // Audio endpoints
@@ -81,8 +120,8 @@ export const apiService = {
 
   // Intro endpoints
   getIntros: async (userId: string): Promise<Intro[]> => {
-    const response = await api.get(`/intros/${userId}`);
-    return response.data.intros;
+    const data = await getConditional(`/intros/${userId}`);
+    return data.intros;
   },
 
   introAction: async (introId: string, action: 'accept' | 'decline'): Promise<{ success: boolean; status: string }> => {
@@ -113,12 +152,12 @@ export const apiService = {
   },
 
   getPeerConversations: async (userId: string): Promise<any[]> => {
-    const response = await api.get(`/peer/conversations/${userId}`);
-    return response.data.conversations;
+    const data = await getConditional(`/peer/conversations/${userId}`);
+    return data.conversations;
   },
 
   sendPeerMessage: async (fromUserId: string, toUserId: string, text: string): Promise<any> => {
-    const response = await api.post('/peer/messages', {
+    const response = await postIdempotent('/peer/messages', {
       from_user_id: fromUserId,
       to_user_id: toUserId,
       text,
@@ -132,4 +171,12 @@ export const apiService = {
     });
     return response.data.messages;
   },
+
+  // Delta sync: pass the previous sync_token as `since`; rows may repeat, merge them by id
+  sync: async (userId: string, since?: string): Promise<any> => {
+    const response = await api.get(`/sync/${userId}`, {
+      params: since ? { since } : undefined,
+    });
+    return response.data;
+  },
 };
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+# Backend modules import each other as top-level packages (`from services.x import ...`)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def host_tz():
+    """Switch the process time zone for one test: host_tz("America/New_York")"""
+    original = os.environ.get("TZ")
+
+    def set_tz(name: str):
+        os.environ["TZ"] = name
+        time.tzset()
+
+    yield set_tz
+    if original is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = original
+    time.tzset()
+
+
+@pytest.fixture(scope="session")
+def server():
+    """The server module wired to in-memory Mongo and fake LLM/audio backends, as in the load test"""
+    from benchmarks.load_test import boot_app
+
+    return boot_app(SimpleNamespace(
+        mongo_url=None, llm_latency="fixed:0", llm_error_rate=0.0, seed=0, audio_latency="fixed:0",
+        log_level="WARNING"
+    ))
+
+
+@pytest.fixture(scope="session")
+def api(server):
+    """
+    Run `async def scenario(client)` against the app: api(scenario). The lifespan runs once on a
+    loop of its own, as in a real server, so every scenario shares its background tasks and queues.
+    """
+    loop = asyncio.new_event_loop()
+    lifespan = server.app.router.lifespan_context(server.app)
+    loop.run_until_complete(lifespan.__aenter__())
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+    def run(scenario):
+        return loop.run_until_complete(scenario(client))
+
+    yield run
+    loop.run_until_complete(client.aclose())
+    loop.run_until_complete(lifespan.__aexit__(None, None, None))
+    loop.close()
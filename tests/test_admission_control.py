@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from services import admission_control
+from services.admission_control import AdmissionController, AdmissionRejectedError
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_admits_up_to_capacity_then_queues_and_hands_over_on_release():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=2, interactive_reserved=0)
+        await controller.acquire("chat", "u1")
+        await controller.acquire("chat", "u2")
+        waiter = asyncio.create_task(controller.acquire("chat", "u3"))
+        await asyncio.sleep(0)
+        assert controller.queue_depths()["interactive"] == 1
+        controller.release()
+        await waiter
+        assert controller.in_flight == 2
+        assert controller.queue_depths()["interactive"] == 0
+
+    run(scenario())
+
+
+def test_background_work_cannot_take_reserved_interactive_slots():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=2, interactive_reserved=1, queue_timeouts={0: 0.01, 1: 0.01, 2: 0.01})
+        await controller.acquire("summary", "u1")
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire("matching", "u1")
+        await controller.acquire("chat", "u2")
+        assert controller.in_flight == 2
+
+    run(scenario())
+
+
+def test_queue_timeout_rejects_and_counts():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0, queue_timeouts={0: 0.01, 1: 0.01, 2: 0.01})
+        await controller.acquire("chat", "u1")
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire("chat", "u2")
+        assert controller.timed_out[0] == 1
+        assert controller.in_flight == 1
+        assert controller.queue_depths()["interactive"] == 0
+
+    run(scenario())
+
+
+def test_slot_granted_as_wait_times_out_is_released(monkeypatch):
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0)
+        await controller.acquire("chat", "u1")
+
+        async def wait_for_that_loses_the_race(future, timeout):
+            # The holder releases, dispatch resolves our future, and only then does the timeout fire
+            controller.release()
+            assert future.done()
+            raise asyncio.TimeoutError()
+
+        monkeypatch.setattr(admission_control.asyncio, "wait_for", wait_for_that_loses_the_race)
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire("chat", "u2")
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_slot_granted_as_waiter_is_cancelled_is_released(monkeypatch):
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0)
+        await controller.acquire("chat", "u1")
+
+        async def wait_for_cancelled_after_grant(future, timeout):
+            controller.release()
+            assert future.done()
+            raise asyncio.CancelledError()
+
+        monkeypatch.setattr(admission_control.asyncio, "wait_for", wait_for_cancelled_after_grant)
+        with pytest.raises(asyncio.CancelledError):
+            await controller.acquire("chat", "u2")
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_full_queue_rejects_on_arrival():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0, max_queued_per_user=1)
+        await controller.acquire("chat", "u1")
+        waiter = asyncio.create_task(controller.acquire("chat", "u2"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError, match="Too many queued"):
+            controller.check("chat", "u2")
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    run(scenario())
+
+
+def test_repair_calls_inherit_their_parent_priority():
+    assert admission_control.priority_for("chat_repair") == admission_control.PRIORITY_INTERACTIVE
+    assert admission_control.priority_for("matching") == admission_control.PRIORITY_BATCH
+    assert admission_control.priority_for("unknown") == admission_control.PRIORITY_BACKGROUND
+
+
+def test_nested_slot_in_the_same_task_reuses_the_held_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0, queue_timeouts={0: 0.01, 1: 0.01, 2: 0.01})
+        async with controller.slot("chat", "u1"):
+            # A turn holding its slot calls the LLM client, which asks for a slot again
+            async with controller.slot("chat_light", "u1"):
+                assert controller.in_flight == 1
+            assert controller.in_flight == 1
+        assert controller.in_flight == 0
+        assert controller.admitted[admission_control.PRIORITY_INTERACTIVE] == 1
+
+    run(scenario())
+
+
+def test_tasks_spawned_while_holding_a_slot_queue_for_their_own():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=2, interactive_reserved=0)
+        seen = []
+
+        async def background():
+            async with controller.slot("summary", "u1"):
+                seen.append(controller.in_flight)
+
+        async with controller.slot("chat", "u1"):
+            await asyncio.create_task(background())
+        assert seen == [2]
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_llm_call_inside_a_held_chat_slot_is_not_queued_behind_it():
+    from services.llm_client import FakeProvider, LLMClient
+
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, interactive_reserved=0, queue_timeouts={0: 0.05, 1: 0.05, 2: 0.05})
+        llm = LLMClient(FakeProvider(), admission=controller)
+        async with controller.slot("chat", "u1"):
+            reply = await llm.complete("system", "hello", purpose="chat", user_id="u1")
+            # Another request's turn is still bounded by the one slot
+            with pytest.raises(AdmissionRejectedError):
+                await asyncio.create_task(llm.complete("system", "hello", purpose="chat", user_id="u2"))
+        return reply
+
+    assert run(scenario()).startswith("Got it.")
@@ -0,0 +1,81 @@
+import time
+
+from services.context_cache import ConversationContextCache
+
+
+def turn(role: str, text: str) -> dict:
+    return {"role": role, "text": text}
+
+
+def put(cache, user_id: str, turns=None, text_size: int = 0):
+    return cache.put(
+        user_id,
+        {"_id": user_id, "name": "A"},
+        {"_id": "c-" + user_id, "message_count": len(turns or []), "current_track": None},
+        {"big_rocks": ["x" * text_size]} if text_size else {},
+        turns or []
+    )
+
+
+def test_append_turns_keeps_the_latest_max_turns_and_counts_messages():
+    cache = ConversationContextCache(max_turns=3)
+    put(cache, "u1", [turn("user", "hi"), turn("assistant", "hello")])
+    cache.append_turns("u1", [turn("user", "one"), turn("assistant", "two")], message_count_inc=2, current_track="cat_mba")
+
+    context = cache.get("u1")
+    assert [t["text"] for t in context.turns] == ["hello", "one", "two"]
+    assert context.conversation["message_count"] == 4
+    assert context.conversation["current_track"] == "cat_mba"
+
+
+def test_write_through_is_a_no_op_on_miss():
+    cache = ConversationContextCache()
+    cache.append_turns("u1", [turn("user", "hi")], message_count_inc=1)
+    cache.update_conversation("u1", current_track="jobs_career")
+    cache.set_learnings("u1", {"north_star": "x"})
+    assert cache.get("u1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_update_conversation_and_learnings_write_through():
+    cache = ConversationContextCache()
+    put(cache, "u1")
+    cache.update_conversation("u1", current_track="jobs_career", summary="short")
+    cache.set_learnings("u1", {"north_star": "freedom"})
+    context = cache.get("u1")
+    assert context.conversation["current_track"] == "jobs_career"
+    assert context.conversation["summary"] == "short"
+    assert context.learnings == {"north_star": "freedom"}
+
+
+def test_lru_eviction_by_user_count():
+    cache = ConversationContextCache(max_users=2)
+    put(cache, "u1")
+    put(cache, "u2")
+    cache.get("u1")
+    put(cache, "u3")
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None and cache.get("u3") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes_keeps_accounting_exact():
+    cache = ConversationContextCache(max_bytes=5000)
+    put(cache, "u1", text_size=2000)
+    put(cache, "u2", text_size=2000)
+    cache.append_turns("u2", [turn("user", "y" * 1500)])
+    assert cache.get("u1") is None
+    assert cache.stats()["size"] == 1
+    assert cache.total_bytes == cache.get("u2").size <= 5000
+
+    cache.invalidate("u2")
+    assert cache.total_bytes == 0
+
+
+def test_expired_entries_miss():
+    cache = ConversationContextCache(ttl_seconds=0.01)
+    put(cache, "u1")
+    time.sleep(0.02)
+    assert cache.get("u1") is None
+    assert cache.total_bytes == 0
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.etag import CACHE_CONTROL, change_marker, etag_matches, make_etag, not_modified
+
+
+def test_make_etag_is_weak_and_stable():
+    etag = make_etag("history", "c1", 3, datetime(2026, 3, 1))
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert make_etag("history", "c1", 3, datetime(2026, 3, 1)) == etag
+    assert make_etag("history", "c1", 4, datetime(2026, 3, 1)) != etag
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ("", False),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"other", W/"abc"', True),
+    ('"other"', False),
+    ("*", True),
+])
+def test_etag_matches_uses_weak_comparison(if_none_match, expected):
+    assert etag_matches(if_none_match, 'W/"abc"') is expected
+
+
+def test_not_modified_carries_the_etag():
+    response = not_modified('W/"abc"')
+    assert response.status_code == 304
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert response.headers["Cache-Control"] == CACHE_CONTROL
+
+
+def test_change_marker_moves_on_insert_update_and_delete():
+    async def scenario():
+        db = MemoryDatabase("test")
+        query = {"user_id": "u1"}
+        assert await change_marker(db.intros, query) == (0, None)
+        assert await change_marker(db.intros, query, "message_count") == (0, None, 0)
+
+        first = await db.intros.insert_one({"user_id": "u1", "updated_at": datetime(2026, 3, 1), "message_count": 2})
+        await db.intros.insert_one({"user_id": "u2", "updated_at": datetime(2026, 3, 5)})
+        assert await change_marker(db.intros, query, "message_count") == (1, datetime(2026, 3, 1), 2)
+
+        await db.intros.update_one({"_id": first.inserted_id}, {"$set": {"updated_at": datetime(2026, 3, 2)}})
+        assert await change_marker(db.intros, query) == (1, datetime(2026, 3, 2))
+
+        await db.intros.delete_one({"_id": first.inserted_id})
+        assert await change_marker(db.intros, query) == (0, None)
+
+    asyncio.run(scenario())
+
+
+def test_polled_endpoints_answer_304_until_something_changes(api):
+    async def scenario(client):
+        asha = (await client.post("/api/users", json={"name": "Asha"})).json()["id"]
+        ravi = (await client.post("/api/users", json={"name": "Ravi"})).json()["id"]
+        await client.post("/api/chat/message", json={"user_id": asha, "text": "my CAT mock went badly"})
+        await client.post("/api/peer/messages", json={"from_user_id": asha, "to_user_id": ravi, "text": "hi Ravi"})
+
+        results = {}
+        for path in (f"/api/chat/history/{asha}", f"/api/intros/{asha}", f"/api/peer/conversations/{ravi}"):
+            fresh = await client.get(path)
+            revalidated = await client.get(path, headers={"If-None-Match": fresh.headers["ETag"]})
+            results[path] = (fresh, revalidated)
+
+        await client.post("/api/chat/message", json={"user_id": asha, "text": "what should I do next"})
+        await client.post("/api/peer/messages", json={"from_user_id": ravi, "to_user_id": asha, "text": "hey"})
+        changed = {}
+        for path in (f"/api/chat/history/{asha}", f"/api/peer/conversations/{ravi}"):
+            etag = results[path][0].headers["ETag"]
+            changed[path] = await client.get(path, headers={"If-None-Match": etag})
+        return results, changed
+
+    results, changed = api(scenario)
+    for fresh, revalidated in results.values():
+        assert fresh.status_code == 200
+        assert fresh.headers["Cache-Control"] == CACHE_CONTROL
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["ETag"] == fresh.headers["ETag"]
+    for path, response in changed.items():
+        assert response.status_code == 200
+        assert response.headers["ETag"] != results[path][0].headers["ETag"]
@@ -0,0 +1,73 @@
+import json
+from datetime import date, datetime
+
+import pytest
+from bson import ObjectId
+from pydantic import BaseModel
+
+from services import fast_json
+from services.fast_json import FastJSONResponse, dumps
+
+
+class Card(BaseModel):
+    name: str
+    seen_at: datetime
+
+
+ROW = {
+    "id": ObjectId("65f000000000000000000001"),
+    "text": "naïve café — ok",
+    "created_at": datetime(2026, 3, 1, 9, 30, 5, 120000),
+    "on_the_hour": datetime(2026, 3, 1, 9),
+    "day": date(2026, 3, 1),
+    "score": 0.5,
+    "tags": ["cat", None, True],
+    "card": Card(name="Asha", seen_at=datetime(2026, 3, 1)),
+}
+
+
+def test_mongo_rows_encode_like_field_by_field_formatting():
+    assert json.loads(dumps(ROW)) == {
+        "id": "65f000000000000000000001",
+        "text": "naïve café — ok",
+        "created_at": "2026-03-01T09:30:05.120000",
+        "on_the_hour": "2026-03-01T09:00:00",
+        "day": "2026-03-01",
+        "score": 0.5,
+        "tags": ["cat", None, True],
+        "card": {"name": "Asha", "seen_at": "2026-03-01T00:00:00"},
+    }
+
+
+@pytest.mark.skipif(fast_json.orjson is None, reason="orjson not installed")
+def test_stdlib_fallback_produces_the_same_bytes(monkeypatch):
+    fast = dumps(ROW)
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.backend() == "json"
+    assert dumps(ROW) == fast
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_response_renders_once_as_json():
+    response = FastJSONResponse({"messages": [{"id": ObjectId("65f000000000000000000001")}]})
+    assert response.media_type == "application/json"
+    assert response.body == b'{"messages":[{"id":"65f000000000000000000001"}]}'
+
+
+def test_chat_history_rows_come_back_shaped_by_the_projection(api):
+    async def scenario(client):
+        user = (await client.post("/api/users", json={"name": "Asha"})).json()
+        await client.post("/api/chat/message", json={"user_id": user["id"], "text": "my CAT mock went badly"})
+        return await client.get(f"/api/chat/history/{user['id']}")
+
+    messages = api(scenario).json()["messages"]
+    assert [message["role"] for message in messages] == ["user", "assistant"]
+    assert set(messages[0]) == {
+        "id", "role", "text", "track", "is_voice", "audio_duration", "has_audio_response", "created_at"
+    }
+    assert isinstance(messages[0]["id"], str)
+    assert datetime.fromisoformat(messages[0]["created_at"])
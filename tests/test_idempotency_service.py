@@ -0,0 +1,181 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.admission_control import AdmissionRejectedError
+from services.idempotency_service import (
+    IdempotencyConflictError, IdempotencyError, IdempotencyInProgressError, IdempotencyService, fingerprint
+)
+
+
+class CountingHandler:
+    def __init__(self, result=None, delay: float = 0, error: Exception = None):
+        self.result = result or {"ok": True}
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return self.result
+
+
+def service(**kwargs) -> IdempotencyService:
+    kwargs.setdefault("poll_interval", 0.01)
+    return IdempotencyService(MemoryDatabase("test"), **kwargs)
+
+
+def test_retry_replays_the_stored_response():
+    async def scenario():
+        idempotency = service()
+        handler = CountingHandler({"id": "m1"})
+        first = await idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler)
+        second = await idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler)
+
+        assert first == ({"id": "m1"}, False)
+        assert second == ({"id": "m1"}, True)
+        assert handler.calls == 1
+        stored = await idempotency.db.idempotency_keys.find_one({"_id": "chat:u1:k1"})
+        assert stored["status"] == "done"
+
+    asyncio.run(scenario())
+
+
+def test_same_key_with_a_different_body_conflicts():
+    async def scenario():
+        idempotency = service()
+        await idempotency.run("chat", "u1", "k1", {"text": "hi"}, CountingHandler())
+        with pytest.raises(IdempotencyConflictError):
+            await idempotency.run("chat", "u1", "k1", {"text": "something else"}, CountingHandler())
+        # Keys are scoped per user and endpoint
+        assert (await idempotency.run("chat", "u2", "k1", {"text": "other"}, CountingHandler()))[1] is False
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_duplicates_run_the_handler_once():
+    async def scenario():
+        idempotency = service()
+        handler = CountingHandler(delay=0.02)
+        results = await asyncio.gather(*[
+            idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler) for _ in range(3)
+        ])
+        assert handler.calls == 1
+        assert sorted(replayed for _, replayed in results) == [False, True, True]
+        assert idempotency.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_handler_releases_the_key_for_the_retry():
+    async def scenario():
+        idempotency = service()
+        handler = CountingHandler(error=AdmissionRejectedError("busy"))
+        with pytest.raises(AdmissionRejectedError):
+            await idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler)
+        assert await idempotency.db.idempotency_keys.find_one({"_id": "chat:u1:k1"}) is None
+
+        assert await idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler) == ({"ok": True}, False)
+        assert handler.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_waits_for_a_pending_key_held_elsewhere():
+    async def scenario():
+        idempotency = service(wait_timeout=1)
+        now = datetime.utcnow()
+        await idempotency.db.idempotency_keys.insert_one({
+            "_id": "chat:u1:k1", "fingerprint": fingerprint({"text": "hi"}), "status": "pending",
+            "locked_until": now + timedelta(seconds=60), "created_at": now
+        })
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.03)
+            await idempotency.db.idempotency_keys.update_one(
+                {"_id": "chat:u1:k1"}, {"$set": {"status": "done", "response": {"id": "m1"}}}
+            )
+
+        handler = CountingHandler()
+        result, _ = await asyncio.gather(
+            idempotency.run("chat", "u1", "k1", {"text": "hi"}, handler), finish_elsewhere()
+        )
+        assert result == ({"id": "m1"}, True)
+        assert handler.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_pending_key_times_out_then_is_taken_over_once_its_lock_expires():
+    async def scenario():
+        idempotency = service(wait_timeout=0.03)
+        now = datetime.utcnow()
+        record = {
+            "_id": "chat:u1:k1", "fingerprint": fingerprint({"text": "hi"}), "status": "pending",
+            "locked_until": now + timedelta(seconds=60), "created_at": now
+        }
+        await idempotency.db.idempotency_keys.insert_one(dict(record))
+        with pytest.raises(IdempotencyInProgressError):
+            await idempotency.run("chat", "u1", "k1", {"text": "hi"}, CountingHandler())
+
+        # The holder died: its lock expired, so the next attempt runs the handler
+        await idempotency.db.idempotency_keys.update_one(
+            {"_id": "chat:u1:k1"}, {"$set": {"locked_until": now - timedelta(seconds=1)}}
+        )
+        assert await idempotency.run("chat", "u1", "k1", {"text": "hi"}, CountingHandler()) == ({"ok": True}, False)
+
+    asyncio.run(scenario())
+
+
+def test_missing_key_runs_without_storing_and_long_keys_are_rejected():
+    async def scenario():
+        idempotency = service()
+        handler = CountingHandler()
+        await idempotency.run("chat", "u1", None, {"text": "hi"}, handler)
+        await idempotency.run("chat", "u1", None, {"text": "hi"}, handler)
+        assert handler.calls == 2
+        with pytest.raises(IdempotencyError):
+            await idempotency.run("chat", "u1", "k" * 256, {"text": "hi"}, handler)
+
+    asyncio.run(scenario())
+
+
+def test_chat_retry_after_a_rejected_turn_stores_one_user_message(server, api, monkeypatch):
+    generate = server.gemini_service.generate_response
+    calls = []
+
+    async def reject_first(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise AdmissionRejectedError("LLM queue full", retry_after=2)
+        return await generate(**kwargs)
+
+    monkeypatch.setattr(server.gemini_service, "generate_response", reject_first)
+
+    async def scenario(client):
+        user = (await client.post("/api/users", json={"name": "Asha"})).json()
+        body = {"user_id": user["id"], "text": "should I retake the CAT mock test this weekend"}
+        headers = {"Idempotency-Key": "retry-1"}
+
+        rejected = await client.post("/api/chat/message", json=body, headers=headers)
+        assert rejected.status_code == 429
+        assert rejected.headers["Retry-After"] == "2"
+
+        accepted = await client.post("/api/chat/message", json=body, headers=headers)
+        assert accepted.status_code == 200
+        replayed = await client.post("/api/chat/message", json=body, headers=headers)
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert replayed.json()["id"] == accepted.json()["id"]
+
+        conversation = await server.db.conversations.find_one({"user_id": user["id"]})
+        messages = await server.db.messages.find({"conversation_id": str(conversation["_id"])}).to_list(None)
+        assert [message["role"] for message in messages] == ["user", "assistant"]
+
+    api(scenario)
+    assert len(calls) == 2
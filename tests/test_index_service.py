@@ -0,0 +1,54 @@
+import asyncio
+
+from pymongo import ASCENDING, DESCENDING
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.index_service import INDEXES, IndexService, _spec_matches
+
+SPEC = {"name": "user_id_created_at", "keys": [("user_id", ASCENDING), ("created_at", DESCENDING)]}
+
+
+def test_spec_matches_index_information_entry():
+    # Mongo reports directions as floats on some servers
+    assert _spec_matches(SPEC, {"key": [("user_id", 1.0), ("created_at", -1.0)]})
+
+
+def test_spec_mismatch_on_keys_and_options():
+    assert not _spec_matches(SPEC, {"key": [("created_at", -1), ("user_id", 1)]})
+    assert not _spec_matches(SPEC, {"key": [("user_id", 1), ("created_at", 1)]})
+    assert not _spec_matches(SPEC, {"key": [("user_id", 1), ("created_at", -1)], "unique": True})
+    ttl = {**SPEC, "expireAfterSeconds": 3600}
+    assert _spec_matches(ttl, {"key": [("user_id", 1), ("created_at", -1)], "expireAfterSeconds": 3600})
+    assert not _spec_matches(ttl, {"key": [("user_id", 1), ("created_at", -1)], "expireAfterSeconds": 60})
+
+
+def test_no_drift_after_ensure_indexes():
+    async def scenario():
+        service = IndexService(MemoryDatabase("test"))
+        report = await service.ensure_indexes()
+        assert all(not entry["failed"] for entry in report.values())
+        assert set(report) == set(INDEXES)
+        assert await service.check_drift() == {}
+
+    asyncio.run(scenario())
+
+
+def test_drift_reports_missing_extra_and_mismatched():
+    async def scenario():
+        db = MemoryDatabase("test")
+        registry = {"messages": [SPEC, {"name": "track", "keys": [("track", ASCENDING)]}]}
+        service = IndexService(db, registry)
+        await service.ensure_indexes()
+
+        # Someone rebuilt one index by hand and added another
+        drifted = IndexService(db, {"messages": [{**SPEC, "keys": [("user_id", ASCENDING)]}]})
+        await drifted.ensure_indexes()
+        await IndexService(db, {"messages": [{"name": "adhoc", "keys": [("text", ASCENDING)]}]}).ensure_indexes()
+
+        assert await service.check_drift() == {
+            "messages": {"missing": [], "extra": ["adhoc"], "mismatched": ["user_id_created_at"]}
+        }
+        del db.messages._indexes["track"]
+        assert (await service.check_drift())["messages"]["missing"] == ["track"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.learning_compaction import LearningCompactor, compact_field, entry_key, normalize_text
+
+NOW = datetime(2026, 10, 1)
+
+
+def test_normalize_ignores_case_punctuation_and_spacing():
+    assert normalize_text("  Clear the CAT,   this year! ") == "clear the cat this year"
+    assert entry_key("big_rocks", "Clear the CAT!") == entry_key("big_rocks", "clear the cat")
+
+
+def test_near_duplicates_merge_into_the_earliest_slot_with_the_latest_wording():
+    entries = ["Crack the CAT exam", "Get a promotion", "crack the CAT exams"]
+    kept, stats = compact_field("big_rocks", entries, {}, NOW, cap=10)
+    assert kept == ["crack the CAT exams", "Get a promotion"]
+    assert stats[entry_key("big_rocks", "crack the CAT exams")]["count"] == 2
+
+
+def test_distinct_entries_are_not_merged():
+    kept, _ = compact_field("big_rocks", ["move to Pune", "move to Delhi"], {}, NOW, cap=10)
+    assert kept == ["move to Pune", "move to Delhi"]
+
+
+def test_cap_keeps_the_most_mentioned_and_recent_in_original_order():
+    entries = ["old once", "often mentioned", "recent once"]
+    stats = {
+        entry_key("big_rocks", "old once"): {"count": 1, "last_seen": NOW - timedelta(days=300)},
+        entry_key("big_rocks", "often mentioned"): {"count": 9, "last_seen": NOW - timedelta(days=60)},
+        entry_key("big_rocks", "recent once"): {"count": 1, "last_seen": NOW},
+    }
+    kept, kept_stats = compact_field("big_rocks", entries, stats, NOW, cap=2)
+    assert kept == ["often mentioned", "recent once"]
+    assert set(kept_stats) == {entry_key("big_rocks", "often mentioned"), entry_key("big_rocks", "recent once")}
+
+
+def test_object_entries_dedupe_on_their_identifying_key():
+    people = [{"name": "Asha", "relation": "sister"}, {"name": "asha.", "relation": "elder sister"}, {"name": ""}]
+    kept, _ = compact_field("important_people", people, {}, NOW, cap=20)
+    assert kept == [{"name": "asha.", "relation": "elder sister"}]
+
+
+def test_compact_user_rewrites_once_and_skips_when_up_to_date():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.learnings.insert_one({
+            "_id": "u1",
+            "version": 3,
+            "updated_at": NOW,
+            "data": {"big_rocks": ["Crack CAT", "crack CAT", "get a job"], "north_star": "freedom"},
+        })
+        compactor = LearningCompactor(db)
+        doc = await db.learnings.find_one({"_id": "u1"})
+        assert await compactor.compact_user(doc) is True
+
+        stored = await db.learnings.find_one({"_id": "u1"})
+        assert stored["data"]["big_rocks"] == ["crack CAT", "get a job"]
+        assert stored["data"]["north_star"] == "freedom"
+        assert stored["version"] == 4
+        assert await compactor.compact_user(stored) is False
+
+    asyncio.run(scenario())
+
+
+def test_compact_user_loses_to_a_concurrent_extraction():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.learnings.insert_one({"_id": "u1", "version": 1, "data": {"big_rocks": ["a", "a"]}})
+        doc = await db.learnings.find_one({"_id": "u1"})
+        await db.learnings.update_one({"_id": "u1"}, {"$set": {"data.big_rocks": ["a", "a", "b"]}, "$inc": {"version": 1}})
+
+        assert await LearningCompactor(db).compact_user(doc) is False
+        assert (await db.learnings.find_one({"_id": "u1"}))["data"]["big_rocks"] == ["a", "a", "b"]
+
+    asyncio.run(scenario())
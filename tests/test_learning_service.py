@@ -0,0 +1,84 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.learning_compaction import entry_key
+from services.learning_service import MAX_LOG_ITEMS, LearningService, build_learnings_update
+
+NOW = datetime(2026, 10, 1)
+
+
+class ScriptedLLM:
+    """Returns the queued replies in order"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    async def complete(self, **kwargs):
+        await asyncio.sleep(0)
+        return self.replies.pop(0)
+
+
+def test_update_uses_per_field_operators_and_bumps_version():
+    update = build_learnings_update({
+        "big_rocks": ["crack CAT", "", 3],
+        "north_star": "freedom",
+        "important_people": [{"name": "Asha"}, "not an object"],
+    }, NOW)
+
+    assert update["$addToSet"] == {"data.big_rocks": {"$each": ["crack CAT"]}}
+    assert update["$push"] == {"data.important_people": {"$each": [{"name": "Asha"}], "$slice": -MAX_LOG_ITEMS}}
+    assert update["$set"] == {"updated_at": NOW, "data.north_star": "freedom"}
+    assert update["$setOnInsert"] == {"created_at": NOW}
+    assert update["$inc"]["version"] == 1
+    assert update["$inc"][f"stats.big_rocks.{entry_key('big_rocks', 'crack CAT')}.count"] == 1
+    assert update["$max"] == {
+        f"stats.big_rocks.{entry_key('big_rocks', 'crack CAT')}.last_seen": NOW,
+        f"stats.important_people.{entry_key('important_people', {'name': 'Asha'})}.last_seen": NOW,
+    }
+
+
+def test_empty_extraction_only_touches_metadata():
+    update = build_learnings_update({}, NOW)
+    assert set(update) == {"$set", "$inc", "$setOnInsert"}
+    assert update["$inc"] == {"version": 1}
+
+
+def test_log_fields_are_capped_to_the_latest_entries():
+    async def scenario():
+        db = MemoryDatabase("test")
+        for batch in range(3):
+            events = [{"event": f"e{batch}-{i}"} for i in range(30)]
+            await db.learnings.update_one(
+                {"user_id": "u1"}, build_learnings_update({"life_events": events}, NOW + timedelta(minutes=batch)), upsert=True
+            )
+        doc = await db.learnings.find_one({"user_id": "u1"})
+        assert len(doc["data"]["life_events"]) == MAX_LOG_ITEMS
+        assert doc["data"]["life_events"][-1] == {"event": "e2-29"}
+        assert doc["version"] == 3
+        assert doc["created_at"] == NOW
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_extractions_merge_without_losing_updates():
+    async def scenario():
+        db = MemoryDatabase("test")
+        service = LearningService(db, ScriptedLLM(
+            json.dumps({"big_rocks": ["crack CAT"], "north_star": "freedom"}),
+            json.dumps({"big_rocks": ["crack CAT", "save money"]}),
+        ))
+        history = [{"role": "user", "text": "hi"}]
+        first, second = await asyncio.gather(
+            service.extract_and_update_learnings("u1", history),
+            service.extract_and_update_learnings("u1", history),
+        )
+        doc = await db.learnings.find_one({"user_id": "u1"})
+        assert sorted(doc["data"]["big_rocks"]) == ["crack CAT", "save money"]
+        assert doc["data"]["north_star"] == "freedom"
+        assert doc["version"] == 2
+        assert doc["stats"]["big_rocks"][entry_key("big_rocks", "crack CAT")]["count"] == 2
+        assert second["big_rocks"] == doc["data"]["big_rocks"] or first["big_rocks"] == doc["data"]["big_rocks"]
+
+    asyncio.run(scenario())
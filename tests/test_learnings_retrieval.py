@@ -0,0 +1,47 @@
+from prompts.learnings_retrieval import select_learnings
+
+LEARNINGS = {
+    "big_rocks": ["clear the CAT exam this year", "switch career into product management", "save for a flat"],
+    "recurring_themes": ["anxious about mock test percentiles", "parents want a government job"],
+    "constraints": ["works long hours at a bank"],
+    "north_star": "a career I chose myself",
+}
+
+
+def test_ranks_entries_that_match_the_turn_first():
+    selected = select_learnings(LEARNINGS, "my mock test percentile dropped again", top_k=1)
+    assert selected["recurring_themes"] == ["anxious about mock test percentiles"]
+    assert selected["north_star"] == "a career I chose myself"
+    assert "big_rocks" not in selected
+
+
+def test_token_budget_bounds_the_selection():
+    selected = select_learnings(LEARNINGS, "career", top_k=10, token_budget=12)
+    entries = [entry for field in ("big_rocks", "recurring_themes", "constraints") for entry in selected.get(field, [])]
+    assert sum(len(entry) // 4 + 1 for entry in entries) + len(selected["north_star"]) // 4 + 1 <= 12
+
+
+def test_env_overrides_are_read_when_called(monkeypatch):
+    # Set after import, the way load_dotenv in server.py runs after this module is imported
+    monkeypatch.setenv("LEARNINGS_TOP_K", "1")
+    monkeypatch.setenv("LEARNINGS_TOKEN_BUDGET", "1000")
+    selected = select_learnings(LEARNINGS, "career")
+    assert sum(len(selected.get(field, [])) for field in ("big_rocks", "recurring_themes", "constraints")) == 1
+
+    monkeypatch.setenv("LEARNINGS_TOP_K", "6")
+    selected = select_learnings(LEARNINGS, "career")
+    assert sum(len(selected.get(field, [])) for field in ("big_rocks", "recurring_themes", "constraints")) == 6
+
+
+def test_empty_learnings_pass_through():
+    assert select_learnings({}, "anything") == {}
+    assert select_learnings(None, "anything") is None
+
+
+def test_bad_env_values_fall_back_to_defaults(monkeypatch, caplog):
+    default = select_learnings(LEARNINGS, "career")
+    for top_k, budget in [("six", "200"), ("0", "-5"), ("", "lots")]:
+        monkeypatch.setenv("LEARNINGS_TOP_K", top_k)
+        monkeypatch.setenv("LEARNINGS_TOKEN_BUDGET", budget)
+        assert select_learnings(LEARNINGS, "career") == default
+    assert "Ignoring LEARNINGS_TOP_K" in caplog.text
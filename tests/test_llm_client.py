@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from services.llm_client import CircuitBreaker, CircuitOpenError, FakeProvider, LLMClient, LLMError
+
+
+class FlakyProvider(FakeProvider):
+    """Fails the first `failures` calls, then answers like FakeProvider"""
+
+    def __init__(self, failures: int, latency: str = "fixed:0"):
+        super().__init__(latency=latency)
+        self.failures = failures
+
+    async def complete(self, system_message, message, model, session_id):
+        if self.calls < self.failures:
+            self.calls += 1
+            raise RuntimeError("provider down")
+        return await super().complete(system_message, message, model, session_id)
+
+
+class ListLedger:
+    def __init__(self):
+        self.entries = []
+
+    def record(self, entry: dict):
+        self.entries.append(entry)
+
+
+def client(provider, **kwargs) -> LLMClient:
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_cap", 0.002)
+    return LLMClient(provider, **kwargs)
+
+
+def test_breaker_opens_after_threshold_and_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only the first caller probes; the rest are still short-circuited
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_retries_until_the_provider_recovers():
+    async def scenario():
+        ledger = ListLedger()
+        llm = client(FlakyProvider(failures=2), max_retries=2, ledger=ledger)
+        reply = await llm.complete("system", "hello", purpose="chat", user_id="u1")
+
+        assert reply.startswith("Got it.")
+        assert llm.circuit_breaker.state == "closed"
+        entry, = ledger.entries
+        assert entry["attempts"] == 3
+        assert entry["outcome"] == "ok"
+        assert entry["user_id"] == "u1"
+        assert entry["completion_chars"] == len(reply)
+
+    asyncio.run(scenario())
+
+
+def test_raises_llm_error_after_the_last_retry():
+    async def scenario():
+        ledger = ListLedger()
+        provider = FlakyProvider(failures=10)
+        llm = client(provider, max_retries=2, ledger=ledger)
+        with pytest.raises(LLMError):
+            await llm.complete("system", "hello", purpose="chat")
+
+        assert provider.calls == 3
+        assert ledger.entries[0]["outcome"] == "error"
+        assert ledger.entries[0]["completion_chars"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_backoff_stays_under_the_cap(monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    async def scenario():
+        llm = client(FlakyProvider(failures=10), max_retries=3, backoff_base=0.5, backoff_cap=1.0)
+        monkeypatch.setattr("services.llm_client.asyncio.sleep", recording_sleep)
+        with pytest.raises(LLMError):
+            await llm.complete("system", "hello", purpose="chat")
+
+    asyncio.run(scenario())
+    assert len(delays) == 3
+    assert delays[0] <= 0.5
+    assert all(0 <= delay <= 1.0 for delay in delays)
+
+
+def test_timeouts_count_as_failures():
+    async def scenario():
+        ledger = ListLedger()
+        llm = client(FakeProvider(latency="fixed:200"), timeout=0.01, max_retries=0, ledger=ledger)
+        with pytest.raises(LLMError):
+            await llm.complete("system", "hello", purpose="chat")
+        assert ledger.entries[0]["outcome"] == "timeout"
+        assert llm.circuit_breaker.failures == 1
+
+    asyncio.run(scenario())
+
+
+def test_open_circuit_short_circuits_without_calling_the_provider():
+    async def scenario():
+        ledger = ListLedger()
+        provider = FlakyProvider(failures=10)
+        llm = client(provider, max_retries=0, ledger=ledger,
+                     circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+        with pytest.raises(LLMError):
+            await llm.complete("system", "hello", purpose="chat")
+        with pytest.raises(CircuitOpenError):
+            await llm.complete("system", "hello", purpose="chat")
+
+        assert provider.calls == 1
+        assert [entry["outcome"] for entry in ledger.entries] == ["error", "circuit_open"]
+
+    asyncio.run(scenario())
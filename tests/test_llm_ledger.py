@@ -0,0 +1,63 @@
+import asyncio
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.llm_ledger import LLMLedger, estimate_tokens, percentile, summarize_calls
+
+
+def test_percentile_picks_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 51
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_summarize_calls_counts_errors_latency_and_tokens():
+    rows = [
+        {"latency_ms": 100, "outcome": "ok", "prompt_tokens_est": 10, "completion_tokens_est": 5},
+        {"latency_ms": 300, "outcome": "error", "prompt_tokens_est": 30, "completion_tokens_est": 0},
+        {"latency_ms": None, "outcome": "rejected"},
+    ]
+    summary = summarize_calls(rows)
+    assert summary["calls"] == 3
+    assert summary["errors"] == 2
+    assert summary["latency_ms"]["max"] == 300
+    assert summary["prompt_tokens_est"] == 40
+    assert summary["avg_prompt_tokens_est"] == round(40 / 3, 1)
+    assert summarize_calls([])["error_rate"] == 0.0
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_record_never_blocks_and_drops_when_full():
+    async def scenario():
+        ledger = LLMLedger(MemoryDatabase("test"), max_queue=2)
+        for i in range(3):
+            ledger.record({"purpose": "chat", "i": i})
+        assert ledger.stats()["queued"] == 2
+        assert ledger.stats()["dropped"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_writer_batches_and_stop_flushes_everything():
+    async def scenario():
+        db = MemoryDatabase("test")
+        ledger = LLMLedger(db, batch_size=10, flush_interval=0.01)
+        ledger.start()
+        for i in range(25):
+            ledger.record({"purpose": "chat", "latency_ms": i, "outcome": "ok"})
+        await asyncio.sleep(0.05)
+        ledger.record({"purpose": "summary", "latency_ms": 5, "outcome": "error"})
+        await ledger.stop()
+
+        assert ledger.stats()["written"] == 26
+        report = await ledger.summarize(hours=1)
+        assert report["overall"]["calls"] == 26
+        assert report["by_purpose"]["summary"]["errors"] == 1
+        assert report["by_outcome"] == {"ok": 25, "error": 1}
+
+    asyncio.run(scenario())
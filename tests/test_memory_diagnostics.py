@@ -0,0 +1,96 @@
+import sys
+import tracemalloc
+
+import pytest
+
+from services.memory_diagnostics import MemoryDiagnostics, deep_sizeof, estimate_mapping_bytes
+
+
+def test_deep_sizeof_follows_containers_once():
+    shared = "x" * 1000
+    assert deep_sizeof([shared, shared]) == sys.getsizeof([shared, shared]) + sys.getsizeof(shared)
+    assert deep_sizeof({"k": [1, 2]}) > sys.getsizeof({"k": [1, 2]})
+
+
+def test_estimate_mapping_bytes_extrapolates_from_a_sample():
+    mapping = {i: "v" * 100 for i in range(1000)}
+    exact = sys.getsizeof(mapping) + sum(deep_sizeof(k) + deep_sizeof(v) for k, v in mapping.items())
+    assert estimate_mapping_bytes(mapping, sample=1000) == exact
+    assert abs(estimate_mapping_bytes(mapping, sample=50) - exact) < exact * 0.1
+    assert estimate_mapping_bytes({}) == sys.getsizeof({})
+
+
+def test_snapshots_top_and_diff():
+    diagnostics = MemoryDiagnostics(max_snapshots=2)
+    with pytest.raises(RuntimeError):
+        diagnostics.take_snapshot()
+
+    diagnostics.start(frames=5)
+    try:
+        first = diagnostics.take_snapshot("before")
+        retained = [bytearray(1024) for _ in range(100)]
+        second = diagnostics.take_snapshot("after")
+        diagnostics.take_snapshot("evicts the first")
+    finally:
+        diagnostics.stop()
+
+    assert retained and not tracemalloc.is_tracing()
+    assert [snapshot["id"] for snapshot in diagnostics.summary()["snapshots"]] == [second["id"], second["id"] + 1]
+    assert diagnostics.top(second["id"], limit=3)
+    with pytest.raises(KeyError):
+        diagnostics.diff(first["id"], second["id"])
+    with pytest.raises(ValueError):
+        diagnostics.top(second["id"], key_type="module")
+
+
+def test_failing_size_callback_is_reported_not_raised():
+    diagnostics = MemoryDiagnostics()
+    diagnostics.register("cache", lambda: {"entries": 3})
+    diagnostics.register("broken", lambda: 1 / 0)
+    assert diagnostics.sizes() == {"cache": {"entries": 3}, "broken": {"error": "division by zero"}}
+
+
+MEMORY_ENDPOINTS = [
+    ("GET", "/api/admin/memory"),
+    ("POST", "/api/admin/memory/tracemalloc?enabled=false"),
+    ("POST", "/api/admin/memory/snapshots"),
+    ("GET", "/api/admin/memory/snapshots/1"),
+    ("GET", "/api/admin/memory/diff?from_id=1&to_id=2"),
+]
+
+
+@pytest.mark.parametrize("method, path", MEMORY_ENDPOINTS)
+@pytest.mark.parametrize("admin_token, headers", [
+    (None, {"X-Admin-Token": "anything"}),
+    ("admin-secret", {}),
+    ("admin-secret", {"X-Admin-Token": "wrong"}),
+])
+def test_memory_endpoints_need_the_admin_token(api, monkeypatch, method, path, admin_token, headers):
+    if admin_token is None:
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    else:
+        monkeypatch.setenv("ADMIN_TOKEN", admin_token)
+
+    async def scenario(client):
+        return await client.request(method, path, headers=headers)
+
+    response = api(scenario)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin token required"
+
+
+def test_memory_endpoints_with_the_admin_token(api, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-secret")
+    headers = {"X-Admin-Token": "admin-secret"}
+
+    async def scenario(client):
+        summary = await client.get("/api/admin/memory", headers=headers)
+        not_tracing = await client.post("/api/admin/memory/snapshots", headers=headers)
+        missing = await client.get("/api/admin/memory/snapshots/999", headers=headers)
+        return summary, not_tracing, missing
+
+    summary, not_tracing, missing = api(scenario)
+    assert summary.status_code == 200
+    assert "profile_cache" in summary.json()["structures"]
+    assert not_tracing.status_code == 409
+    assert missing.status_code == 404
@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.metrics import (
+    Gauge, Histogram, MetricsRegistry, MongoCommandListener, end_request, server_timing, span, start_request
+)
+
+
+def test_histogram_renders_cumulative_buckets_and_inf():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/chat")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/chat",le="0.1"} 2',
+        'latency_seconds_bucket{route="/chat",le="1.0"} 3',
+        'latency_seconds_bucket{route="/chat",le="+Inf"} 4',
+        'latency_seconds_sum{route="/chat"} 3.65',
+        'latency_seconds_count{route="/chat"} 4',
+    ]
+
+
+def test_histogram_series_are_sorted_and_label_values_escaped():
+    histogram = Histogram("h", "help", ("route",), buckets=(1.0,))
+    histogram.observe(0.5, "/b")
+    histogram.observe(0.5, 'say "hi"\n')
+    lines = histogram.render()
+    assert lines[2] == 'h_bucket{route="/b",le="1.0"} 1'
+    assert 'h_count{route="say \\"hi\\"\\n"} 1' in lines
+
+
+def test_gauge_collects_at_render_and_survives_a_failing_callback():
+    values = {("profile_cards",): 3}
+    gauge = Gauge("entries", "Entries", ("cache",), lambda: values)
+    values[("conversation_contexts",)] = 1
+    assert gauge.render()[2:] == ['entries{cache="conversation_contexts"} 1', 'entries{cache="profile_cards"} 3']
+
+    broken = Gauge("broken", "Broken", (), lambda: 1 / 0)
+    assert broken.render() == ["# HELP broken Broken", "# TYPE broken gauge"]
+
+
+def test_registry_keeps_one_histogram_per_name():
+    registry = MetricsRegistry()
+    first = registry.histogram("h", "help")
+    assert registry.histogram("h", "other help") is first
+    first.observe(0.2)
+    assert registry.render().endswith("h_count 1\n")
+
+
+def test_spans_accumulate_per_request_including_spawned_tasks():
+    async def scenario():
+        token, spans = start_request()
+        try:
+            with span("mongo"):
+                pass
+
+            async def child():
+                async with span("llm"):
+                    await asyncio.sleep(0)
+
+            await asyncio.gather(child(), child())
+            MongoCommandListener().succeeded(SimpleNamespace(duration_micros=2000))
+        finally:
+            end_request(token)
+        return spans
+
+    spans = asyncio.run(scenario())
+    assert spans["mongo"][1] == 2 and spans["mongo"][0] >= 0.002
+    assert spans["llm"][1] == 2
+
+
+def test_server_timing_header():
+    header = server_timing({"mongo": [0.0042, 3], "llm": [0.5, 1]}, 0.8123)
+    assert header == 'llm;dur=500.0;desc="1 calls", mongo;dur=4.2;desc="3 calls", total;dur=812.3'
+    assert server_timing({}, 0.001) == "total;dur=1.0"
+
+
+def test_requests_get_server_timing_and_show_up_in_metrics(api):
+    async def scenario(client):
+        created = await client.post("/api/users", json={"name": "Asha"})
+        scraped = await client.get("/metrics")
+        return created, scraped
+
+    created, scraped = api(scenario)
+    assert created.headers["Server-Timing"].split(", ")[-1].startswith("total;dur=")
+    assert 'chekinn_http_request_duration_seconds_count{method="POST",route="/api/users",status="200"}' in scraped.text
+    assert "Server-Timing" not in scraped.headers
@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+
+from prompts.orchestrator import STATIC_PREFIX, STATIC_PREFIX_SHA1, build_prompt_parts, get_system_prompt
+from services.gemini_service import GeminiService
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def complete(self, **kwargs):
+        self.calls.append(kwargs)
+        return "ok"
+
+
+LEARNINGS = {"big_rocks": ["crack CAT"], "north_star": "run a company"}
+
+
+def test_prefix_is_identical_for_every_user():
+    first, first_suffix = build_prompt_parts({"name": "Asha", "message_count": 0}, LEARNINGS, query="CAT mocks")
+    second, second_suffix = build_prompt_parts({"name": "Ravi", "message_count": 40, "current_track": "jobs_career"})
+
+    assert first is STATIC_PREFIX and second is STATIC_PREFIX
+    assert hashlib.sha1(first.encode("utf-8")).hexdigest() == STATIC_PREFIX_SHA1
+    assert "Asha" in first_suffix and "crack CAT" in first_suffix
+    assert "Ravi" in second_suffix and "jobs_career" in second_suffix
+    assert "Asha" not in STATIC_PREFIX
+
+
+def test_full_prompt_is_prefix_plus_suffix():
+    context = {"name": "Asha", "message_count": 12}
+    prefix, suffix = build_prompt_parts(context, LEARNINGS)
+    assert get_system_prompt(context, LEARNINGS) == prefix + suffix
+
+
+def test_per_user_context_goes_in_the_message_not_the_system_prompt():
+    async def scenario():
+        llm = RecordingLLM()
+        service = GeminiService(llm)
+        for name in ("Asha", "Ravi"):
+            await service.generate_response(
+                "should I take another mock?",
+                conversation_history=[{"role": "user", "text": "hi"}, {"role": "assistant", "text": "hello"}],
+                user_context={"name": name, "message_count": 3},
+                learnings=LEARNINGS,
+                summary="Preparing for CAT.",
+                user_id=name
+            )
+        return llm.calls
+
+    calls = asyncio.run(scenario())
+    assert [call["system_message"] for call in calls] == [STATIC_PREFIX, STATIC_PREFIX]
+    assert "Asha" in calls[0]["message"] and "Ravi" in calls[1]["message"]
+    assert calls[0]["message"].index("Summary of earlier conversation") < calls[0]["message"].index("User: should I")
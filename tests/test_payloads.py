@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from services.payloads import intro_is_new, intro_payload, peer_conversation_payload, user_payload
+
+CREATED = datetime(2026, 3, 1, 9, 30)
+
+
+def test_user_payload_fills_the_user_response_defaults():
+    user_id = ObjectId()
+    assert user_payload({"_id": user_id, "name": "Asha", "created_at": CREATED}) == {
+        "id": str(user_id), "name": "Asha", "city": None, "current_role": None, "industries": [],
+        "intent": None, "open_to_intros": True, "preferred_mode": "voice", "created_at": CREATED
+    }
+
+
+def test_intro_payload_is_seen_from_either_side():
+    intro = {
+        "_id": "i1", "from_user_id": "u1", "to_user_id": "u2", "reason": "both prepping for CAT",
+        "status": "pending", "from_user_notified": True, "created_at": CREATED
+    }
+    card = {"name": "Ravi", "city": "Pune"}
+    for_asha = intro_payload(intro, "u1", card)
+    assert for_asha["other_user"] == {"id": "u2", "name": "Ravi", "city": "Pune", "current_role": None}
+    assert for_asha["is_new"] is False
+    assert intro_payload(intro, "u2", {})["other_user"]["id"] == "u1"
+    assert intro_is_new(intro, "u2")
+
+
+def test_peer_conversation_payload_without_messages():
+    conversation = {"_id": ObjectId(), "user1_id": "u1", "user2_id": "u2", "created_at": CREATED}
+    payload = peer_conversation_payload(conversation, "u2", {})
+    assert payload["other_user"] == {"id": "u1", "name": "User", "city": None, "current_role": None}
+    assert payload["last_message"] is None and payload["last_message_at"] == CREATED
+    assert payload["message_count"] == 0 and payload["status"] == "active"
+
+
+def test_list_endpoints_and_sync_deliver_the_same_rows(api):
+    async def scenario(client):
+        asha = (await client.post("/api/users", json={"name": "Asha", "city": "Pune"})).json()
+        ravi = (await client.post("/api/users", json={"name": "Ravi"})).json()
+        await client.post("/api/chat/message", json={"user_id": asha["id"], "text": "my CAT mock went badly"})
+        await client.post("/api/admin/create-intro", json={
+            "from_user_id": asha["id"], "to_user_id": ravi["id"], "reason": "both prepping for CAT"
+        })
+        await client.post("/api/peer/messages", json={"from_user_id": ravi["id"], "to_user_id": asha["id"], "text": "hi"})
+
+        synced = (await client.get(f"/api/sync/{asha['id']}")).json()
+        history = (await client.get(f"/api/chat/history/{asha['id']}")).json()["messages"]
+        intros = (await client.get(f"/api/intros/{asha['id']}")).json()["intros"]
+        peers = (await client.get(f"/api/peer/conversations/{asha['id']}")).json()["conversations"]
+        return asha, synced, history, intros, peers
+
+    asha, synced, history, intros, peers = api(scenario)
+    assert synced["user"] == asha
+    assert synced["messages"] == history
+    assert synced["peer_conversations"] == peers
+    # /intros marks intros as seen after reading them, which /sync never does
+    assert len(intros) == 1
+    assert synced["intros"] == [{**intros[0], "is_new": True}]
+
+
+def test_ending_a_peer_conversation_reaches_the_next_sync(api):
+    async def scenario(client):
+        asha = (await client.post("/api/users", json={"name": "Asha"})).json()["id"]
+        ravi = (await client.post("/api/users", json={"name": "Ravi"})).json()["id"]
+        sent = await client.post("/api/peer/messages", json={"from_user_id": asha, "to_user_id": ravi, "text": "hi"})
+        conversation_id = (await client.get(f"/api/peer/conversations/{ravi}")).json()["conversations"][0]["conversation_id"]
+        before = await client.get(f"/api/sync/{ravi}")
+        inbox = await client.get(f"/api/peer/conversations/{ravi}")
+
+        await client.post(f"/api/peer/conversations/{conversation_id}/end", params={"user_id": asha})
+        after = (await client.get(f"/api/sync/{ravi}", params={"since": before.json()["sync_token"]})).json()
+        revalidated = await client.get(f"/api/peer/conversations/{ravi}", headers={"If-None-Match": inbox.headers["ETag"]})
+        return sent, after, revalidated
+
+    sent, after, revalidated = api(scenario)
+    assert sent.status_code == 200
+    assert [conversation["status"] for conversation in after["peer_conversations"]] == ["ended"]
+    assert revalidated.status_code == 200
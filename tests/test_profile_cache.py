@@ -0,0 +1,113 @@
+import asyncio
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.profile_cache import ProfileCardCache
+
+
+def counting_db():
+    """MemoryDatabase that counts users.find calls"""
+    db = MemoryDatabase("test")
+    find = db.users.find
+    db.users.queries = 0
+
+    def counted_find(*args, **kwargs):
+        db.users.queries += 1
+        return find(*args, **kwargs)
+
+    db.users.find = counted_find
+    return db
+
+
+async def add_user(db, name: str) -> str:
+    result = await db.users.insert_one({"name": name, "city": "Pune", "current_role": "Analyst", "email": "x@y.z"})
+    return str(result.inserted_id)
+
+
+def test_cards_hold_only_card_fields_and_missing_users_are_omitted():
+    async def scenario():
+        db = counting_db()
+        user_id = await add_user(db, "Asha")
+        cache = ProfileCardCache(db)
+        cards = await cache.get_many([user_id, "0" * 24, "not-an-id"])
+        assert list(cards) == [user_id]
+        assert cards[user_id]["name"] == "Asha"
+        assert "email" not in cards[user_id]
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_query():
+    async def scenario():
+        db = counting_db()
+        a, b = await add_user(db, "A"), await add_user(db, "B")
+        cache = ProfileCardCache(db)
+        *results, single = await asyncio.gather(*[cache.get_many([a, b]) for _ in range(10)], cache.get(a))
+        assert db.users.queries == 1
+        assert all(result[a]["name"] == "A" and result[b]["name"] == "B" for result in results)
+        assert single["name"] == "A"
+        assert cache.stats()["coalesced"] > 0
+
+        await cache.get_many([a, b])
+        assert db.users.queries == 1
+        assert cache.stats()["hits"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_waiters_load_on_their_own_when_the_leader_fails():
+    async def scenario():
+        db = counting_db()
+        user_id = await add_user(db, "A")
+        cache = ProfileCardCache(db)
+        load = cache._load
+        calls = []
+
+        async def failing_first_load(user_ids):
+            calls.append(user_ids)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise RuntimeError("mongo down")
+            return await load(user_ids)
+
+        cache._load = failing_first_load
+        leader, waiter = await asyncio.gather(cache.get(user_id), cache.get(user_id), return_exceptions=True)
+        assert isinstance(leader, RuntimeError)
+        assert waiter["name"] == "A"
+        assert cache._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_ttl_and_invalidate_drops_them():
+    async def scenario():
+        db = counting_db()
+        user_id = await add_user(db, "A")
+        cache = ProfileCardCache(db, ttl_seconds=0.02)
+        await cache.get(user_id)
+        await cache.get(user_id)
+        assert db.users.queries == 1
+
+        await asyncio.sleep(0.03)
+        await db.users.update_one({"name": "A"}, {"$set": {"name": "A2"}})
+        assert (await cache.get(user_id))["name"] == "A2"
+        assert db.users.queries == 2
+
+        cache.invalidate(user_id)
+        await cache.get(user_id)
+        assert db.users.queries == 3
+
+    asyncio.run(scenario())
+
+
+def test_lru_bound():
+    async def scenario():
+        db = counting_db()
+        ids = [await add_user(db, str(i)) for i in range(3)]
+        cache = ProfileCardCache(db, max_size=2)
+        await cache.get(ids[0])
+        await cache.get(ids[1])
+        await cache.get(ids[0])
+        await cache.get(ids[2])
+        assert set(cache._entries) == {ids[0], ids[2]}
+
+    asyncio.run(scenario())
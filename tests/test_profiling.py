@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from services.profiling import RequestProfiler, parse_route_fractions
+
+
+def test_parse_route_fractions():
+    assert parse_route_fractions("post /api/chat/message=0.05, GET /api/intros/{user_id}=0.1,junk") == {
+        ("POST", "/api/chat/message"): 0.05,
+        ("GET", "/api/intros/{user_id}"): 0.1,
+    }
+    assert parse_route_fractions("") == {}
+
+
+def test_should_profile_on_token_or_sampled_route(tmp_path):
+    profiler = RequestProfiler(tmp_path, route_fractions={("GET", "/always"): 1.0}, token="secret")
+    assert profiler.should_profile("POST", "/api/users", "secret") == "header"
+    assert profiler.should_profile("POST", "/api/users", "wrong") is None
+    assert profiler.should_profile("GET", "/always") == "sampled"
+    assert not RequestProfiler(tmp_path).enabled
+
+
+def test_capture_path_rejects_unknown_and_malformed_ids(tmp_path):
+    profiler = RequestProfiler(tmp_path)
+    (tmp_path / "20260101T000000000000_GET_x_1ms.folded").write_text("a;b 1\n")
+    assert profiler.capture_path("20260101T000000000000_GET_x_1ms") is not None
+    assert profiler.capture_path("missing") is None
+    assert profiler.capture_path("../etc/passwd") is None
+
+
+@pytest.fixture
+def profiling(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(server.request_profiler, "token", "profile-secret")
+    monkeypatch.setattr(server.request_profiler, "directory", tmp_path)
+    return server.request_profiler
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({}, 403),
+    ({"X-Admin-Token": "wrong"}, 403),
+    ({"X-Profile-Token": "wrong"}, 403),
+    ({"X-Admin-Token": "admin-secret"}, 200),
+    ({"X-Profile-Token": "profile-secret"}, 200),
+])
+def test_listing_profiles_needs_the_admin_or_profiling_token(api, profiling, headers, status):
+    async def scenario(client):
+        return await client.get("/api/admin/profiles", headers=headers)
+
+    assert api(scenario).status_code == status
+
+
+def test_profiled_request_can_be_listed_and_downloaded(api, profiling):
+    async def scenario(client):
+        await client.post("/api/users", json={"name": "Asha"}, headers={"X-Profile-Token": "profile-secret"})
+        # Captures are written off the event loop after the response
+        for _ in range(50):
+            listing = await client.get("/api/admin/profiles", headers={"X-Admin-Token": "admin-secret"})
+            if listing.json()["captures"]:
+                break
+            await asyncio.sleep(0.01)
+        capture = listing.json()["captures"][0]
+
+        unauthorized = await client.get(f"/api/admin/profiles/{capture['id']}")
+        download = await client.get(f"/api/admin/profiles/{capture['id']}", headers={"X-Profile-Token": "profile-secret"})
+        missing = await client.get("/api/admin/profiles/unknown", headers={"X-Admin-Token": "admin-secret"})
+        return capture, unauthorized, download, missing
+
+    capture, unauthorized, download, missing = api(scenario)
+    assert capture["route"] == "/api/users" and capture["reason"] == "header"
+    assert unauthorized.status_code == 403
+    assert download.status_code == 200
+    assert download.headers["Content-Disposition"] == f'attachment; filename="{capture["id"]}.folded"'
+    assert missing.status_code == 404
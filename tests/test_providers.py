@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import threading
+
+from services import providers
+from services.providers import Provider
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(providers.__file__))
+
+
+def test_provider_builds_once_on_first_use():
+    built = []
+    provider = Provider(lambda: built.append(object()) or built[-1], name="service")
+    assert not provider.initialized and built == []
+
+    first = provider()
+    assert provider.initialized
+    assert provider() is first
+    assert len(built) == 1
+
+
+def test_concurrent_first_use_builds_one_instance():
+    built = []
+    started = threading.Barrier(8)
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    provider = Provider(factory)
+
+    def use():
+        started.wait()
+        provider()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+
+
+def test_audio_endpoints_use_the_overridden_services(server, api):
+    async def scenario(client):
+        transcribed = await client.post("/api/audio/transcribe", files={"file": ("a.mp3", b"\x00" * 1600)})
+        spoken = await client.post("/api/audio/synthesize", data={"text": "hello"})
+        return transcribed, spoken
+
+    transcribed, spoken = api(scenario)
+    assert transcribed.status_code == 200 and transcribed.json()["duration"] == 0.1
+    assert spoken.content == b"\x00" * 200
+    # The real services are never constructed while overridden
+    assert not server.get_whisper_service.initialized
+    assert not server.get_tts_service.initialized
+
+
+def test_importing_the_server_skips_heavy_sdks():
+    probe = "import sys, server; print(sorted(m for m in ('openai', 'numpy', 'jinja2') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60,
+        env={"MONGO_URL": "mongodb://localhost:27017", "DB_NAME": "chekinn_test", "PATH": ""}
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
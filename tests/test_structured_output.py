@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from services.structured_output import (
+    LearningsExtraction, MatchResult, StructuredOutputError, extract_json, get_parse_stats,
+    parse_structured, parse_with_repair
+)
+
+
+class FakeLLM:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = []
+
+    async def complete(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! Here it is: {"a": [1, 2]} Hope that helps.', {"a": [1, 2]}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ('{"a": "keep, this,}", "b": "brace } inside"}', {"a": "keep, this,}", "b": "brace } inside"}),
+    ('{"a": "escaped \\" quote", "b": 2,}', {"a": 'escaped " quote', "b": 2}),
+])
+def test_extract_json_tolerates_llm_formatting(text, expected):
+    assert extract_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"a": 1', "{'a': 1}"])
+def test_extract_json_rejects_unrecoverable_replies(text):
+    with pytest.raises(StructuredOutputError):
+        extract_json(text)
+
+
+def test_schema_validation_and_clamping():
+    assert parse_structured('{"should_match": true, "score": 1.7, "reason": "x"}', MatchResult).score == 1.0
+    with pytest.raises(StructuredOutputError, match="Schema validation"):
+        parse_structured('{"big_rocks": "not a list"}', LearningsExtraction)
+
+
+def test_valid_reply_skips_repair():
+    llm = FakeLLM(reply="unused")
+    result = asyncio.run(parse_with_repair('{"score": 0.4}', MatchResult, "test_valid", llm))
+    assert result.score == 0.4
+    assert llm.calls == []
+    assert get_parse_stats()["test_valid"]["parsed"] == 1
+
+
+def test_malformed_reply_is_repaired_with_one_call():
+    llm = FakeLLM(reply='{"should_match": true, "score": 0.9, "reason": "fixed"}')
+    result = asyncio.run(parse_with_repair("should_match: yes", MatchResult, "test_repair", llm, user_id="u1"))
+    assert result.reason == "fixed"
+    assert len(llm.calls) == 1
+    assert llm.calls[0]["purpose"] == "test_repair_repair"
+    assert llm.calls[0]["user_id"] == "u1"
+    assert "should_match" in llm.calls[0]["message"]
+    stats = get_parse_stats()["test_repair"]
+    assert (stats["total"], stats["repaired"], stats["failed"]) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("llm", [
+    None,
+    FakeLLM(reply="still not json"),
+    FakeLLM(error=RuntimeError("provider down")),
+])
+def test_failed_repair_raises_and_counts(llm):
+    purpose = f"test_failed_{id(llm)}"
+    with pytest.raises(StructuredOutputError, match=purpose):
+        asyncio.run(parse_with_repair("nope", MatchResult, purpose, llm))
+    stats = get_parse_stats()[purpose]
+    assert (stats["total"], stats["failed"], stats["failure_rate"]) == (1, 1, 1.0)
+
+
+def test_parse_stats_are_exported_to_metrics():
+    from services.metrics import REGISTRY
+
+    asyncio.run(parse_with_repair('{"should_match": false, "score": 0.1, "reason": "no"}', MatchResult, "test_metrics"))
+    rendered = REGISTRY.render()
+    assert "# TYPE chekinn_structured_parse_total gauge" in rendered
+    assert 'chekinn_structured_parse_total{schema="test_metrics",outcome="parsed"} 1' in rendered
+    assert 'chekinn_structured_parse_total{schema="test_metrics",outcome="failed"} 0' in rendered
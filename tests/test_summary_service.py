@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.memory_mongo import MemoryDatabase
+from services.summary_service import VERBATIM_MESSAGES, SummaryService
+
+START = datetime(2026, 10, 1)
+
+
+class GatedLLM:
+    """Replies once `release` is set, counting calls"""
+
+    def __init__(self, reply: str = "The user is preparing for CAT."):
+        self.reply = reply
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def complete(self, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return self.reply
+
+
+async def seed(db, count: int) -> dict:
+    conversation = {"_id": "c1", "user_id": "u1", "message_count": count, "summary_through": None}
+    await db.conversations.insert_one(dict(conversation))
+    for i in range(count):
+        await db.messages.insert_one({
+            "conversation_id": "c1",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "text": f"message {i}",
+            "created_at": START + timedelta(minutes=i)
+        })
+    return conversation
+
+
+def test_update_folds_messages_older_than_the_verbatim_window():
+    async def scenario():
+        db = MemoryDatabase("test")
+        conversation = await seed(db, 12)
+        llm = GatedLLM()
+        llm.release.set()
+
+        fields = await SummaryService(db, llm, every_turns=1).update_summary(conversation)
+        assert fields["summary_message_count"] == 12 - VERBATIM_MESSAGES
+        assert fields["summary_through"] == START + timedelta(minutes=12 - VERBATIM_MESSAGES - 1)
+
+        stored = await db.conversations.find_one({"_id": "c1"})
+        assert stored["summary"] == llm.reply
+
+    asyncio.run(scenario())
+
+
+def test_stale_update_does_not_move_the_summary_backwards():
+    async def scenario():
+        db = MemoryDatabase("test")
+        conversation = await seed(db, 12)
+        llm = GatedLLM()
+        llm.release.set()
+        service = SummaryService(db, llm, every_turns=1)
+
+        assert await service.update_summary(dict(conversation)) is not None
+        # Second update still holds the summary_through it read before the first one saved
+        assert await service.update_summary(dict(conversation)) is None
+
+        stored = await db.conversations.find_one({"_id": "c1"})
+        assert stored["summary_message_count"] == 12 - VERBATIM_MESSAGES
+
+    asyncio.run(scenario())
+
+
+def test_schedule_runs_one_update_per_conversation_at_a_time():
+    async def scenario():
+        db = MemoryDatabase("test")
+        conversation = await seed(db, 12)
+        llm = GatedLLM()
+        service = SummaryService(db, llm, every_turns=1)
+        updates = []
+
+        service.schedule(conversation, lambda conversation_id, fields: updates.append(conversation_id))
+        service.schedule(conversation)
+        assert len(service._tasks) == 1
+
+        llm.release.set()
+        await asyncio.gather(*service._tasks)
+        assert llm.calls == 1
+        assert updates == ["c1"]
+        assert not service._inflight
+
+    asyncio.run(scenario())
+
+
+def test_schedule_skips_conversations_that_are_not_due():
+    async def scenario():
+        service = SummaryService(MemoryDatabase("test"), GatedLLM(), every_turns=5)
+        service.schedule({"_id": "c1", "message_count": 10 + VERBATIM_MESSAGES - 1, "summary_message_count": 0})
+        assert not service._tasks
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_cancels_pending_updates():
+    async def scenario():
+        db = MemoryDatabase("test")
+        conversation = await seed(db, 12)
+        llm = GatedLLM()
+        service = SummaryService(db, llm, every_turns=1)
+
+        service.schedule(conversation)
+        await asyncio.sleep(0.01)
+        assert llm.calls == 1
+
+        await service.shutdown()
+        assert not service._tasks
+        stored = await db.conversations.find_one({"_id": "c1"})
+        assert "summary" not in stored
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.sync_service import InvalidSyncTokenError, decode_token, encode_token
+
+
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York", "Asia/Kolkata", "Pacific/Chatham"])
+def test_token_round_trip_is_independent_of_host_tz(host_tz, tz):
+    host_tz(tz)
+    watermark = datetime(2026, 10, 19, 15, 37, 11, 869906)
+    assert decode_token(encode_token(watermark)) == watermark.replace(microsecond=869000)
+
+
+def test_token_carries_utc_epoch_millis(host_tz):
+    host_tz("America/New_York")
+    watermark = datetime(1970, 1, 2, 0, 0, 0, 5000)
+    token = encode_token(watermark)
+    assert decode_token(token) - datetime(1970, 1, 1) == timedelta(days=1, milliseconds=5)
+
+
+def test_utcnow_watermark_round_trips_within_a_millisecond(host_tz):
+    host_tz("Asia/Kolkata")
+    now = datetime.utcnow()
+    assert abs(decode_token(encode_token(now)) - now) < timedelta(milliseconds=1)
+
+
+@pytest.mark.parametrize("token", ["!!", "e30", "eyJ2IjoyLCJ0IjoxfQ", ""])
+def test_malformed_or_foreign_tokens_are_rejected(token):
+    with pytest.raises(InvalidSyncTokenError):
+        decode_token(token)
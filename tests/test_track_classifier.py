@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from services import track_classifier
+from services.track_classifier import NO_TRACK, NaiveBayesTrackModel, TrackClassifier
+
+TEXTS = [
+    "mock scores are stuck", "percentile target for iim", "quant section drills", "mba applications",
+    "salary negotiation tips", "manager ignores my work", "interview loop next week", "resume review please",
+    "how was your weekend", "just saying hello", "nothing much today", "random thoughts",
+] * 3
+LABELS = (["cat_mba"] * 4 + ["jobs_career"] * 4 + [NO_TRACK] * 4) * 3
+
+
+def test_model_learns_the_training_tracks():
+    model = NaiveBayesTrackModel.fit(TEXTS, LABELS, min_count=1)
+    labels, confidences = model.predict_many(["my mock percentile", "negotiating salary with my manager"])
+    assert labels == ["cat_mba", "jobs_career"]
+    assert all(0 < confidence <= 1 for confidence in confidences)
+    assert model.predict_many([]) == ([], [])
+
+
+def test_saved_model_loads_with_the_same_predictions(tmp_path):
+    model = NaiveBayesTrackModel.fit(TEXTS, LABELS, min_count=1)
+    path = tmp_path / "track_model.npz"
+    model.save(path)
+
+    loaded = NaiveBayesTrackModel.load(path)
+    assert loaded.vocabulary == model.vocabulary
+    assert loaded.classes == model.classes
+    assert loaded.predict_many(TEXTS)[0] == model.predict_many(TEXTS)[0]
+
+
+def test_missing_model_falls_back_to_rules(tmp_path):
+    classifier = TrackClassifier(model_path=tmp_path / "absent.npz")
+    assert classifier.classify_many(["my CAT mock went badly", "hello"]) == ["cat_mba", None]
+    assert classifier.stats()["decided_by"] == {"model": 0, "rules": 2}
+
+
+def test_preload_reads_the_model_off_the_event_loop(tmp_path, monkeypatch):
+    path = tmp_path / "track_model.npz"
+    NaiveBayesTrackModel.fit(TEXTS, LABELS, min_count=1).save(path)
+    load = NaiveBayesTrackModel.load
+    threads = []
+
+    def recording_load(model_path):
+        threads.append(threading.current_thread())
+        return load(model_path)
+
+    monkeypatch.setattr(NaiveBayesTrackModel, "load", staticmethod(recording_load))
+    classifier = TrackClassifier(model_path=path, min_confidence=0.0)
+
+    async def scenario():
+        await classifier.preload()
+        return classifier.classify("percentile target for iim")
+
+    assert asyncio.run(scenario()) == "cat_mba"
+    assert threads and threads[0] is not threading.main_thread()
+    assert classifier.stats()["model_loaded"]
+    # Loaded once; later calls reuse it
+    classifier.classify("mba applications")
+    assert len(threads) == 1
+
+
+def test_numpy_accessor_imports_once():
+    assert track_classifier._np() is track_classifier._np()
@@ -0,0 +1,86 @@
+import pytest
+
+from services.track_detection import TrackMatcher, detect_track, detect_tracks_many, pair_user_turns, tokenize
+
+
+@pytest.mark.parametrize("text, track", [
+    ("thinking about an MBA next year", "cat_mba"),
+    ("my CAT mock test went badly", "cat_mba"),
+    ("got a salary hike after my appraisal", "jobs_career"),
+    ("two interviews lined up this week", "jobs_career"),
+    ("roast me please", "roast_play"),
+    ("so bored today", "roast_play"),
+])
+def test_detects_keyword_tracks(text, track):
+    assert detect_track(text) == track
+
+
+@pytest.mark.parametrize("text", [
+    "the education system is broken",   # "cat" inside a word
+    "browsing the product catalog",
+    "a category error",
+    "the parole hearing",               # "role"
+    "a jobless-sounding bobcat",        # "job" and "cat" as prefixes/suffixes
+    "the function returned fundamentals",  # "fun"
+    "",
+    None,
+])
+def test_keywords_inside_other_words_do_not_match(text):
+    assert detect_track(text) is None
+
+
+def test_whole_words_only_with_optional_plural():
+    matcher = TrackMatcher({"jobs_career": {"shift": 1}})
+    assert matcher.detect("I want to shift careers") == "jobs_career"
+    assert matcher.detect("night shifts are rough") == "jobs_career"
+    assert matcher.detect("bought a gift") is None
+    assert matcher.detect("a shiftless week") is None
+    assert matcher.detect("gifts and shiftwork") is None
+
+
+def test_phrases_tolerate_hyphens_and_spacing():
+    assert detect_track("booked another mock-test") == "cat_mba"
+    assert detect_track("serving my notice  period") == "jobs_career"
+
+
+def test_punctuation_breaks_a_phrase_and_joined_words_still_match():
+    matcher = TrackMatcher({"cat_mba": {"mock test": 3, "mock": 1}})
+    assert matcher.scores("one more mock, test tomorrow") == {"cat_mba": 1}
+    assert matcher.scores("MockTests every weekend") == {"cat_mba": 3}
+    assert matcher.scores("mock mock-test") == {"cat_mba": 4}
+
+
+def test_non_ascii_text_tokenizes_like_ascii():
+    assert tokenize("Roast-me, café!") == ["roast", "me", ",", "café", "!"]
+    assert detect_track("naïve question — roast me 🙂") == "roast_play"
+    # "İ" lowercases to two characters; it must still read as part of the word
+    assert detect_track("İsnap") is None
+
+
+def test_longer_phrase_wins_over_its_prefix():
+    matcher = TrackMatcher({"roast_play": {"roast": 3, "roast me": 4}})
+    assert matcher.scores("roast me") == {"roast_play": 4}
+
+
+def test_highest_score_wins_and_ties_follow_track_priority():
+    # cat_mba: mba (3); jobs_career: job (2) + salary (2)
+    assert detect_track("mba or a job with a better salary") == "jobs_career"
+    # cat_mba: mba (3); jobs_career: career (3)
+    assert detect_track("mba career") == "cat_mba"
+
+
+def test_batch_matches_single_detection():
+    texts = ["cat prep", "new job", "tell me a joke", "nothing here", "new job", None]
+    assert detect_tracks_many(texts) == [detect_track(text) for text in texts]
+
+
+def test_pairs_each_reply_with_the_user_turn_before_it():
+    messages = [
+        {"role": "assistant", "text": "welcome"},
+        {"role": "user", "text": "first"},
+        {"role": "user", "text": "second"},
+        {"role": "assistant", "text": "reply"},
+        {"role": "assistant", "text": "follow-up"},
+    ]
+    pairs = pair_user_turns(messages)
+    assert [(reply["text"], text) for reply, text in pairs] == [("reply", "second")]
@@ -0,0 +1,66 @@
+import pytest
+
+from services.turn_router import (
+    RESPONSE_POOL, ROUTE_FULL, ROUTE_LIGHT, ROUTE_POOL, ROAST_MAX_WORDS, TurnRouter, normalize
+)
+
+
+def test_normalize_strips_punctuation_case_and_spacing():
+    assert normalize("  Thank   YOU!! ") == "thank you"
+    assert normalize("Hey... :)") == "hey"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hi!", (ROUTE_POOL, "greeting")),
+    ("good morning", (ROUTE_POOL, "greeting")),
+    ("Thanks a lot :)", (ROUTE_POOL, "thanks")),
+    ("ttyl", (ROUTE_POOL, "bye")),
+    ("hmm ok", (ROUTE_FULL, None)),
+    ("okay", (ROUTE_LIGHT, "ack")),
+    ("I keep doubting whether to quit", (ROUTE_FULL, None)),
+])
+def test_trivial_categories(text, expected):
+    assert TurnRouter().route(text, track=None) == expected
+
+
+def test_substantive_tracks_always_get_the_full_orchestrator():
+    router = TurnRouter()
+    assert router.route("thanks", track="cat_mba") == (ROUTE_FULL, None)
+    assert router.route("ok", track="jobs_career") == (ROUTE_FULL, None)
+
+
+def test_short_playful_turns_go_light():
+    router = TurnRouter()
+    assert router.route("roast me please", track="roast_play") == (ROUTE_LIGHT, "roast_play")
+    long_turn = " ".join(["word"] * (ROAST_MAX_WORDS + 1))
+    assert router.route(long_turn, track="roast_play") == (ROUTE_FULL, None)
+
+
+def test_answer_to_our_question_keeps_full_context():
+    router = TurnRouter()
+    history = [{"role": "assistant", "text": "Curious or skip?"}]
+    assert router.route("ok", track=None, conversation_history=history) == (ROUTE_FULL, None)
+    # A fresh greeting is not an answer
+    assert router.route("hey", track=None, conversation_history=history) == (ROUTE_POOL, "greeting")
+
+
+def test_disabled_router_sends_everything_full():
+    assert TurnRouter(enabled=False).route("hi", track=None) == (ROUTE_FULL, None)
+
+
+def test_pooled_response_is_deterministic_and_greets_newcomers():
+    router = TurnRouter()
+    first = router.pooled_response("greeting", "Asha", message_count=0, seed="u1")
+    assert first in [option.format(name="Asha") for option in RESPONSE_POOL["first_greeting"]]
+    assert router.pooled_response("thanks", None, 4, seed="u1") == router.pooled_response("thanks", None, 4, seed="u1")
+    assert "{name}" not in router.pooled_response("bye", None, 2, seed="u2")
+
+
+def test_stats_count_routes():
+    router = TurnRouter()
+    for text in ("hi", "okay", "what should I do about my offer letter"):
+        router.route(text, track=None)
+    stats = router.stats()
+    assert stats["total"] == 3
+    assert stats["counts"] == {ROUTE_POOL: 1, ROUTE_LIGHT: 1, ROUTE_FULL: 1}
+    assert stats["hit_rates"][ROUTE_POOL] == round(1 / 3, 4)